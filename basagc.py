@@ -12,12 +12,21 @@ if __name__ == "__main__":
     # arg parser for debug flag
     parser = argparse.ArgumentParser(description='basaGC: AGC for KSP')
     parser.add_argument('-d','--debug', help='Set debug mode on', required=False, action='store_true')
+    parser.add_argument('-t','--terminal', help='Show the DSKY in the terminal rather than a window', required=False,
+                        action='store_true')
+    parser.add_argument('-w','--web', help='Serve the DSKY to web browsers', required=False, action='store_true')
     args = parser.parse_args()
     if args.debug:
         config.DEBUG = True
         config.current_log_level = "DEBUG"
         print("================DEBUG MODE================")
-        
+
+    if args.terminal:
+        from PyQt5.QtCore import QCoreApplication
+        from basagc import terminal
+        app = QCoreApplication(sys.argv)
+        sys.exit(terminal.run(app))
+
     from basagc import gui, computer  # import the rest
     app = QApplication(sys.argv)
     main_window = QMainWindow()
@@ -25,6 +34,10 @@ if __name__ == "__main__":
     ui = gui.GUI(main_window)
     computer = computer.Computer(ui)
     main_window.setWindowTitle('basaGC');
+    if args.web:
+        from basagc import webdsky
+        web_dsky = webdsky.WebDSKYServer(computer)
+        web_dsky.start()
     main_window.show()
 
     sys.exit(app.exec_())
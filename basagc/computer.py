@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 """This file contains the guts of the guidance computer"""
 
+import heapq
+import itertools
+import math
 import os
 
 from PyQt5.QtCore import QTimer
@@ -17,7 +20,10 @@ from basagc import telemachus
 from basagc import utils
 from basagc import verbs
 from basagc import imu
-from basagc import maneuver
+from basagc import journal
+from basagc import nodes
+from basagc import planner
+from basagc import vehicle
 
 
 class Computer:
@@ -38,6 +44,8 @@ class Computer:
         verbs.Verb.computer = self
         programs.Program.computer = self
         nouns.computer = self
+        # the orbital mechanics (and numpy) are imported when the computer is built, not when this module is imported
+        from basagc import maneuver, navigation
         maneuver.computer = self
 
         self.ui = ui
@@ -72,6 +80,10 @@ class Computer:
         self.slow_loop_timer = QTimer()
         self.slow_loop_timer.timeout.connect(self.slow_loop)
 
+        # average-G navigation during burns
+        self.average_g_timer = QTimer()
+        self.average_g_timer.timeout.connect(self.average_g_servicer)
+
         self.comp_acty_timer = QTimer()
         self.comp_acty_timer.timeout.connect(self._comp_acty_off)
 
@@ -80,19 +92,36 @@ class Computer:
         self.main_loop_table = []
         self.alarm_codes = [0, 0, 0]
         self.running_programs = []
+        self.running_program = None
         self.noun_data = {
             "30": ["00002"],
             "25": ["00000", "00000", ""],
+            "26": ["00000", "00000"],
             "31": ["00000", "00000"],
             "38": ["00000", "", ""],
+            "47": ["00000"],
+            "48": ["00000", "00000"],
         }
         self.next_burn = None
-        #self._burn_queue = []
+        # heap of (time of ignition, sequence, burn) for the burns loaded after next_burn
+        self.burn_queue = []
+        self._burn_sequence = itertools.count()
         self.is_ksp_connected = False
         self.ksp_paused_state = None
         self.is_direction_autopilot_engaged = False
         self.is_thrust_autopilot_engaged = False
-        self.moi_burn_delta_v = 0.0  # a bit of a hack, need to rethink this
+        self.transfer_window = None
+        self.rendezvous = None
+        self.planner = planner.Planner(self)
+        self.maneuver_nodes = nodes.ManeuverNodes()
+        # staged vehicle model (tuple of vehicle.Stage), loaded with V71. If None, burns are planned with a single
+        # stage made from nouns 25, 26, 31 and 38
+        self.vehicle = None
+        self.state_vector = None
+        self.state_vector_phase = None
+        # True while thrust that the computer isn't controlling (a manual burn, staging, drag) is sensed
+        self.is_thrust_sensed = False
+        self.navigation_filter = navigation.NavigationFilter()
         # self.jobs = []
 
         self.nouns = nouns.nouns
@@ -125,6 +154,25 @@ class Computer:
                 continue
             self.uplink_queue.append(char)
     
+    def accept_vehicle_uplink(self):
+
+        """ Loads the staged vehicle model from config.VEHICLE_FILE. Burns are then planned with it, rather than with
+        the single stage entered in nouns 25, 26, 31 and 38.
+        :return: True if the vehicle was loaded
+        :rtype: bool
+        """
+
+        try:
+            stages = vehicle.load_stages(config.VEHICLE_FILE)
+        except (OSError, ValueError) as error:
+            utils.log("Vehicle uplink failed: {}".format(error), log_level="ERROR")
+            self.program_alarm(502)
+            return False
+        self.vehicle = stages
+        utils.log("Vehicle uplinked: {} stages, {:.1f} m/s".format(
+            len(stages), sum(profile.delta_v for profile in vehicle.get_profile(stages))))
+        return True
+
     def charin(self, keypress):
         '''
         Receives a keypress event and passes it on to routines.charin
@@ -174,37 +222,225 @@ class Computer:
 
     def add_burn(self, burn_object):
 
-        """ Adds a Burn object to the computer burn queue. If no burn is
-        assigned to next_burn, load new burn to next_burn
+        """ Adds a Burn object to the computer burn queue. Burns are executed in order of time of ignition: if the
+        new burn ignites before next_burn (and next_burn isn't executing), it becomes next_burn. A queued burn with the
+        same name is replaced, and the burns that depended on it are marked stale. The burn's maneuver node is put on
+        the flight plan when it is queued.
         :param burn_object: a Burn object that contains parameters for the burn
-        :param execute: if true, execute the added burn
+        :return: True if the burn was queued, False if it failed validation (a program alarm is raised)
+        :rtype: bool
+        """
+
+        replaced = self._get_replaced_burn(burn_object)
+        alarm_code = self.validate_burn(burn_object, ignore=[replaced])
+        if alarm_code:
+            utils.log("Burn rejected, alarm {}".format(alarm_code), log_level="WARNING")
+            self.program_alarm(alarm_code)
+            return False
+        self._queue_burn(burn_object, replaced)
+        return True
+
+    def add_burns(self, burns):
+
+        """ Adds a sequence of burns to the burn queue, all or none of them: every burn is validated against the queue
+        and the other new burns before any of them is queued.
+        :param burns: the Burn objects to add
+        :type burns: list of maneuver.Burn
+        :return: True if the burns were queued, False if one of them failed validation (a program alarm is raised)
+        :rtype: bool
+        """
+
+        replaced = [self._get_replaced_burn(burn) for burn in burns]
+        for burn in burns:
+            alarm_code = self.validate_burn(burn, ignore=replaced, others=burns)
+            if alarm_code:
+                utils.log("Burn {} rejected, alarm {}".format(burn.name, alarm_code), log_level="WARNING")
+                self.program_alarm(alarm_code)
+                return False
+        for burn, replaced_burn in zip(burns, replaced):
+            self._queue_burn(burn, replaced_burn)
+        return True
+
+    def _get_replaced_burn(self, burn_object):
+        if burn_object.name is None:
+            return None
+        for burn in self.get_queued_burns():
+            if burn.name == burn_object.name and not burn.is_executing:
+                return burn
+        return None
+
+    def _queue_burn(self, burn_object, replaced):
+        if replaced is not None:
+            utils.log("Replacing queued burn {}".format(replaced.name))
+            for burn in self.get_queued_burns():
+                if burn.depends_on is replaced:
+                    burn.depends_on = burn_object
+            for burn in self.get_dependent_burns(burn_object):
+                burn.is_stale = True
+            if replaced is self.next_burn:
+                self.next_burn = None
+            else:
+                self.burn_queue = [entry for entry in self.burn_queue if entry[2] is not replaced]
+            self.maneuver_nodes.remove_node(replaced)
+
+        burn_object.update_maneuver_node()
+        heapq.heappush(self.burn_queue, (burn_object.time_of_ignition, next(self._burn_sequence), burn_object))
+        self.reorder_burns()
+
+    def validate_burn(self, burn, ignore=(), others=()):
+
+        """ Checks that a burn can be queued: it must not be too close, it must not overlap another queued burn, and
+        the vehicle must have the delta-v for it and all of the other queued burns. Stale burns are estimates, so they
+        aren't checked for overlaps.
+        :param burn: the burn to check
+        :type burn: maneuver.Burn
+        :param ignore: queued burns to leave out of the checks (the burns being replaced)
+        :type ignore: list of maneuver.Burn
+        :param others: burns that are being queued along with burn, checked as if they were already queued
+        :type others: list of maneuver.Burn
+        :return: the alarm code if the burn can't be queued, otherwise None
+        :rtype: int | None
+        """
+
+        if burn.calculate_time_to_ignition() < config.MINIMUM_TIME_TO_IGNITION:
+            return 226
+        queued = [other for other in self.get_queued_burns() if not any(other is replaced for replaced in ignore)]
+        queued += [other for other in others if other is not burn]
+        end_of_burn = burn.time_of_ignition + burn.burn_duration
+        for other in queued:
+            if burn.is_stale or other.is_stale:
+                continue
+            if burn.time_of_ignition < other.time_of_ignition + other.burn_duration and \
+                    other.time_of_ignition < end_of_burn:
+                return 231
+        total_delta_v = burn.delta_v_required + sum(other.delta_v_required for other in queued)
+        from basagc import maneuver
+        try:
+            if maneuver.plan_burn(total_delta_v).residual_delta_v < 0:
+                return 232
+        except vehicle.VehicleNotLoaded:
+            return 233
+        return None
+
+    def get_queued_burns(self):
+
+        """ Returns the loaded burns in order of time of ignition, starting with next_burn.
+        :return: the burns
+        :rtype: list of maneuver.Burn
+        """
+
+        burns = [burn for _, _, burn in sorted(self.burn_queue)]
+        if self.next_burn:
+            burns.insert(0, self.next_burn)
+        return burns
+
+    def is_burn_queued(self, burn):
+        return burn is self.next_burn or any(queued is burn for _, _, queued in self.burn_queue)
+
+    def get_dependent_burns(self, burn):
+
+        """ Returns the queued burns that depend on burn, directly or through another burn.
+        :param burn: the burn
+        :type burn: maneuver.Burn
+        :return: the dependent burns
+        :rtype: list of maneuver.Burn
+        """
+
+        dependents = []
+        parents = [burn]
+        while parents:
+            parent = parents.pop()
+            for queued in self.get_queued_burns():
+                if queued.depends_on is parent and queued not in dependents:
+                    dependents.append(queued)
+                    parents.append(queued)
+        return dependents
+
+    def reorder_burns(self):
+
+        """ Rebuilds the burn queue after times of ignition have changed, and loads the earliest burn to next_burn
+        unless next_burn is already executing.
+        :return: None
+        """
+
+        self.burn_queue = [(burn.time_of_ignition, sequence, burn) for _, sequence, burn in self.burn_queue]
+        heapq.heapify(self.burn_queue)
+        if not self.burn_queue:
+            return
+        if self.next_burn is None:
+            self.next_burn = heapq.heappop(self.burn_queue)[2]
+        elif not (self.next_burn.is_executing or self.next_burn.is_active) and \
+                self.burn_queue[0][0] < self.next_burn.time_of_ignition:
+            self.next_burn = heapq.heapreplace(self.burn_queue, (self.next_burn.time_of_ignition,
+                                                                 next(self._burn_sequence), self.next_burn))[2]
+
+    def burn_replanned(self, burn):
+
+        """ Called when a burn has been recalculated. The burns that depend on it are marked stale, so they are
+        replanned before they are executed.
+        :param burn: the recalculated burn
+        :type burn: maneuver.Burn
         :return: None
         """
-        self.next_burn = burn_object
-        #self.add_to_mainloop(burn_object._coarse_start_time_monitor)
+
+        for dependent in self.get_dependent_burns(burn):
+            dependent.is_stale = True
+        self.reorder_burns()
+
+    def burn_complete(self):
+
+        """ Called when a burn has finished. If there are more burns queued, P40 is started for the next one (if
+        config.AUTO_EXECUTE_BURN_QUEUE), otherwise the computer goes to P00.
+        :return: None
+        """
+
+        if self.next_burn and config.AUTO_EXECUTE_BURN_QUEUE:
+            utils.log("Executing next queued burn")
+            self.next_burn.is_auto_proceed = config.BURN_QUEUE_AUTO_PROCEED
+            self.execute_program("40")
+        else:
+            self.go_to_poo()
 
     def enable_burn(self):
         self.next_burn.execute()
 
-    def remove_burn(self):
+    def get_flight_phase(self):
 
-        """ Removes a given Burn object from the computers burn queue
-        :param this_burn: the Burn object to remove
-        :return: None
+        """ Returns the current flight phase, used to pick display update rates.
+        :return: "burn" while the engine is burning for a maneuver, "ascent" while P11 is running, otherwise "coast"
+        :rtype: str
         """
-        self.next_burn = None
 
+        if self.next_burn and self.next_burn.is_active:
+            return "burn"
+        if self.running_program and self.running_program.number == "11":
+            return "ascent"
+        return "coast"
 
-    #def burn_complete(self):
+    def remove_burn(self, burn=None):
 
-        #""" Removes a completed burn and loads next queued burn if available.
-        #:return: None
-        #"""
-        #utils.log("Removing {} from burn queue".format(self.next_burn))
-        #self.next_burn = None
-        #if self._burn_queue:
-            #utils.log("Adding {} as next burn".format(self._burn_queue[0]))
-            #self.next_burn = self._burn_queue.pop()
+        """ Removes a burn from the queue and its maneuver node from the flight plan. The burns that depend on it are
+        marked stale. If it was next_burn, the earliest queued burn is loaded to next_burn.
+        :param burn: the burn to remove, next_burn if None
+        :type burn: maneuver.Burn | None
+        :return: None
+        """
+
+        if burn is None:
+            burn = self.next_burn
+        if burn is None:
+            return
+        for dependent in self.get_dependent_burns(burn):
+            dependent.is_stale = True
+        self.maneuver_nodes.remove_node(burn)
+        if burn is self.next_burn:
+            self.next_burn = None
+            if self.burn_queue:
+                utils.log("Loading next burn from burn queue")
+                self.next_burn = heapq.heappop(self.burn_queue)[2]
+        else:
+            self.burn_queue = [entry for entry in self.burn_queue if entry[2] is not burn]
+            heapq.heapify(self.burn_queue)
 
     def disable_direction_autopilot(self):
 
@@ -227,6 +463,7 @@ class Computer:
             telemachus.disable_smartass()
         except TypeError:
             pass
+        self.planner.shutdown()
         # if self.loop_timer.is_running:
         #     self.loop_timer.stop()
         self.gui.Destroy()
@@ -237,6 +474,8 @@ class Computer:
         :return: None
         """
         utils.log("Computer booting...", log_level="INFO")
+        if config.ENABLE_JOURNAL:
+            journal.open_journal()
 
         # attempt to load telemetry listing
         # set_trace()
@@ -249,9 +488,12 @@ class Computer:
 
         # add uplink function to main loop
         self.add_to_mainloop(self.process_uplink_data)
+        self.add_to_mainloop(self.planner.poll)
 
         self.main_loop_timer.start(config.LOOP_TIMER_INTERVAL)
         self.slow_loop_timer.start(config.SLOW_LOOP_TIMER_INTERVAL)
+        if config.ENABLE_AVERAGE_G:
+            self.average_g_timer.start(config.AVERAGE_G_INTERVAL)
         self.is_powered_on = True
 
     def main_loop(self):
@@ -260,6 +502,8 @@ class Computer:
         :return: None
         """
 
+        utils.tick_cache.new_tick()
+
         # check KSP paused state
         # self.check_paused_state()
 
@@ -275,6 +519,13 @@ class Computer:
         '''
         if not telemachus.check_connection():
             self.dsky.annunciators["no_att"].on()
+        elif telemachus.telemetry:
+            try:
+                journal.sync_mission_time(telemachus.get_telemetry("missionTime"))
+                self.servicer()
+            except (telemachus.KSPNotConnected, telemachus.TelemetryNotAvailable):
+                pass
+        journal.flush()
         if config.ENABLE_COMP_ACTY_FLASH:
             self.flash_comp_acty()
         
@@ -304,7 +555,7 @@ class Computer:
                 if self.keyboard_state["requested_noun"] == "":
                     verb_to_execute = self.verbs[verb](**kwargs)
                 else:
-                    print(self.keyboard_state["requested_noun"])
+                    utils.log("Requested noun: {}".format(self.keyboard_state["requested_noun"]))
                     verb_to_execute = self.verbs[verb](self.keyboard_state["requested_noun"], **kwargs)
             except KeyError:
                 self.operator_error("Verb {} does not exist :(".format(verb))
@@ -357,7 +608,7 @@ class Computer:
 
         if message:
             utils.log("OPERATOR ERROR: " + message, log_level="ERROR")
-        self.dsky.annunciators["opr_err"].blink_timer.start(500)
+        self.dsky.start_annunciator_blink("opr_err")
         
     #def remove_job(self, job):
         #utils.log("Removing job from jobs list: {}".format(job))
@@ -384,12 +635,13 @@ class Computer:
         :return: None
         """
         utils.log("PROGRAM ALARM {}: {}".format(str(alarm_code), config.ALARM_CODES[alarm_code]), log_level="ERROR")
+        journal.record(journal.ALARM, code=alarm_code, kind="program_alarm")
         alarm_code += 1000
         if self.alarm_codes[0] != 0:
             self.alarm_codes[1] = self.alarm_codes[0]
         self.alarm_codes[0] = alarm_code
         self.alarm_codes[2] = self.alarm_codes[0]
-        self.dsky.annunciators["prog"].on()
+        self.dsky.set_annunciator("prog")
 
     def poodoo_abort(self, alarm_code, message=None):
 
@@ -404,7 +656,8 @@ class Computer:
             self.alarm_codes[1] = self.alarm_codes[0]
         self.alarm_codes[0] = alarm_code
         self.alarm_codes[2] = self.alarm_codes[0]
-        self.dsky.annunciators["prog"].on()
+        self.dsky.set_annunciator("prog")
+        journal.record(journal.ALARM, code=alarm_code - 2000, kind="poodoo_abort", message=message)
         self.running_program.terminate()
         utils.log("P00DOO ABORT {}: {}".format(str(alarm_code), message), log_level="ERROR")
         poo = self.programs["00"]()
@@ -439,10 +692,95 @@ class Computer:
 
     def servicer(self):
 
-        """ For future use. The servicer updates the spacecrafts state vector.
+        """ Updates the spacecraft state vector. While coasting the state vector is only refixed from telemetry when
+        it is older than config.STATE_VECTOR_MAX_AGE or the orbited body has changed, in between it is propagated.
+        Coasting fixes are fused by the navigation filter. During burns the state vector is maintained by
+        average_g_servicer().
+
+        Thrust that isn't a P40 burn isn't modelled, so the state vector is refixed as soon as it is sensed (the
+        g-force is above config.THRUST_SENSED_GEE_FORCE), and isn't used until the vessel coasts again. A refix is
+        also forced if the semi-major axis has drifted from the telemetry's, eg after a burn too short to be sampled.
+        :return: None
         """
 
-        pass
+        flight_phase = self.get_flight_phase()
+        if flight_phase == "burn" and self.state_vector_phase == "burn":
+            return
+        universal_time, body, gee_force, semi_major_axis = telemachus.sample_telemetry_values(
+            "universalTime", "body", "geeForce", "sma")
+        self.is_thrust_sensed = flight_phase == "coast" and gee_force > config.THRUST_SENSED_GEE_FORCE
+        if (flight_phase == "coast" and flight_phase == self.state_vector_phase and self.state_vector and
+                not self.is_thrust_sensed and
+                self.state_vector.age(universal_time) < config.STATE_VECTOR_MAX_AGE and
+                self.state_vector.body == body and
+                abs(semi_major_axis - self.state_vector.orbit.sma) <=
+                config.STATE_VECTOR_SMA_TOLERANCE * abs(semi_major_axis)):
+            return
+        from basagc import navigation
+        fix = navigation.StateVector.from_telemetry()
+        if flight_phase == "coast" and not self.is_thrust_sensed:
+            self.navigation_filter.add_fix(fix)
+            self.state_vector = self.navigation_filter.get_state_vector(fix.epoch)
+        else:
+            # the filter doesn't model thrust
+            self.navigation_filter.reset()
+            self.state_vector = fix
+        self.state_vector_phase = flight_phase
+
+    def average_g_servicer(self):
+
+        """ Advances the state vector during burns by average-G integration of the sensed acceleration, so that
+        guidance and displays don't need to read the orbit from telemetry. The sensed acceleration is the g-force
+        along the thrust direction of the burn. The state vector is refixed from telemetry every
+        config.AVERAGE_G_FIX_INTERVAL seconds, and the navigation error logged.
+        :return: None
+        """
+
+        if self.get_flight_phase() != "burn":
+            return
+        from basagc import navigation
+        try:
+            universal_time, gee_force = telemachus.sample_telemetry_values("universalTime", "geeForce")
+            fix = None
+            if (self.state_vector is None or self.state_vector_phase != "burn" or
+                    universal_time - self.state_vector.fix_epoch > config.AVERAGE_G_FIX_INTERVAL):
+                fix = navigation.StateVector.from_telemetry()
+                self.navigation_filter.reset()
+        except (telemachus.KSPNotConnected, telemachus.TelemetryNotAvailable):
+            return
+
+        if fix:
+            if self.state_vector_phase == "burn":
+                position, velocity = self.state_vector.predict(fix.epoch)
+                utils.log("Average-G error: {:.1f} m, {:.2f} m/s".format(
+                    math.dist(position, fix.position), math.dist(velocity, fix.velocity)),
+                    log_level="DEBUG")
+            direction = self.next_burn.get_thrust_direction(fix.position, fix.velocity)
+            fix.acceleration = gee_force * vehicle.STANDARD_GRAVITY * direction
+            self.state_vector = fix
+            self.state_vector_phase = "burn"
+            return
+        if universal_time <= self.state_vector.epoch:
+            return
+        direction = self.next_burn.get_thrust_direction(self.state_vector.position, self.state_vector.velocity)
+        acceleration = gee_force * vehicle.STANDARD_GRAVITY * direction
+        self.state_vector = self.state_vector.integrate(universal_time, acceleration)
+
+    def get_current_state_vector(self):
+
+        """ Returns the state vector if it is current without reading the orbit from telemetry: while coasting it is
+        propagated, during burns it is maintained by average-G integration.
+        :return: the state vector, or None if it isn't maintained in this flight phase, unmodelled thrust is sensed,
+            or there is no state vector yet
+        :rtype: navigation.StateVector | None
+        """
+
+        flight_phase = self.get_flight_phase()
+        if flight_phase == "coast" and self.is_thrust_sensed:
+            return None
+        if self.state_vector and flight_phase in ("coast", "burn") and self.state_vector_phase == flight_phase:
+            return self.state_vector
+        return None
 
     #def check_ksp_connection(self):
 
@@ -18,11 +18,61 @@ IMAGES_DIR = os.path.join(BASE_DIR, "assets/")
 IP = "127.0.0.1"
 PORT = "8085"
 URL = "http://" + IP + ":" + PORT + "/telemachus/datalink?"
+# the web DSKY has no authentication, set WEB_DSKY_IP to "0.0.0.0" to serve it to other machines
+WEB_DSKY_IP = "127.0.0.1"
+WEB_DSKY_PORT = 8086
+WEB_DSKY_PAGE = os.path.join(BASE_DIR, "ui", "web_dsky.html")
+# frames a web DSKY client may fall behind before it is disconnected (one per main loop tick at most)
+WEB_DSKY_SEND_QUEUE_SIZE = 100
 DISPLAY_UPDATE_INTERVAL = 500
+# monitor verb update intervals (ms) by noun and flight phase ("ascent", "coast" or "burn"). Nouns and phases not
+# listed here are updated every DISPLAY_UPDATE_INTERVAL
+DISPLAY_UPDATE_INTERVALS = {
+    "17": {"burn": 200},
+    "36": {"coast": 1000},
+    "40": {"burn": 100},
+    "44": {"coast": 1000, "ascent": 250},
+    "62": {"ascent": 200},
+}
 COMP_ACTY_FLASH_DURATION = 100
+BLINK_INTERVAL = 500
 LOOP_TIMER_INTERVAL = 50
 SLOW_LOOP_TIMER_INTERVAL = 2000
+# while coasting the state vector is propagated rather than read from telemetry, and refixed once it is this old (s)
+STATE_VECTOR_MAX_AGE = 60
+# the servicer treats a g-force above this as thrust that isn't modelled (g), and refixes the coasting state vector
+# if its semi-major axis differs from the telemetry's by more than this fraction
+THRUST_SENSED_GEE_FORCE = 0.01
+STATE_VECTOR_SMA_TOLERANCE = 1e-3
+# during burns the state vector is advanced by average-G integration of the sensed acceleration every
+# AVERAGE_G_INTERVAL ms, and refixed from telemetry every AVERAGE_G_FIX_INTERVAL seconds
+ENABLE_AVERAGE_G = True
+AVERAGE_G_INTERVAL = 100
+AVERAGE_G_FIX_INTERVAL = 10
+# navigation filter. Telemetry fixes are fused with the standard deviations of their position (m) and velocity (m/s)
+# errors, and the unmodelled acceleration (m/s^2)
+NAVIGATION_POSITION_NOISE = 100.0
+NAVIGATION_VELOCITY_NOISE = 0.1
+NAVIGATION_ACCELERATION_NOISE = 0.01
+# fixes whose innovation has a squared Mahalanobis distance above this are taken as a maneuver, and restart the filter
+# (the chi-square value for 6 degrees of freedom that is exceeded by chance once in 10000 fixes)
+NAVIGATION_INNOVATION_GATE = 27.9
+# attitude samples are filtered, and only read from telemetry once the last sample is ATTITUDE_SAMPLE_INTERVAL
+# seconds old (deg, deg/s^2)
+ATTITUDE_SAMPLE_INTERVAL = 0.5
+ATTITUDE_NOISE = 0.2
+ATTITUDE_RATE_NOISE = 5.0
+# P02 samples the vertical speed every LIFTOFF_SAMPLE_INTERVAL ms, and detects liftoff once the filtered vertical speed
+# is LIFTOFF_CONFIDENCE standard deviations above LIFTOFF_VERTICAL_SPEED (m/s, m/s, m/s^3)
+LIFTOFF_SAMPLE_INTERVAL = 250
+LIFTOFF_VERTICAL_SPEED = 1.0
+LIFTOFF_CONFIDENCE = 3.0
+VERTICAL_SPEED_NOISE = 0.5
+VERTICAL_SPEED_RATE_NOISE = 10.0
 ENABLE_COMP_ACTY_FLASH = True
+# number of threads maneuver calculations run on
+PLANNER_WORKERS = 2
+TERMINAL_REFRESH_INTERVAL = 50
 
 LOG_LEVELS = [
     "DEBUG",
@@ -33,6 +83,13 @@ LOG_LEVELS = [
 ]
 
 current_log_level = "INFO"
+LOG_FILE = "../gc.log"
+LOG_TO_STDOUT = True
+LOG_BUFFER_LENGTH = 1000
+LOG_VIEWER_UPDATE_INTERVAL = 500  # ms
+LOG_REPEAT_INTERVAL = 5.0  # seconds that repeats of the same message are suppressed for
+ENABLE_JOURNAL = True
+JOURNAL_FILE = "../gc.journal"
 
 DIRECTIONS = [
     "prograde",
@@ -64,6 +121,67 @@ TELEMACHUS_BODY_IDS = {
     "Eeloo": "16",
 }
 
+# the body each body orbits
+BODY_PARENTS = {
+    "Kerbin": "Kerbol",
+    "Mun": "Kerbin",
+    "Minmus": "Kerbin",
+    "Moho": "Kerbol",
+    "Eve": "Kerbol",
+    "Gilly": "Eve",
+    "Duna": "Kerbol",
+    "Ike": "Duna",
+    "Jool": "Kerbol",
+    "Laythe": "Jool",
+    "Vall": "Jool",
+    "Bop": "Jool",
+    "Tylo": "Jool",
+    "Pol": "Jool",
+    "Dres": "Kerbol",
+    "Eeloo": "Kerbol",
+}
+
+# size of the departure time x time of flight grid searched for transfer windows
+TRANSFER_WINDOW_DEPARTURE_STEPS = 120
+TRANSFER_WINDOW_FLIGHT_TIME_STEPS = 60
+# earliest time of ignition for a planned burn, seconds from now
+MINIMUM_TIME_TO_IGNITION = 120
+# burn queue. When a burn finishes, P40 is started for the next queued burn (if AUTO_EXECUTE_BURN_QUEUE), and the
+# engine is enabled at TIG-10 without waiting for PROCEED (if BURN_QUEUE_AUTO_PROCEED). Stale burns are replanned every
+# BURN_REPLAN_INTERVAL ms until they can be calculated
+AUTO_EXECUTE_BURN_QUEUE = True
+BURN_QUEUE_AUTO_PROCEED = True
+BURN_REPLAN_INTERVAL = 5000
+# maneuver node commands are only sent to KSP when a node moves by more than these tolerances (s, m/s)
+MANEUVER_NODE_TIME_TOLERANCE = 0.5
+MANEUVER_NODE_DELTA_V_TOLERANCE = 0.05
+
+# burn cutoff prediction. During a burn the velocity is sampled every BURN_SAMPLE_INTERVAL ms, and the acceleration is
+# measured over the last BURN_SAMPLE_WINDOW samples
+BURN_SAMPLE_INTERVAL = 20
+BURN_SAMPLE_WINDOW = 10
+# the throttle is reduced to BURN_FINAL_THROTTLE percent when this many seconds of full thrust are left
+BURN_THROTTLE_DOWN_TIME = 1.0
+BURN_FINAL_THROTTLE = 10
+# time from sending a throttle command to it taking effect (s), until it has been measured
+BURN_COMMAND_LATENCY = 0.05
+# closed loop guidance for burns to a maneuver node. Guidance runs every GUIDANCE_INTERVAL ms, and sends attitude
+# commands when the steering direction changes by more than GUIDANCE_DEADBAND degrees
+ENABLE_CLOSED_LOOP_GUIDANCE = True
+GUIDANCE_INTERVAL = 100
+GUIDANCE_DEADBAND = 0.25
+
+# coelliptic rendezvous. TPI is when the target is RENDEZVOUS_TPI_ELEVATION degrees above the horizon, and intercepts
+# it after RENDEZVOUS_TPI_TRANSFER_ANGLE degrees of target travel. CSI is targeted for TPI RENDEZVOUS_TPI_DELAY orbits
+# later, with CSI burns of up to RENDEZVOUS_MAX_CSI_DELTA_V m/s, waiting up to RENDEZVOUS_MAX_PHASING_ORBITS orbits for
+# a solution. While a rendezvous program runs the burns are retargeted every RENDEZVOUS_REFRESH_INTERVAL ms
+RENDEZVOUS_TPI_ELEVATION = 26.6
+RENDEZVOUS_TPI_TRANSFER_ANGLE = 130.0
+RENDEZVOUS_TPI_DELAY = 1.0
+RENDEZVOUS_MAX_CSI_DELTA_V = 150.0
+RENDEZVOUS_MAX_PHASING_ORBITS = 10
+RENDEZVOUS_REFRESH_INTERVAL = 2000
+
 _UNSORTED_ALARM_CODES = {
     110: "Error contacting KSP",
     111: "Telemetry not available",
@@ -74,9 +192,17 @@ _UNSORTED_ALARM_CODES = {
     224: "Orbit not circular",
     225: "Vessel and target orbits inclination too far apart",
     226: "Time of ignition less than 2 minutes in the future",
+    227: "No transfer window found",
+    228: "Maneuver calculation failed",
+    229: "No rendezvous solution",
+    230: "Periapsis too close for orbit insertion",
+    231: "Burn overlaps another queued burn",
+    232: "Not enough delta-v for queued burns",
+    233: "No vehicle data loaded",
     310: "Program hasn't been finished yet, watch this space :)",
     410: "Autopilot error",
     501: "Uplink file does not exist, aborting uplink",
+    502: "Vehicle uplink file missing or invalid",
 }
 
 ALARM_CODES = OrderedDict(sorted(_UNSORTED_ALARM_CODES.items()))
@@ -112,6 +238,8 @@ COPYRIGHT = "(C) 2014-2016 Tim Buchanan (cashelcomputers@gmail.com)"
 WEBSITE = "https://github.com/cashelcomputers/basaGC/"
 DEVELOPERS = "Tim Buchanan"
 ICON = os.path.join(BASE_DIR, "icon.png")
+# staged vehicle loaded by V71, see vehicle.load_stages() for the format
+VEHICLE_FILE = os.path.join(BASE_DIR, "basagc", "vehicle.txt")
 
 
 
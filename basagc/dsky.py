@@ -4,7 +4,7 @@ This module contains code for the DSKY (the guidance computer/user interface). I
 interface between the computer and the gui toolkit.
 """
 
-from basagc import utils, config
+from basagc import utils, config, journal
 if config.DEBUG:
     from pudb import set_trace  # lint:ok
 
@@ -84,27 +84,8 @@ class DSKY:
         :return: None
         """
 
-        # check if we are to blink a control register
-        for digit in self.registers[register].digits:
-            digit.blink_data["is_blinking_lit"] = False
-            digit.blink_data["is_blinking"] = True
-            digit.display("b")
-
-            # bind andstart the timer
-            digit.blink_timer.timeout.connect(self._blink_event)
-            digit.blink_timer.start(500)
-
-    def _blink_event(self):
-        """alternates the digit between a value and blank ie to flash the digit."""
-
-        # digit displaying the number, switch to blank
-        if self.is_blinking_lit:
-            self.display(10)
-            self.is_blinking_lit = False
-        else:
-            # digit displaying blank, change to number
-            self.display(self.last_value)
-            self.is_blinking_lit = True
+        for digit in self.get_register(register).values():
+            digit.start_blink()
 
     def blank_register(self, register):
         '''
@@ -227,20 +208,50 @@ class DSKY:
                         value_to_set = value[index]
                         this_register[digit_to_set].display(value_to_set)
 
+    def get_display_state(self):
+        '''
+        Returns a snapshot of everything lit on the DSKY, for use by remote displays.
+        Each digit maps to the character displayed, each annunciator to "1" (lit) or "0" (unlit). Elements that are
+        blinking have their value replaced with "*" (annunciators) or suffixed with "*" (digits).
+        :returns: the display state keyed by element name, eg "verb:1", "data_2:sign" or "prog"
+        :rtype: dict
+        '''
+        state = {}
+        for register_name in ["program", "verb", "noun", "data_1", "data_2", "data_3"]:
+            for digit_name, digit in self.get_register(register_name).items():
+                value = digit.blink_data["blink_value"] or "b"
+                if digit.blink_data["is_blinking"]:
+                    value += "*"
+                state[register_name + ":" + digit_name] = value
+        for name, annunciator in self.annunciators.items():
+            if annunciator.is_blinking:
+                state[name] = "*"
+            else:
+                state[name] = "1" if annunciator.is_lit else "0"
+        return state
+
     def set_annunciator(self, name, set_to=True):
 
         try:
-            if set_to:
-                self.annunciators[name].on()
-            else:
-                self.annunciators[name].off()
+            annunciator = self.annunciators[name]
         except KeyError:
             utils.log("You tried to change a annunciator that doesnt exist :(", "WARNING")
+            return
+        if annunciator.is_lit != set_to:
+            journal.record(journal.ANNUNCIATOR, name=name, lit=set_to)
+        if set_to:
+            annunciator.on()
+        else:
+            annunciator.off()
 
     def start_annunciator_blink(self, name):
+        if not self.annunciators[name].is_blinking:
+            journal.record(journal.ANNUNCIATOR, name=name, blinking=True)
         self.annunciators[name].start_blink()
 
     def stop_annunciator_blink(self, name):
+        if self.annunciators[name].is_blinking:
+            journal.record(journal.ANNUNCIATOR, name=name, blinking=False)
         self.annunciators[name].stop_blink()
 
     def stop_comp_acty_flash(self, event):
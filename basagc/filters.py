@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+This module contains the rate filter used to smooth the attitude angles and the vertical speed. It is needed from boot
+(by the IMU and P02), so it is kept free of numpy: with only two states, plain arithmetic is also faster.
+"""
+
+import math
+
+from basagc import config
+if config.DEBUG:
+    from pudb import set_trace  # lint:ok
+
+
+class RateFilter:
+
+    """ Kalman filter for a value that changes at a slowly varying rate, eg an attitude angle or the vertical speed.
+    The state is the value and its rate, and changes of the rate are modelled as white noise. Angles are filtered
+    modulo their period.
+    """
+
+    def __init__(self, measurement_noise, rate_noise, period=None):
+
+        """ Class constructor.
+        :param measurement_noise: standard deviation of the samples
+        :type measurement_noise: float
+        :param rate_noise: standard deviation of the change of the rate, per second
+        :type rate_noise: float
+        :param period: the period of the value (eg 360 for a heading), None if it isn't an angle
+        :type period: float | None
+        :return: None
+        """
+
+        self.measurement_noise = measurement_noise
+        self.rate_noise = rate_noise
+        self.period = period
+        self.state = None
+        self.covariance = None
+        self.time = None
+
+    def predict(self, time):
+
+        """ Propagates the estimate.
+        :param time: the time to propagate to (s)
+        :type time: float
+        :return: the value and rate, and their covariance (variance of the value, covariance, variance of the rate)
+            at time
+        :rtype: tuple of tuple of float
+        """
+
+        interval = time - self.time
+        value, rate = self.state
+        value += rate * interval
+        if self.period:
+            value %= self.period
+        value_variance, covariance, rate_variance = self.covariance
+        process_noise = self.rate_noise ** 2
+        elapsed = abs(interval)
+        return (value, rate), (
+            value_variance + 2 * interval * covariance + interval ** 2 * rate_variance +
+            process_noise * elapsed ** 3 / 3,
+            covariance + interval * rate_variance + process_noise * elapsed ** 2 / 2,
+            rate_variance + process_noise * elapsed)
+
+    def add_sample(self, time, value):
+
+        """ Fuses a sample of the value.
+        :param time: time of the sample (s)
+        :type time: float
+        :param value: the sample
+        :type value: float
+        :return: None
+        """
+
+        if self.state is None:
+            self.state = (float(value), 0.0)
+            # the rate is unknown until there are more samples
+            self.covariance = (self.measurement_noise ** 2, 0.0, 1e6)
+            self.time = time
+            return
+        (predicted_value, rate), (value_variance, covariance, rate_variance) = self.predict(time)
+        innovation = value - predicted_value
+        if self.period:
+            innovation = (innovation + self.period / 2) % self.period - self.period / 2
+        innovation_variance = value_variance + self.measurement_noise ** 2
+        value_gain = value_variance / innovation_variance
+        rate_gain = covariance / innovation_variance
+        predicted_value += value_gain * innovation
+        if self.period:
+            predicted_value %= self.period
+        self.state = (predicted_value, rate + rate_gain * innovation)
+        self.covariance = (value_variance - value_gain * value_variance, covariance - value_gain * covariance,
+                           rate_variance - rate_gain * covariance)
+        self.time = time
+
+    def get_estimate(self, time):
+
+        """ Returns the estimated value at time.
+        :param time: the time of the estimate (s)
+        :type time: float
+        :return: the value, its rate, and the standard deviation of the value
+        :rtype: tuple of float
+        """
+
+        (value, rate), (value_variance, _, _) = self.predict(time)
+        return float(value), float(rate), math.sqrt(value_variance)
+
+    def get_age(self, time):
+        return None if self.time is None else time - self.time
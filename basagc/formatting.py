@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+This module contains the DSKY number formatting engine. Nouns declare a field for each data register, describing how
+a number is shown (scale, decimal places, sign, octal or decimal). The field is compiled once, when the noun class is
+defined, and then encodes numbers straight into 6 character register strings: a sign character ("+", "-" or "b" for
+blank) followed by 5 digits. Values that don't fit in 5 digits saturate at the largest value the register can show.
+
+Run this module to benchmark the encoder against the old string juggling:
+    python3 -m basagc.formatting
+"""
+
+from basagc import config
+if config.DEBUG:
+    from pudb import set_trace  # lint:ok
+
+REGISTER_DIGITS = 5
+BLANK_REGISTER = "b" * (REGISTER_DIGITS + 1)
+_NO_MODULUS = 2 ** 63
+
+
+class Field:
+
+    """ A number shown in a data register. """
+
+    def __init__(self, decimals=0, scale=1, signed=True, octal=False):
+
+        """ Class constructor.
+        :param decimals: number of (implied) decimal places shown, eg 1 shows 123.4 as 01234
+        :type decimals: int
+        :param scale: the value is multiplied by scale before display, eg 0.001 shows metres as km
+        :type scale: float
+        :param signed: if True the sign is shown, otherwise the sign digit is blank
+        :type signed: bool
+        :param octal: if True the value is shown in octal. Octal values are always unsigned
+        :type octal: bool
+        :return: None
+        """
+
+        self.decimals = decimals
+        self.scale = scale
+        self.signed = signed and not octal
+        self.octal = octal
+        self.factor = scale * 10 ** decimals
+        if octal:
+            self.maximum = 8 ** REGISTER_DIGITS - 1
+            self.template = "b%0" + str(REGISTER_DIGITS) + "o"
+        else:
+            self.maximum = 10 ** REGISTER_DIGITS - 1
+            self.template = "%s%0" + str(REGISTER_DIGITS) + "d"
+
+    def encode(self, value):
+
+        """ Encodes a value as a register string.
+        :param value: the value to encode, or None to blank the register
+        :type value: int | float
+        :return: the register string, eg "+01234"
+        :rtype: str
+        """
+
+        if value is None:
+            return BLANK_REGISTER
+        number = int(round(value * self.factor))
+        if self.octal:
+            return self.template % min(max(number, 0), self.maximum)
+        if number < 0:
+            sign = "-" if self.signed else "b"
+            number = -number
+        else:
+            sign = "+" if self.signed else "b"
+        if number > self.maximum:
+            number = self.maximum
+        return self.template % (sign, number)
+
+
+class TimeField:
+
+    """ A time shown in a data register, with digits for days, hours, minutes, seconds or hundredths of a second. """
+
+    # unit: (seconds per unit, number of units in the next larger unit)
+    UNITS = {
+        "d": (86400, None),
+        "h": (3600, 24),
+        "m": (60, 60),
+        "s": (1, 60),
+        "c": (0.01, 100),
+    }
+
+    def __init__(self, pattern, signed=True, wrap=False):
+
+        """ Class constructor.
+        :param pattern: 5 characters describing the register digits, eg "mmbss" for minutes, a blank and seconds.
+                        d: days, h: hours, m: minutes, s: seconds, c: hundredths of a second, b: blank. Each unit
+                        shows its part of the time only (eg minutes 0 to 59), except the largest unit in the pattern
+                        which shows every whole unit up to what fits in its digits
+        :type pattern: str
+        :param signed: if True the sign is shown, otherwise the sign digit is blank
+        :type signed: bool
+        :param wrap: if True the largest unit also shows only its part of the time, eg "bbbmm" shows minutes past
+                     the hour
+        :type wrap: bool
+        :return: None
+        """
+
+        if len(pattern) != REGISTER_DIGITS:
+            raise ValueError("Time pattern must be {} characters: {}".format(REGISTER_DIGITS, pattern))
+        self.pattern = pattern
+        self.signed = signed
+        self.smallest_unit = min((self.UNITS[unit][0] for unit in pattern if unit != "b"))
+
+        # compile the pattern into (divisor, modulus, maximum) for each run of digits, and a template with the blanks
+        self.parts = []
+        largest_unit = max(pattern.replace("b", ""), key=lambda unit: self.UNITS[unit][0])
+        template = ""
+        position = 0
+        while position < len(pattern):
+            unit = pattern[position]
+            width = len(pattern[position:]) - len(pattern[position:].lstrip(unit))
+            if unit == "b":
+                template += "b" * width
+            else:
+                seconds_per_unit, units_per_next = self.UNITS[unit]
+                divisor = int(round(seconds_per_unit / self.smallest_unit))
+                if unit == largest_unit and not (wrap and units_per_next):
+                    # no wrap around, saturate at the largest value that fits
+                    self.parts.append((divisor, _NO_MODULUS, 10 ** width - 1))
+                else:
+                    self.parts.append((divisor, units_per_next, units_per_next - 1))
+                template += "%0" + str(width) + "d"
+            position += width
+        self.template = "%s" + template
+
+    def encode(self, value):
+
+        """ Encodes a time as a register string.
+        :param value: the time in seconds, or None to blank the register
+        :type value: int | float
+        :return: the register string, eg "-05b30"
+        :rtype: str
+        """
+
+        if value is None:
+            return BLANK_REGISTER
+        if value < 0:
+            sign = "-" if self.signed else "b"
+            value = -value
+        else:
+            sign = "+" if self.signed else "b"
+        ticks = int(value / self.smallest_unit)
+        return self.template % (sign, *[min(ticks // divisor % modulus, maximum)
+                                        for divisor, modulus, maximum in self.parts])
+
+
+def _legacy_format(value, decimals):
+
+    """ The string juggling used by nouns and Verb._format_output_data() before this module. For benchmarking only.
+    """
+
+    item = str(round(value, decimals)).replace(".", "")
+    if item[0] == "-":
+        return item.zfill(6)
+    return "+" + item.zfill(5)
+
+
+def main():
+
+    """ Benchmarks Field.encode() against the old string formatting. """
+
+    import timeit
+
+    from basagc import utils
+
+    field = Field(decimals=1)
+    time_field = TimeField("mmbss")
+    values = [i * 13.37 - 5000 for i in range(1000)]
+    repeats = 200
+
+    def legacy():
+        for value in values:
+            _legacy_format(value, 1)
+
+    def legacy_time():
+        for value in values:
+            time_to_ignition = utils.seconds_to_time(abs(value))
+            item = "-" + str(int(time_to_ignition["minutes"])).zfill(2) + "b" + \
+                   str(int(time_to_ignition["seconds"])).zfill(2)
+            item.zfill(6)
+
+    def engine():
+        for value in values:
+            field.encode(value)
+
+    def engine_time():
+        for value in values:
+            time_field.encode(value)
+
+    for name, function in [("legacy decimal", legacy), ("Field", engine),
+                           ("legacy mmbss", legacy_time), ("TimeField", engine_time)]:
+        seconds = min(timeit.repeat(function, number=repeats, repeat=5))
+        print("{:16} {:8.3f} µs per value".format(name, seconds / (repeats * len(values)) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
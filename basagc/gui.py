@@ -9,12 +9,72 @@ if config.DEBUG:
 from basagc import utils
 
 
+class BlinkClock:
+    """ Drives blinking for every DSKY element from one shared timer, so that all flashing elements stay in phase. """
+
+    clock_instance = None
+
+    def __init__(self, interval=config.BLINK_INTERVAL):
+        """ Class constructor.
+        :param interval: time in ms between each blink phase change
+        :type interval: int
+        :return: None
+        """
+
+        self.interval = interval
+        self.is_lit = True
+        self.elements = set()
+        self.timer = QtCore.QTimer()
+        self.timer.timeout.connect(self.tick)
+
+    @classmethod
+    def get_instance(cls):
+        """ Returns the shared blink clock, creating it on first use.
+        :return: the blink clock instance
+        :rtype: BlinkClock
+        """
+
+        if cls.clock_instance is None:
+            cls.clock_instance = cls()
+        return cls.clock_instance
+
+    def add(self, element):
+        """ Starts blinking the given element in phase with all other blinking elements.
+        :param element: an element that implements set_blink_phase()
+        :return: None
+        """
+
+        self.elements.add(element)
+        element.set_blink_phase(self.is_lit)
+        if not self.timer.isActive():
+            self.timer.start(self.interval)
+
+    def remove(self, element):
+        """ Stops blinking the given element. The timer is stopped when nothing is left blinking.
+        :param element: the element to stop blinking
+        :return: None
+        """
+
+        self.elements.discard(element)
+        if not self.elements:
+            self.timer.stop()
+
+    def is_blinking(self, element):
+        return element in self.elements
+
+    def tick(self):
+        """ Changes the blink phase of every blinking element. """
+
+        self.is_lit = not self.is_lit
+        for element in self.elements:
+            element.set_blink_phase(self.is_lit)
+
+
 class ControlRegister:
     def __init__(self, central_widget, name, *digits):
         
         self.central_widget = central_widget
         self.name = name
-        self.verb_35_timer = QtCore.QTimer()
         self.digits = [
             digits[0],
             digits[1],
@@ -144,26 +204,35 @@ class Annunciator(QtWidgets.QLabel):
         self.setText("")
         self.is_lit = False
         self.requested_state = False
-        self.blink_timer = QtCore.QTimer()
-        self.blink_timer.timeout.connect(self.invert)
         self.off()
     
-    def start_blink(self, interval=500):
+    @property
+    def is_blinking(self):
+        return BlinkClock.get_instance().is_blinking(self)
+    
+    def start_blink(self):
         """ Starts the annunciator blinking.
-        :param interval: the blink interval
         :return: None
         """
         
-        self.blink_timer.start(interval)
+        BlinkClock.get_instance().add(self)
     
     def stop_blink(self):
         """ Stops the annunciator blinking.
         :return: None
         """
         
-        self.blink_timer.stop()
+        BlinkClock.get_instance().remove(self)
         self.off()
     
+    def set_blink_phase(self, is_lit):
+        """ Called by the blink clock to light or extinguish the annunciator. """
+        
+        if is_lit:
+            self.on()
+        else:
+            self.off()
+    
     def invert(self):
         """ Blinks indicator """
         
@@ -209,8 +278,11 @@ class SignDigit(QtWidgets.QLabel):
             "b": QtGui.QPixmap(os.path.join(config.IMAGES_DIR, "PlusMinusOff.jpg")),
         }
         self.setText("")
+        self.blink_data = {
+            "blink_value": None,
+            "is_blinking": False,
+        }
         self.display("b")
-        self.blink_data = {}
     
     def set_tooltip(self, tooltip):
         self.setToolTip(tooltip)
@@ -221,6 +293,7 @@ class SignDigit(QtWidgets.QLabel):
         image = self.digit_pixmaps[digit_to_display]
         # change picture
         self.setPixmap(image)
+        self.blink_data["blink_value"] = digit_to_display
 
 
 class Digit(QtWidgets.QLabel):
@@ -247,10 +320,6 @@ class Digit(QtWidgets.QLabel):
             "is_blinking": False,
             "is_blinking_lit": False,
         }
-        
-        self.blink_timer = QtCore.QTimer()
-        self.blink_timer.timeout.connect(self.flip)
-        
     
     def set_tooltip(self, tooltip):
         self.setToolTip(tooltip)
@@ -273,33 +342,72 @@ class Digit(QtWidgets.QLabel):
         """ Starts the digit blinking.
         :return: None
         """
-        #set_trace()
-        self.blink_data["is_blinking_lit"] = True
+
         self.blink_data["is_blinking"] = True
-        #image = self.digit_pixmaps[self.blink_data["blink_value"]]
-        #self.setPixmap(image)
-        self.blink_timer.start(500)
+        BlinkClock.get_instance().add(self)
 
-    def flip(self):
+    def set_blink_phase(self, is_lit):
 
-        """alternates the digit between a value and blank ie to flash the digit."""
+        """ Called by the blink clock to switch the digit between its value and blank. """
 
-        # digit displaying the number, switch to blank
-        if self.blink_data["is_blinking_lit"]:
-            image = self.digit_pixmaps["b"]
-            self.setPixmap(image)
-            # self.display("b")
-            self.blink_data["is_blinking_lit"] = False
+        self.blink_data["is_blinking_lit"] = is_lit
+        if is_lit:
+            image = self.digit_pixmaps[self.blink_data["blink_value"] or "b"]
         else:
-            # digit displaying blank, change to number
-            image = self.digit_pixmaps[self.blink_data["blink_value"]]
-            self.setPixmap(image)
-            #self.display(self.blink_data["blink_value"])
-            self.blink_data["is_blinking_lit"] = True
+            image = self.digit_pixmaps["b"]
+        self.setPixmap(image)
 
     def stop_blink(self):
-        self.blink_timer.stop()
+        BlinkClock.get_instance().remove(self)
         self.blink_data["is_blinking"] = False
+        self.blink_data["is_blinking_lit"] = False
+        self.setPixmap(self.digit_pixmaps[self.blink_data["blink_value"] or "b"])
+
+class LogViewer(QtWidgets.QDialog):
+
+    """ A window showing the recent log lines (utils.log_buffer), followed as they are logged. Closing the window only
+    hides it.
+    """
+
+    def __init__(self, parent=None):
+
+        """ Class constructor.
+        :param parent: the parent window
+        :return: None
+        """
+
+        super().__init__(parent)
+        self.setWindowTitle("basaGC Log")
+        self.resize(800, 400)
+        self.text = QtWidgets.QPlainTextEdit(self)
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+        self.text.setMaximumBlockCount(config.LOG_BUFFER_LENGTH)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.text)
+        self.line_count = 0
+        self.timer = QtCore.QTimer()
+        self.timer.timeout.connect(self.update_log)
+
+    def showEvent(self, event):
+        self.update_log()
+        self.timer.start(config.LOG_VIEWER_UPDATE_INTERVAL)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def update_log(self):
+
+        """ Appends the lines logged since the last update.
+        :return: None
+        """
+
+        lines, self.line_count = utils.get_log_lines(self.line_count)
+        if lines:
+            self.text.appendPlainText("\n".join(lines))
+
 
 class GUI:
     """This class represents the GUI. It contains the DSKY and its elements."""
@@ -629,6 +737,17 @@ class GUI:
         
         self.setup_ui(self.main_window)
 
+    def show_log(self):
+
+        """ Shows the log viewer, creating it the first time.
+        :return: None
+        """
+
+        if utils.LOG_VIEWER is None:
+            utils.LOG_VIEWER = LogViewer(self.main_window)
+        utils.LOG_VIEWER.show()
+        utils.LOG_VIEWER.raise_()
+
     def get_output_widgets(self):
     
         """returns the objects that are output objects"""
@@ -796,6 +915,9 @@ class GUI:
         self.menu_help.addAction(self.action_alarm_codes)
         self.menu_help.addSeparator()
         self.menu_help.addAction(self.action_about)
+        self.menu_file.setTitle("&File")
+        self.action_show_log.setText("Show &Log...")
+        self.action_show_log.triggered.connect(self.show_log)
         self.menubar.addAction(self.menu_file.menuAction())
         self.menubar.addAction(self.menu_help.menuAction())
         
@@ -3,6 +3,7 @@
 
 from basagc.telemachus import check_connection, get_telemetry
 from basagc import utils, config
+from basagc.filters import RateFilter
 if config.DEBUG:
     from pudb import set_trace  # lint:ok
 
@@ -27,6 +28,12 @@ class IMU:
             "middle": 0.0,  # Z axis, aka heading
             "outer": 0.0,  # X axis, aka roll
             }
+        # the attitude samples are filtered, so that the attitude can be estimated between samples
+        self.attitude_filters = {
+            "inner": RateFilter(config.ATTITUDE_NOISE, config.ATTITUDE_RATE_NOISE),
+            "middle": RateFilter(config.ATTITUDE_NOISE, config.ATTITUDE_RATE_NOISE, period=360),
+            "outer": RateFilter(config.ATTITUDE_NOISE, config.ATTITUDE_RATE_NOISE, period=360),
+            }
 
     def on(self):
         '''
@@ -51,6 +58,27 @@ class IMU:
         self.gyro_angles["inner"] = get_telemetry("pitch")
         self.gyro_angles["middle"] = get_telemetry("heading")
         self.gyro_angles["outer"] = get_telemetry("roll")
+        universal_time = get_telemetry("universalTime")
+        for gimbal, angle in self.gyro_angles.items():
+            self.attitude_filters[gimbal].add_sample(universal_time, angle)
+
+    def get_attitude(self):
+        '''
+        Estimates the current attitude from the filtered attitude samples, only reading the attitude from KSP when
+        the last sample is older than config.ATTITUDE_SAMPLE_INTERVAL
+        :returns: the gimbal angles and the standard deviation of each
+        :rtype: dict of tuple of float
+        '''
+
+        universal_time = get_telemetry("universalTime")
+        age = self.attitude_filters["inner"].get_age(universal_time)
+        if age is None or not 0 <= age < config.ATTITUDE_SAMPLE_INTERVAL:
+            self.update_gyro_angles()
+        attitude = {}
+        for gimbal, attitude_filter in self.attitude_filters.items():
+            angle, _, deviation = attitude_filter.get_estimate(universal_time)
+            attitude[gimbal] = (angle, deviation)
+        return attitude
 
     def check_for_gimbal_lock(self):
         '''
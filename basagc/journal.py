@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+This module contains the event journal. The journal records significant events (program changes, verbs executed,
+alarms, annunciator changes and burn milestones) in a compact binary file for post flight analysis.
+
+File format (all little endian):
+    header: b"BGCJ", version (uint8)
+    record: mission time (float64, NaN if not yet known), unix time (float64), event type (uint8),
+            payload length (uint16), payload
+    payload: field count (uint8), then for each field: name length (uint8), name (utf-8), type tag (1 byte), value
+
+Run this module to filter and export a journal, eg:
+    python3 -m basagc.journal ../gc.journal --event alarm burn --start 3600 --format csv
+"""
+
+import argparse
+import csv
+import json
+import math
+import struct
+import sys
+import time
+
+from basagc import config
+if config.DEBUG:
+    from pudb import set_trace  # lint:ok
+
+MAGIC = b"BGCJ"
+VERSION = 1
+
+PROGRAM = 1
+VERB = 2
+ALARM = 3
+ANNUNCIATOR = 4
+BURN = 5
+
+EVENT_NAMES = {
+    PROGRAM: "program",
+    VERB: "verb",
+    ALARM: "alarm",
+    ANNUNCIATOR: "annunciator",
+    BURN: "burn",
+}
+EVENT_TYPES = {name: event_type for event_type, name in EVENT_NAMES.items()}
+
+_FILE_HEADER = struct.Struct("<4sB")
+_RECORD_HEADER = struct.Struct("<ddBH")
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+_STRING_LENGTH = struct.Struct("<H")
+
+_journal = None
+
+
+class JournalFormatError(Exception):
+
+    """ This exception is raised when a file is not a valid journal """
+
+    pass
+
+
+def encode_fields(fields):
+
+    """ Encodes a flat dict of fields into a journal payload.
+    :param fields: field names and values. Values may be None, bool, int, float or str
+    :type fields: dict
+    :return: the encoded payload
+    :rtype: bytes
+    """
+
+    parts = [bytes([len(fields)])]
+    for name, value in fields.items():
+        name = name.encode("utf-8")
+        parts.append(bytes([len(name)]) + name)
+        if value is None:
+            parts.append(b"N")
+        elif isinstance(value, bool):
+            parts.append(b"T" if value else b"F")
+        elif isinstance(value, int):
+            parts.append(b"i" + _INT.pack(value))
+        elif isinstance(value, float):
+            parts.append(b"d" + _FLOAT.pack(value))
+        else:
+            value = str(value).encode("utf-8")
+            parts.append(b"s" + _STRING_LENGTH.pack(len(value)) + value)
+    return b"".join(parts)
+
+
+def decode_fields(payload):
+
+    """ Decodes a journal payload.
+    :param payload: the payload to decode
+    :type payload: bytes
+    :return: the fields
+    :rtype: dict
+    """
+
+    fields = {}
+    position = 1
+    for _ in range(payload[0]):
+        name_length = payload[position]
+        name = payload[position + 1:position + 1 + name_length].decode("utf-8")
+        position += 1 + name_length
+        tag = payload[position:position + 1]
+        position += 1
+        if tag == b"N":
+            value = None
+        elif tag in (b"T", b"F"):
+            value = tag == b"T"
+        elif tag == b"i":
+            value = _INT.unpack_from(payload, position)[0]
+            position += _INT.size
+        elif tag == b"d":
+            value = _FLOAT.unpack_from(payload, position)[0]
+            position += _FLOAT.size
+        elif tag == b"s":
+            length = _STRING_LENGTH.unpack_from(payload, position)[0]
+            position += _STRING_LENGTH.size
+            value = payload[position:position + length].decode("utf-8")
+            position += length
+        else:
+            raise JournalFormatError("Unknown field type {}".format(tag))
+        fields[name] = value
+    return fields
+
+
+class Journal:
+
+    """ Writes events to a journal file. """
+
+    def __init__(self, filename):
+
+        """ Class constructor.
+        :param filename: the journal file to append to
+        :type filename: str
+        :return: None
+        """
+
+        self.filename = filename
+        self.file = open(filename, "ab")
+        if self.file.tell() == 0:
+            self.file.write(_FILE_HEADER.pack(MAGIC, VERSION))
+        self._mission_time_at_sync = math.nan
+        self._clock_at_sync = 0.0
+
+    def sync_mission_time(self, mission_time):
+
+        """ Updates the journal clock from a mission elapsed time fix. Between fixes the mission time is dead
+        reckoned from the system clock.
+        :param mission_time: the mission elapsed time in seconds
+        :type mission_time: float
+        :return: None
+        """
+
+        self._mission_time_at_sync = mission_time
+        self._clock_at_sync = time.monotonic()
+
+    def get_mission_time(self):
+        return self._mission_time_at_sync + (time.monotonic() - self._clock_at_sync)
+
+    def record(self, event_type, **fields):
+
+        """ Adds an event to the journal.
+        :param event_type: one of the event type constants in this module
+        :type event_type: int
+        :param fields: the event data
+        :return: None
+        """
+
+        payload = encode_fields(fields)
+        self.file.write(_RECORD_HEADER.pack(self.get_mission_time(), time.time(), event_type, len(payload)))
+        self.file.write(payload)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class JournalReader:
+
+    """ Reads a journal file. The record headers are indexed when the file is opened, so that queries only read the
+    records they need.
+    """
+
+    def __init__(self, filename):
+
+        """ Class constructor.
+        :param filename: the journal file to read
+        :type filename: str
+        :return: None
+        """
+
+        with open(filename, "rb") as journal_file:
+            self.data = journal_file.read()
+        if len(self.data) < _FILE_HEADER.size or _FILE_HEADER.unpack_from(self.data)[0] != MAGIC:
+            raise JournalFormatError("{} is not a basaGC journal".format(filename))
+
+        # index of event type: list of (mission time, unix time, payload offset, payload length)
+        self.index = {}
+        position = _FILE_HEADER.size
+        while position + _RECORD_HEADER.size <= len(self.data):
+            mission_time, unix_time, event_type, length = _RECORD_HEADER.unpack_from(self.data, position)
+            position += _RECORD_HEADER.size
+            self.index.setdefault(event_type, []).append((mission_time, unix_time, position, length))
+            position += length
+
+    def count(self, event_type=None):
+        if event_type is not None:
+            return len(self.index.get(event_type, []))
+        return sum(len(records) for records in self.index.values())
+
+    def events(self, event_types=None, start=None, end=None):
+
+        """ Returns the events matching the given filters, in time order.
+        :param event_types: the event types to return, or None for all
+        :type event_types: list of int
+        :param start: earliest mission time to return
+        :type start: float
+        :param end: latest mission time to return
+        :type end: float
+        :return: list of dicts containing event, mission_time and time, plus the event fields
+        :rtype: list
+        """
+
+        if event_types is None:
+            event_types = self.index.keys()
+        events = []
+        for event_type in event_types:
+            for mission_time, unix_time, offset, length in self.index.get(event_type, []):
+                if start is not None and not mission_time >= start:
+                    continue
+                if end is not None and not mission_time <= end:
+                    continue
+                event = {
+                    "event": EVENT_NAMES.get(event_type, str(event_type)),
+                    "mission_time": mission_time,
+                    "time": unix_time,
+                }
+                event.update(decode_fields(self.data[offset:offset + length]))
+                events.append(event)
+        events.sort(key=lambda event: event["time"])
+        return events
+
+
+def open_journal(filename=config.JOURNAL_FILE):
+
+    """ Opens the journal that record() writes to.
+    :param filename: the journal file to append to
+    :type filename: str
+    :return: None
+    """
+
+    global _journal
+    if _journal is None:
+        _journal = Journal(filename)
+
+
+def record(event_type, **fields):
+
+    """ Adds an event to the journal, if it is open.
+    :param event_type: one of the event type constants in this module
+    :type event_type: int
+    :param fields: the event data
+    :return: None
+    """
+
+    if _journal is not None:
+        _journal.record(event_type, **fields)
+
+
+def sync_mission_time(mission_time):
+    if _journal is not None:
+        _journal.sync_mission_time(mission_time)
+
+
+def flush():
+    if _journal is not None:
+        _journal.flush()
+
+
+def main(argv=None):
+
+    """ Command line tool to filter and export a journal. """
+
+    parser = argparse.ArgumentParser(description="Filter and export a basaGC event journal")
+    parser.add_argument("filename", help="journal file to read")
+    parser.add_argument("-e", "--event", nargs="+", choices=sorted(EVENT_TYPES), help="event types to export")
+    parser.add_argument("-s", "--start", type=float, help="earliest mission time (seconds)")
+    parser.add_argument("-n", "--end", type=float, help="latest mission time (seconds)")
+    parser.add_argument("-f", "--format", choices=["text", "csv", "json"], default="text", help="output format")
+    args = parser.parse_args(argv)
+
+    reader = JournalReader(args.filename)
+    event_types = [EVENT_TYPES[name] for name in args.event] if args.event else None
+    events = reader.events(event_types, args.start, args.end)
+
+    if args.format == "json":
+        # JSON has no NaN, an unknown mission time (or any other non finite value) is written as null
+        events = [{name: None if isinstance(value, float) and not math.isfinite(value) else value
+                   for name, value in event.items()} for event in events]
+        json.dump(events, sys.stdout, indent=1, allow_nan=False)
+        print()
+    elif args.format == "csv":
+        fieldnames = ["event", "mission_time", "time"]
+        for event in events:
+            fieldnames += [name for name in event if name not in fieldnames]
+        writer = csv.DictWriter(sys.stdout, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(events)
+    else:
+        for event in events:
+            fields = ", ".join("{}={}".format(name, value) for name, value in event.items()
+                               if name not in ["event", "mission_time", "time"])
+            print("{:>12.2f}  {:12}{}".format(event["mission_time"], event["event"], fields))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,21 @@
 import math
+import time
+from collections import deque
 
 
+import numpy as np
 from pudb import set_trace
+from PyQt5.QtCore import QTimer
 
-from basagc import config, telemachus, utils
-from basagc.config import TELEMACHUS_BODY_IDS
+from basagc import config, journal, orbital, telemachus, utils, vehicle
 from basagc.telemachus import get_telemetry
 
 if config.DEBUG:
     from pudb import set_trace  # lint:ok
 
 computer = None
+# celestial body name: orbital.Orbit
+body_orbits = {}
 
 class HohmannTransfer:
 
@@ -29,62 +34,29 @@ class HohmannTransfer:
         self.destination_altitude = 13500000 + self.radius
         self.grav_param = get_telemetry("body_gravParameter",
                                          body_number=config.TELEMACHUS_BODY_IDS[self.orbiting_body])
-        
-        self.orbital_period = get_telemetry("period")
-        self.departure_body_period = get_telemetry("body_period",
-                                                    body_number=config.TELEMACHUS_BODY_IDS["Kerbin"])
+
         self.first_burn = None
         self.second_burn = None
         self.target_id = config.TELEMACHUS_BODY_IDS[self.target_name]
 
+        self.solution = None
+        self.time_to_transfer = 0.0
         self.time_of_node = 0.0
         #self.time_of_second_node = 0.0
         self.duration_of_burn = 0
+        # (departure orbit, phase angle required, time of node) of the last node time solution
+        self.node_cache = None
 
-    def calculate_sma_transfer_ellipse(self):
-        
-        radius_departure_orbit = self.departure_altitude
-        radius_arrival_orbit = self.destination_altitude
-        sma = (radius_departure_orbit + radius_arrival_orbit) / 2
-        return sma
-
-    def calculate_velocity_initial(self):
-        
-        radius_departure_orbit = self.departure_altitude
-        vi = math.sqrt(self.grav_param / radius_departure_orbit)
-        return vi
-
-    def calculate_velocity_final(self):
-        radius_arrival_orbit = self.destination_altitude
-        vf = math.sqrt(self.grav_param / radius_arrival_orbit)
-        return vf
-
-    def calculate_velocity_initial_on_transfer_orbit(self):
-        radius_departure_orbit = self.departure_altitude
-        vtxi = math.sqrt(self.grav_param * ((2 / radius_departure_orbit) - (1 / self.calculate_sma_transfer_ellipse())))
-        return vtxi
-
-    def calculate_velocity_final_on_transfer_orbit(self):
-        radius_arrival_orbit = self.destination_altitude
-        vtxf = math.sqrt(self.grav_param * ((2 / radius_arrival_orbit) - (1 / self.calculate_sma_transfer_ellipse())))
-        return vtxf
-
-    def calculate_initial_delta_v(self):
-        return self.calculate_velocity_initial_on_transfer_orbit() - self.calculate_velocity_initial()
-
-    def calculate_final_delta_v(self):
-        return self.calculate_velocity_final() - self.calculate_velocity_final_on_transfer_orbit()
-
-    def calculate_total_delta_v(self):
-        return self.calculate_initial_delta_v() + self.calculate_final_delta_v()
-        
     def calculate_other_parameters(self):
-        utils.log("Initial velocity at start of transfer: {:.2f} m/s".format(self.calculate_velocity_initial()))
-        utils.log("Velocity on transfer orbit at initial orbit: {:.2f} m/s".format(self.calculate_velocity_initial_on_transfer_orbit()))
-        utils.log("Velocity on transfer orbit at final orbit: {:.2f} m/s".format(self.calculate_velocity_final_on_transfer_orbit()))
-        utils.log("Initial velocity change (delta-v): {:.2f} m/s".format(self.calculate_initial_delta_v()))
-        utils.log("Final velocity change (delta-v): {:.2f} m/s".format(self.calculate_final_delta_v()))
-        utils.log("Total chance in velocity (delta-v): {:.2f} m/s".format(self.calculate_total_delta_v()))
+        solution = self.solution
+        utils.log("Initial velocity at start of transfer: {:.2f} m/s".format(float(solution.velocity_departure)))
+        utils.log("Velocity on transfer orbit at initial orbit: {:.2f} m/s".format(
+            float(solution.transfer_velocity_departure)))
+        utils.log("Velocity on transfer orbit at final orbit: {:.2f} m/s".format(
+            float(solution.transfer_velocity_arrival)))
+        utils.log("Initial velocity change (delta-v): {:.2f} m/s".format(self.delta_v_1))
+        utils.log("Final velocity change (delta-v): {:.2f} m/s".format(self.delta_v_2))
+        utils.log("Total chance in velocity (delta-v): {:.2f} m/s".format(self.delta_v_1 + self.delta_v_2))
         utils.log()
             
     @staticmethod
@@ -105,13 +77,14 @@ class HohmannTransfer:
     def update_parameters(self):
 
         # update departure altitide
-        self.departure_altitude = get_telemetry("altitude")
+        self.departure_altitude = get_vessel_orbit(get_telemetry("universalTime")).sma
         self.calculate()
         self.calculate_burn_timings()
-        self.first_burn.delta_v = self.delta_v_1
+        self.first_burn.delta_v_required = self.delta_v_1
+        self.first_burn.node_delta_v = (0.0, 0.0, self.delta_v_1)
+        self.first_burn.burn_duration = self.duration_of_burn
         self.first_burn.time_of_ignition = self.time_of_ignition_first_burn
         self.first_burn.time_of_node = self.time_of_node
-        telemachus.update_maneuver_node(ut=self.time_of_node, delta_v=(0.0, 0.0, self.delta_v_1))
         if config.current_log_level == "DEBUG":
             self.print_maneuver_data()
 
@@ -121,143 +94,984 @@ class HohmannTransfer:
         utils.log("Hohmann Transfer Data:")
         utils.log("Delta-V required: {:.2f}".format(self.delta_v_1))
         utils.log("Phase angle required: {:.2f}".format(self.phase_angle_required))
+        utils.log("Time of node: {:.2f}".format(self.time_of_node))
         utils.log("Burn duration: {:.2f} seconds".format(self.duration_of_burn))
         utils.log("-" * 40)
 
     def execute(self):
+        if computer.add_burn(self.plan()):
+            computer.add_burn(self.second_burn)
+
+    def plan(self):
+
+        """ Calculates the transfer and creates the first burn and the insertion burn at the target (second_burn),
+        without loading them.
+        :return: the first burn
+        :rtype: Burn
+        """
 
         self.calculate()
-        time_to_node = HohmannTransfer.get_time_to_node(self.phase_angle_difference(),
-                                                                     self.orbital_period,
-                                                                     self.departure_body_period)
-        if time_to_node <= 120:
-            utils.log("Time of ignition less that 2 minutes in the future, starting burn during next orbit")
-            time_to_node += self.orbital_period
         self.calculate_burn_timings()
         self.first_burn = Burn(delta_v=self.delta_v_1,
                                direction="node",
                                time_of_ignition=self.time_of_ignition_first_burn,
                                time_of_node=self.time_of_node,
                                burn_duration=self.duration_of_burn,
+                               recalc_function=self.update_parameters,
+                               name="TMI",
                                )
+        # the insertion burn at the target is replanned from the actual trajectory once the vessel is in the
+        # target's sphere of influence
+        self.second_burn = OrbitInsertion(self.target_name).plan_deferred(
+            self.first_burn, self.time_of_node + self.time_to_transfer, self.delta_v_2)
         if config.current_log_level == "DEBUG":
             self.print_maneuver_data()
-        computer.add_burn(self.first_burn)
+        return self.first_burn
         #self.add_maneuver_node()
         #self.first_burn.execute()
 
-    def phase_angle_difference(self):
-        #set_trace()
-        current_phase_angle = get_telemetry("body_phaseAngle", body_number=self.target_id)
-        phase_angle_difference = current_phase_angle - self.phase_angle_required
-        #if phase_angle_difference < 0:
-            #phase_angle_difference = 180 + abs(phase_angle_difference)
-            #utils.log("Adding 180 degrees to phase angle difference")
-        utils.log()
-        utils.log("Current Phase Angle: {} degrees".format(current_phase_angle))
-        utils.log("Phase Angle Required: {} degrees".format(self.phase_angle_required))
-        utils.log("Phase Angle Difference: {} degrees".format(phase_angle_difference))
-        return phase_angle_difference
-        
     def calculate(self):
 
-        # determine correct phase angle
-        self.phase_angle_required = HohmannTransfer.calculate_phase_angle(
-            self.departure_altitude,
-            self.destination_altitude,
-            self.grav_param,
-        )
-
-        # determine delta-v for burns 1 and 2
-        self.delta_v_1, self.delta_v_2 = HohmannTransfer.calculate_delta_v(self.departure_altitude,
-                                                                   self.destination_altitude)
-
-        # calculate time to transfer
-        self.time_to_transfer = HohmannTransfer.time_to_transfer(self.departure_altitude,
-                                                 self.destination_altitude,
-                                                 self.grav_param)
+        # determine phase angle, delta-v for burns 1 and 2, and time to transfer in one pass
+        self.solution = orbital.hohmann(self.departure_altitude, self.destination_altitude, self.grav_param)
+        self.phase_angle_required = float(self.solution.phase_angle)
+        self.delta_v_1 = float(self.solution.delta_v_1)
+        self.delta_v_2 = float(self.solution.delta_v_2)
+        self.time_to_transfer = float(self.solution.time_of_flight)
 
         #self.time_of_second_node = self.time_of_node + self.time_to_transfer
 
     def calculate_burn_timings(self):
-        time_to_node = HohmannTransfer.get_time_to_node(self.phase_angle_difference(),
-                                                                     self.orbital_period,
-                                                                     self.departure_body_period)
+        self.duration_of_burn = plan_burn(self.delta_v_1).duration
+        self.time_of_node = self.get_time_of_node(get_telemetry("universalTime"))
+        self.time_of_ignition_first_burn = self.time_of_node - (self.duration_of_burn / 2)  # TIG
+
+    def get_time_of_node(self, universal_time):
+
+        """ Finds the time when the target reaches the required phase angle, propagating the vessel and target orbits.
+        The solution is kept until the vessel's orbit or the required phase angle changes, or the node has passed.
+        :param universal_time: the current universal time
+        :type universal_time: float
+        :return: universal time of the node
+        :rtype: float
+        """
+
+        departure_orbit = get_vessel_orbit(universal_time)
+        if self.node_cache:
+            cached_orbit, cached_phase_angle, time_of_node = self.node_cache
+            if (cached_orbit == departure_orbit and cached_phase_angle == self.phase_angle_required and
+                    time_of_node > universal_time):
+                return time_of_node
+
+        target_orbit = get_body_orbit(self.target_name, universal_time)
+        earliest_node = universal_time + config.MINIMUM_TIME_TO_IGNITION + (self.duration_of_burn / 2)
+        time_of_node = orbital.solve_phase_angle_time(departure_orbit, target_orbit, self.phase_angle_required,
+                                                      earliest_node)
+        if time_of_node is None:
+            utils.log("Phase angle to {} is not changing, setting node at earliest time of ignition".format(
+                self.target_name), log_level="WARNING")
+            time_of_node = earliest_node
+        self.node_cache = (departure_orbit, self.phase_angle_required, time_of_node)
+        return time_of_node
+
+
+class TransferWindow:
+
+    """ Finds the lowest delta-v transfer to a target by evaluating a grid of departure times and times of flight (a
+    porkchop plot) with a Lambert solver. Targets orbiting the body the vessel orbits get a burn from the vessel's
+    orbit. For targets orbiting the same body as the vessel's body (eg Duna from Kerbin orbit) the window is found
+    between the two bodies' orbits, and the departure delta-v is the hyperbolic excess velocity.
+    """
+
+    def __init__(self, target_name):
+
+        """ Class constructor.
+        :param target_name: the name of the target body, must be in config.TELEMACHUS_BODY_IDS
+        :type target_name: str
+        :return: None
+        """
+
+        self.target_name = target_name
+        self.orbiting_body = get_telemetry("body")
+        self.is_interplanetary = False
+        self.solution = None
+        self.time_of_departure = 0.0
+        self.time_of_flight = 0.0
+        self.departure_delta_v = 0.0
+        self.arrival_delta_v = 0.0
+        self.departure_velocity_change = None
+        self.departure_orbit = None
+
+    def get_orbits(self, universal_time):
+
+        """ Gets the departure and target orbits from telemetry.
+        :param universal_time: the current universal time
+        :type universal_time: float
+        :return: departure orbit and target orbit, or None if there is no transfer to the target from here
+        :rtype: tuple of orbital.Orbit | None
+        """
+
+        target_parent = config.BODY_PARENTS.get(self.target_name)
+        if target_parent is None or self.target_name == self.orbiting_body:
+            return None
+        if target_parent == self.orbiting_body:
+            departure_orbit = get_vessel_orbit(universal_time)
+        elif target_parent == config.BODY_PARENTS.get(self.orbiting_body):
+            departure_orbit = get_body_orbit(self.orbiting_body, universal_time)
+            self.is_interplanetary = True
+        else:
+            return None
+        return departure_orbit, get_body_orbit(self.target_name, universal_time)
+
+    def search(self):
+
+        """ Searches for the transfer window, from the earliest allowed time of ignition through one synodic
+        period, with times of flight around the Hohmann transfer time.
+        :return: True if a window was found, False if there is no transfer to the target from here
+        :rtype: bool
+        """
+
+        now = get_telemetry("universalTime")
+        orbits = self.get_orbits(now)
+        if orbits is None:
+            return False
+        self.departure_orbit, target_orbit = orbits
+
+        departure_period = orbital.orbital_period(self.departure_orbit)
+        target_period = orbital.orbital_period(target_orbit)
+        synodic_period = 1 / abs(1 / departure_period - 1 / target_period)
+        earliest_departure = now + config.MINIMUM_TIME_TO_IGNITION
+        departure_times = np.linspace(earliest_departure, earliest_departure + synodic_period,
+                                      config.TRANSFER_WINDOW_DEPARTURE_STEPS)
+        hohmann_time = float(orbital.hohmann(self.departure_orbit.sma, target_orbit.sma,
+                                             self.departure_orbit.grav_param).time_of_flight)
+        flight_times = np.linspace(0.5 * hohmann_time, 1.5 * hohmann_time, config.TRANSFER_WINDOW_FLIGHT_TIME_STEPS)
+
+        self.solution = orbital.porkchop(self.departure_orbit, target_orbit, departure_times, flight_times)
+        if self.solution.best is None:
+            return False
+        departure_index, flight_time_index = self.solution.best
+        self.time_of_departure = float(departure_times[departure_index])
+        self.time_of_flight = float(flight_times[flight_time_index])
+        self.departure_delta_v = float(self.solution.departure_delta_v[self.solution.best])
+        self.arrival_delta_v = float(self.solution.arrival_delta_v[self.solution.best])
+        self.departure_velocity_change = self.solution.departure_velocity_change
+
+        utils.log("-" * 40)
+        utils.log("Transfer window to {}:".format(self.target_name))
+        utils.log("Departure in {:.0f} seconds".format(self.time_of_departure - now))
+        utils.log("Time of flight: {:.0f} seconds".format(self.time_of_flight))
+        utils.log("Departure delta-v: {:.2f} m/s".format(self.departure_delta_v))
+        utils.log("Arrival delta-v: {:.2f} m/s".format(self.arrival_delta_v))
+        utils.log("-" * 40)
+        return True
+
+    def get_node_delta_v(self):
+
+        """ Returns the departure velocity change in maneuver node components.
+        :return: radial, normal and prograde delta-v
+        :rtype: tuple of float
+        """
+
+        position, velocity = orbital.orbit_state(self.departure_orbit, self.time_of_departure)
+        radial, normal, prograde = orbital.node_frame(position, velocity)
+        change = self.departure_velocity_change
+        return float(change @ radial), float(change @ normal), float(change @ prograde)
+
+    def create_burn(self):
+
+        """ Creates the departure burn.
+        :return: the burn
+        :rtype: Burn
+        """
+
+        burn_duration = plan_burn(self.departure_delta_v).duration
+        return Burn(delta_v=self.departure_delta_v,
+                    direction="node",
+                    time_of_ignition=self.time_of_departure - burn_duration / 2,
+                    time_of_node=self.time_of_departure,
+                    burn_duration=burn_duration,
+                    node_delta_v=self.get_node_delta_v(),
+                    name="TRANSFER",
+                    )
+
+
+class NodeManeuver:
+
+    """ Base class for single burn maneuvers at a node found by searching the candidate node locations on the
+    vessel's orbit. Subclasses implement search(). The search is cheap, so update_parameters() reruns it as the orbit
+    evolves.
+    """
+
+    # name of the burns, a queued burn is replaced when the maneuver is planned again
+    name = None
+
+    def __init__(self):
+        self.time_of_node = 0.0
+        self.node_delta_v = (0.0, 0.0, 0.0)
+        self.delta_v = 0.0
+        self.duration_of_burn = 0.0
+        self.burn = None
+
+    def search(self, orbit, earliest_time):
+
+        """ Finds the cheapest node, setting time_of_node, node_delta_v and delta_v.
+        :param orbit: the vessel's orbit
+        :type orbit: orbital.Orbit
+        :param earliest_time: the earliest time of the node
+        :type earliest_time: float
+        :return: None
+        """
+
+        raise NotImplementedError
+
+    def calculate(self):
+        universal_time = get_telemetry("universalTime")
+        orbit = get_vessel_orbit(universal_time)
+        earliest_ignition = universal_time + config.MINIMUM_TIME_TO_IGNITION
+        self.search(orbit, earliest_ignition)
+        self.duration_of_burn = plan_burn(self.delta_v).duration
+        if self.time_of_node - (self.duration_of_burn / 2) < earliest_ignition:
+            utils.log("Time of ignition less that 2 minutes in the future, starting burn during next orbit")
+            self.time_of_node += float(orbital.orbital_period(orbit))
+
+    def plan(self):
+
+        """ Calculates the maneuver and creates the burn, without loading it.
+        :return: the burn
+        :rtype: Burn
+        """
+
+        self.calculate()
+        self.burn = Burn(delta_v=self.delta_v,
+                         direction="node",
+                         time_of_ignition=self.time_of_node - (self.duration_of_burn / 2),
+                         time_of_node=self.time_of_node,
+                         burn_duration=self.duration_of_burn,
+                         recalc_function=self.update_parameters,
+                         node_delta_v=self.node_delta_v,
+                         name=self.name,
+                         )
+        return self.burn
+
+    def update_parameters(self):
+        if self.calculate() is False:
+            return False
+        self.burn.delta_v_required = self.delta_v
+        self.burn.node_delta_v = self.node_delta_v
+        self.burn.burn_duration = self.duration_of_burn
+        self.burn.time_of_node = self.time_of_node
+        self.burn.time_of_ignition = self.time_of_node - (self.duration_of_burn / 2)
+
+
+class PlaneChange(NodeManeuver):
+
+    """ Changes the inclination of the vessel's orbit, at whichever of the ascending or descending node is cheaper.
+    """
+
+    name = "PLANE"
+
+    def __init__(self, inclination):
+
+        """ Class constructor.
+        :param inclination: the new inclination (degrees)
+        :type inclination: float
+        :return: None
+        """
+
+        super().__init__()
+        self.inclination = inclination
+
+    def search(self, orbit, earliest_time):
+        times, node_delta_v, delta_v = orbital.plane_change(orbit, np.radians(self.inclination), earliest_time)
+        index = int(np.argmin(delta_v))
+        utils.log("Plane change at {} node: {:.1f} m/s".format(("ascending", "descending")[index], delta_v[index]))
+        self.time_of_node = float(times[index])
+        self.node_delta_v = tuple(float(component) for component in node_delta_v[index])
+        self.delta_v = float(delta_v[index])
+
+
+class OrbitChange(NodeManeuver):
+
+    """ Changes the apoapsis and periapsis of the vessel's orbit with two burns at apsides. The sequence with the
+    least total delta-v is chosen, and its first burn is planned; run the program again after the first burn for the
+    second one.
+    """
+
+    name = "APSIS"
+
+    def __init__(self, apoapsis_altitude, periapsis_altitude):
+
+        """ Class constructor.
+        :param apoapsis_altitude: the new apoapsis altitude (m)
+        :type apoapsis_altitude: float
+        :param periapsis_altitude: the new periapsis altitude (m)
+        :type periapsis_altitude: float
+        :return: None
+        """
+
+        super().__init__()
+        body_radius = get_telemetry("body_radius", body_number=config.TELEMACHUS_BODY_IDS[get_telemetry("body")])
+        apoapsis_radius = apoapsis_altitude + body_radius
+        periapsis_radius = periapsis_altitude + body_radius
+        self.apoapsis_radius = max(apoapsis_radius, periapsis_radius)
+        self.periapsis_radius = min(apoapsis_radius, periapsis_radius)
+        self.total_delta_v = 0.0
+
+    def search(self, orbit, earliest_time):
+        times, first_delta_v, total_delta_v = orbital.apsis_change(orbit, self.apoapsis_radius,
+                                                                   self.periapsis_radius, earliest_time)
+        burn_index, radius_index = np.unravel_index(np.argmin(total_delta_v), total_delta_v.shape)
+        utils.log("Orbit change starting at {}, setting {} first: {:.1f} m/s total".format(
+            ("periapsis", "apoapsis")[burn_index], ("apoapsis", "periapsis")[radius_index],
+            total_delta_v[burn_index, radius_index]))
+        self.time_of_node = float(times[burn_index])
+        self.delta_v = abs(float(first_delta_v[burn_index, radius_index]))
+        self.node_delta_v = (0.0, 0.0, float(first_delta_v[burn_index, radius_index]))
+        self.total_delta_v = float(total_delta_v[burn_index, radius_index])
+
+
+class OrbitInsertion(NodeManeuver):
+
+    """ Orbit insertion into a circular orbit at the periapsis of the trajectory, eg Mun orbit insertion (MOI) after
+    entering the Mun's sphere of influence. The periapsis state is predicted from the vessel's orbit (hyperbolic while
+    approaching the body), and the burn is only rebuilt when the state vector has been refixed, eg after a midcourse
+    correction.
+    """
+
+    name = "MOI"
+
+    def __init__(self, body=None):
+
+        """ Class constructor.
+        :param body: the body to insert into orbit around. If given, the burn can only be calculated once the vessel
+                     is in its sphere of influence
+        :type body: str | None
+        :return: None
+        """
+
+        super().__init__()
+        self.body = body
+        # the vessel orbit the burn was calculated from
+        self.trajectory = None
+        self.periapsis_radius = 0.0
+
+    def calculate(self):
+        if self.body and get_telemetry("body") != self.body:
+            return False
+        universal_time = get_telemetry("universalTime")
+        orbit = get_vessel_orbit(universal_time)
+        if orbit == self.trajectory:
+            return
+        self.search(orbit, universal_time + config.MINIMUM_TIME_TO_IGNITION)
+        self.duration_of_burn = plan_burn(self.delta_v).duration
+        self.trajectory = orbit
+
+    def search(self, orbit, earliest_time):
+        self.time_of_node = earliest_time + float(orbital.time_to_periapsis(orbit, earliest_time))
+        position, velocity = orbital.orbit_state(orbit, self.time_of_node)
+        self.periapsis_radius = float(np.linalg.norm(position))
+        circular_speed = math.sqrt(orbit.grav_param / self.periapsis_radius)
+        self.delta_v = float(np.linalg.norm(velocity)) - circular_speed
+        self.node_delta_v = (0.0, 0.0, -self.delta_v)
+        utils.log("Orbit insertion at periapsis radius {:.0f} m: {:.1f} m/s".format(self.periapsis_radius,
+                                                                                   self.delta_v))
+
+    def plan(self):
+
+        """ Calculates the maneuver and creates the burn, without loading it.
+        :return: the burn, or None if periapsis is less than config.MINIMUM_TIME_TO_IGNITION away
+        :rtype: Burn | None
+        """
+
+        self.calculate()
+        if self.time_of_node - (self.duration_of_burn / 2) < get_telemetry("universalTime") + \
+                config.MINIMUM_TIME_TO_IGNITION:
+            utils.log("Periapsis too close for orbit insertion", log_level="WARNING")
+            return None
+        return super().plan()
+
+    def plan_deferred(self, depends_on, time_of_node, delta_v):
+
+        """ Creates the burn from an estimate, before the vessel is on the trajectory to the body. The burn is stale,
+        so it is replanned before it is executed.
+        :param depends_on: the burn that puts the vessel on the trajectory
+        :type depends_on: Burn
+        :param time_of_node: estimated time of periapsis (s)
+        :type time_of_node: float
+        :param delta_v: estimated delta-v (m/s)
+        :type delta_v: float
+        :return: the burn
+        :rtype: Burn
+        """
+
+        self.time_of_node = time_of_node
+        self.delta_v = delta_v
+        self.node_delta_v = (0.0, 0.0, -delta_v)
+        self.duration_of_burn = plan_burn(delta_v).duration
+        self.burn = Burn(delta_v=self.delta_v,
+                         direction="node",
+                         time_of_ignition=self.time_of_node - (self.duration_of_burn / 2),
+                         time_of_node=self.time_of_node,
+                         burn_duration=self.duration_of_burn,
+                         recalc_function=self.update_parameters,
+                         node_delta_v=self.node_delta_v,
+                         name=self.name,
+                         depends_on=depends_on,
+                         )
+        self.burn.is_stale = True
+        return self.burn
+
+
+class CoellipticRendezvous:
+
+    """ Rendezvous with a target vessel by the coelliptic sequence, in three burns:
+    - CSI (coelliptic sequence initiation), horizontal, at an apsis
+    - CDH (constant delta height) half an orbit later, making the orbit coelliptic with the target's
+    - TPI (terminal phase initiation) when the target is config.RENDEZVOUS_TPI_ELEVATION degrees above the horizon,
+      intercepting it config.RENDEZVOUS_TPI_TRANSFER_ANGLE degrees of target travel later
+    The CSI burn is iterated until TPI comes config.RENDEZVOUS_TPI_DELAY orbits after CSI; if there is no solution
+    CSI waits for a later apsis. The terminal phase braking is flown manually.
+    """
+
+    BURN_NAMES = ("CSI", "CDH", "TPI")
+
+    def __init__(self):
+        self.target_orbit = None
+        # universal times of CSI, CDH and TPI
+        self.times = [None, None, None]
+        self.node_delta_v = [(0.0, 0.0, 0.0)] * 3
+        self.delta_v = [0.0] * 3
+        self.durations = [0.0] * 3
+        self.delta_height = 0.0
+        # velocity relative to the target at intercept, to be braked
+        self.intercept_velocity = 0.0
+        # TPI time the CSI burn is targeted for
+        self.required_tpi_time = None
+        self.burns = []
+
+    @staticmethod
+    def check_orbital_parameters():
+
+        """ Checks the target can be rendezvoused with: it must orbit the same body, in (nearly) the same plane.
+        :return: True, or (False, alarm code)
+        """
 
-        self.time_of_node = get_telemetry("universalTime") + time_to_node
+        if get_telemetry("target_orbitingBody") != get_telemetry("body"):
+            return (False, 223)
+        if abs(get_telemetry("target_inclination") - get_telemetry("inclination")) > 1:
+            return (False, 225)
+        return True
+
+    def get_stage(self):
+
+        """ Returns the index of the first burn that hasn't been executed yet. Must be called on the GUI thread.
+        :return: 0 for CSI, 1 for CDH, 2 for TPI, 3 when all burns are done
+        :rtype: int
+        """
+
+        for index, burn in enumerate(self.burns):
+            if computer.is_burn_queued(burn):
+                return index
+        return len(self.burns)
+
+    def solve(self, stage=0):
+
+        """ Targets the burns from stage on. The first solve picks the CSI time, later ones keep it and the times of
+        burns already executed.
+        :param stage: index of the first burn to target
+        :type stage: int
+        :return: True if a solution was found
+        :rtype: bool
+        """
+
+        universal_time = get_telemetry("universalTime")
+        orbit = get_vessel_orbit(universal_time)
+        target_orbit = get_target_orbit(universal_time)
+        elevation = math.radians(config.RENDEZVOUS_TPI_ELEVATION)
+        times = list(self.times)
+        delta_v = [None, None, None]
+        states = [None, None, None]
+
+        if stage == 0:
+            solution = self._solve_csi(orbit, target_orbit, universal_time, elevation)
+            if solution is None:
+                return False
+            times[0], times[1], times[2], states[0], delta_v[0], coelliptic = solution
+        if stage <= 1:
+            if stage == 1:
+                position, velocity = orbital.orbit_state(orbit, universal_time)
+                coelliptic = orbital.coelliptic_sequence(position, velocity, universal_time, target_orbit, elevation,
+                                                         cdh_time=times[1])
+            times[2] = float(coelliptic.tpi_time)
+            states[1] = (coelliptic.cdh_position, coelliptic.cdh_velocity)
+            delta_v[1] = coelliptic.cdh_delta_v
+            delta_height = float(coelliptic.delta_height)
+            position, velocity = orbital.propagate(coelliptic.cdh_position,
+                                                   coelliptic.cdh_velocity + coelliptic.cdh_delta_v,
+                                                   times[2] - times[1], orbit.grav_param)
+        else:
+            position, velocity = orbital.orbit_state(orbit, universal_time)
+            times[2] = float(orbital.elevation_time(position, velocity, universal_time, target_orbit, elevation,
+                                                    orbital.orbital_period(orbit)))
+            position, velocity = orbital.propagate(position, velocity, times[2] - universal_time, orbit.grav_param)
+            delta_height = self.delta_height
+        if math.isnan(times[2]):
+            utils.log("Target doesn't reach the TPI elevation angle within an orbit", log_level="WARNING")
+            return False
+        transfer_time = config.RENDEZVOUS_TPI_TRANSFER_ANGLE / 360 * float(orbital.orbital_period(target_orbit))
+        delta_v[2], intercept_velocity = orbital.intercept(position, velocity, times[2], target_orbit, transfer_time)
+        states[2] = (position, velocity)
+
+        node_delta_v = list(self.node_delta_v)
+        magnitudes = list(self.delta_v)
+        durations = list(self.durations)
+        for index in range(stage, 3):
+            node_delta_v[index] = tuple(float(np.dot(delta_v[index], axis))
+                                        for axis in orbital.node_frame(*states[index]))
+            magnitudes[index] = float(np.linalg.norm(delta_v[index]))
+            durations[index] = plan_burn(magnitudes[index]).duration
+        self.target_orbit = target_orbit
+        self.times = times
+        self.node_delta_v = node_delta_v
+        self.delta_v = magnitudes
+        self.durations = durations
+        self.delta_height = delta_height
+        self.intercept_velocity = float(np.linalg.norm(intercept_velocity))
+        for index in range(stage, 3):
+            utils.log("{} in {:.0f} s: {:.1f} m/s".format(self.BURN_NAMES[index], times[index] - universal_time,
+                                                         magnitudes[index]), log_level="DEBUG")
+        return True
+
+    def _solve_csi(self, orbit, target_orbit, universal_time, elevation):
+
+        """ Finds the CSI burn, waiting for later apsides until there is a solution.
+        :return: times of CSI, CDH and TPI, the state vector at CSI, the CSI velocity change and the coelliptic
+                 sequence after it, or None if there is no solution within config.RENDEZVOUS_MAX_PHASING_ORBITS
+        """
+
+        period = float(orbital.orbital_period(orbit))
+        if self.times[0] is None:
+            earliest_ignition = universal_time + config.MINIMUM_TIME_TO_IGNITION
+            time_of_csi = earliest_ignition + float(np.min(orbital.time_to_true_anomaly(orbit, np.array([0.0, np.pi]),
+                                                                                        earliest_ignition)))
+            phasing_orbits = range(config.RENDEZVOUS_MAX_PHASING_ORBITS + 1)
+        else:
+            # retargeting, keep the CSI and TPI times
+            time_of_csi = self.times[0]
+            phasing_orbits = [0]
+        for phasing_orbit in phasing_orbits:
+            csi_time = time_of_csi + phasing_orbit * period
+            if self.times[0] is None:
+                required_tpi_time = csi_time + config.RENDEZVOUS_TPI_DELAY * period
+            else:
+                required_tpi_time = self.required_tpi_time
+            position, velocity = orbital.orbit_state(orbit, csi_time)
+            csi_delta_v = orbital.solve_csi(position, velocity, csi_time, target_orbit, elevation, required_tpi_time,
+                                            config.RENDEZVOUS_MAX_CSI_DELTA_V)
+            if csi_delta_v is None:
+                continue
+            horizontal = np.cross(np.cross(position, velocity), position)
+            velocity_change = csi_delta_v * horizontal / np.linalg.norm(horizontal)
+            coelliptic = orbital.coelliptic_sequence(position, velocity + velocity_change, csi_time, target_orbit,
+                                                     elevation)
+            self.required_tpi_time = required_tpi_time
+            return (csi_time, float(coelliptic.cdh_time), float(coelliptic.tpi_time), (position, velocity),
+                    velocity_change, coelliptic)
+        utils.log("No coelliptic rendezvous solution", log_level="WARNING")
+        return None
+
+    def plan(self):
+
+        """ Solves the rendezvous and creates its burns, without loading them.
+        :return: the CSI, CDH and TPI burns, or None if there is no solution
+        :rtype: list of Burn
+        """
+
+        if not self.solve():
+            return None
+        self.burns = []
+        for index in range(3):
+            self.burns.append(Burn(delta_v=self.delta_v[index],
+                                   direction="node",
+                                   time_of_ignition=self.times[index] - self.durations[index] / 2,
+                                   time_of_node=self.times[index],
+                                   burn_duration=self.durations[index],
+                                   recalc_function=self.update_parameters,
+                                   node_delta_v=self.node_delta_v[index],
+                                   name=self.BURN_NAMES[index],
+                                   depends_on=self.burns[-1] if self.burns else None,
+                                   ))
+        return self.burns
+
+    def apply(self, stage):
+
+        """ Copies the latest solution into the burns from stage on.
+        :param stage: index of the first burn to update
+        :type stage: int
+        :return: None
+        """
+
+        for index in range(stage, len(self.burns)):
+            burn = self.burns[index]
+            burn.delta_v_required = self.delta_v[index]
+            burn.node_delta_v = self.node_delta_v[index]
+            burn.burn_duration = self.durations[index]
+            burn.time_of_node = self.times[index]
+            burn.time_of_ignition = self.times[index] - self.durations[index] / 2
+            if computer.is_burn_queued(burn):
+                burn.update_maneuver_node()
+        computer.reorder_burns()
+
+    def update_parameters(self):
+        stage = self.get_stage()
+        if stage >= len(self.burns) or not self.solve(stage):
+            return False
+        self.apply(stage)
+
+
+def get_vessel_orbit(universal_time, from_telemetry=False):
+
+    """ Gets the vessel's orbit, from the computer's state vector while coasting or burning, otherwise from
+    telemetry.
+    :param universal_time: the universal time the telemetry is for
+    :type universal_time: float
+    :param from_telemetry: if True always read telemetry
+    :type from_telemetry: bool
+    :rtype: orbital.Orbit
+    """
+
+    if not from_telemetry and computer:
+        state_vector = computer.get_current_state_vector()
+        if state_vector:
+            return state_vector.orbit
+    body_id = config.TELEMACHUS_BODY_IDS[get_telemetry("body")]
+    return orbital.orbit_from_elements(
+        sma=get_telemetry("sma"),
+        eccentricity=get_telemetry("eccentricity"),
+        inclination=get_telemetry("inclination"),
+        lan=get_telemetry("lan"),
+        argument_of_periapsis=get_telemetry("argumentOfPeriapsis"),
+        true_anomaly=get_telemetry("trueAnomaly"),
+        epoch=universal_time,
+        grav_param=get_telemetry("body_gravParameter", body_number=body_id),
+    )
+
+
+def get_body_orbit(body_name, universal_time):
+
+    """ Gets the orbit of a celestial body from telemetry. Celestial bodies are on rails, so their orbits are only read
+    once.
+    :param body_name: the name of the body
+    :type body_name: str
+    :param universal_time: the universal time the telemetry is for
+    :type universal_time: float
+    :rtype: orbital.Orbit
+    """
+
+    if body_name in body_orbits:
+        return body_orbits[body_name]
+    body_id = config.TELEMACHUS_BODY_IDS[body_name]
+    parent_id = config.TELEMACHUS_BODY_IDS[config.BODY_PARENTS[body_name]]
+    body_orbits[body_name] = orbital.orbit_from_elements(
+        sma=get_telemetry("body_sma", body_number=body_id),
+        eccentricity=get_telemetry("body_eccentricity", body_number=body_id),
+        inclination=get_telemetry("body_inclination", body_number=body_id),
+        lan=get_telemetry("body_lan", body_number=body_id),
+        argument_of_periapsis=get_telemetry("body_argumentOfPeriapsis", body_number=body_id),
+        true_anomaly=get_telemetry("body_trueAnomaly", body_number=body_id),
+        epoch=universal_time,
+        grav_param=get_telemetry("body_gravParameter", body_number=parent_id),
+    )
+    return body_orbits[body_name]
+
+
+def get_target_orbit(universal_time):
+
+    """ Gets the orbit of the targeted vessel from telemetry.
+    :param universal_time: the universal time the telemetry is for
+    :type universal_time: float
+    :rtype: orbital.Orbit
+    """
+
+    body_id = config.TELEMACHUS_BODY_IDS[get_telemetry("target_orbitingBody")]
+    return orbital.orbit_from_elements(
+        sma=get_telemetry("target_sma"),
+        eccentricity=get_telemetry("target_eccentricity"),
+        inclination=get_telemetry("target_inclination"),
+        lan=get_telemetry("target_lan"),
+        argument_of_periapsis=get_telemetry("target_argumentOfPeriapsis"),
+        true_anomaly=get_telemetry("target_trueAnomaly"),
+        epoch=universal_time,
+        grav_param=get_telemetry("body_gravParameter", body_number=body_id),
+    )
+
+
+def get_vehicle():
+
+    """ Gets the vehicle model: computer.vehicle if a staged vehicle has been loaded, otherwise a single stage made
+    from the mass, thrust and specific impulse entered in nouns 25, 31 and 38, and the dry mass in noun 26.
+    :return: the vehicle, or None if the stage data hasn't been entered
+    :rtype: tuple of vehicle.Stage | None
+    """
+
+    if computer.vehicle:
+        return computer.vehicle
+    try:
         initial_mass = float(computer.noun_data["25"][0] + "." + computer.noun_data["25"][1])
         thrust = float(computer.noun_data["31"][0] + "." + computer.noun_data["31"][1])
         specific_impulse = float(computer.noun_data["38"][0])
-        self.duration_of_burn = calc_burn_duration(initial_mass, thrust, specific_impulse, self.delta_v_1)
-        self.time_of_ignition_first_burn = self.time_of_node - (self.duration_of_burn / 2)  # TIG
-    
-    @staticmethod
-    def get_time_to_node(phase_angle_difference, orbital_period, departure_orbital_period):
-        tig = phase_angle_difference / ((360 / orbital_period) - (360 / departure_orbital_period))
-        if tig < 0:
-            utils.log("Setting node at next orbit")
-            tig += orbital_period
-        return tig
-        
-    @staticmethod
-    def time_to_transfer(departure_orbit, destination_orbit, grav_param):
+        dry_mass = float(computer.noun_data["26"][0] + "." + computer.noun_data["26"][1])
+    except (KeyError, ValueError):
+        return None
+    if initial_mass <= 0 or thrust <= 0 or specific_impulse <= 0:
+        return None
+    if not 0 < dry_mass < initial_mass:
+        dry_mass = None
+    return vehicle.single_stage(initial_mass, thrust, specific_impulse, dry_mass)
+
+
+def get_propulsion_parameters():
+
+    """ Gets the mass, thrust and specific impulse of the first stage of the vehicle.
+    :return: initial mass (t), thrust (kN) and specific impulse (s), or None if they haven't been entered
+    :rtype: tuple of float | None
+    """
+
+    stages = get_vehicle()
+    if not stages:
+        return None
+    return stages[0].mass, stages[0].thrust, stages[0].specific_impulse
+
+
+def plan_burn(delta_v):
+
+    """ Plans a burn with the vehicle model. Plans are cached by vehicle and delta-v, so only new plans are logged.
+    :param delta_v: delta-v required (m/s)
+    :type delta_v: float
+    :return: the burn plan
+    :rtype: vehicle.BurnPlan
+    :raises vehicle.VehicleNotLoaded: if no vehicle has been uplinked and the stage data hasn't been entered
+    """
+
+    stages = get_vehicle()
+    if stages is None:
+        raise vehicle.VehicleNotLoaded
+    misses = vehicle.plan_burn.cache_info().misses
+    plan = vehicle.plan_burn(stages, delta_v)
+    if vehicle.plan_burn.cache_info().misses != misses:
+        utils.log("Burn of {:.1f} m/s: {:.1f} seconds, {} staging events, {:.1f} m/s left".format(
+            delta_v, plan.duration, len(plan.staging_times), plan.residual_delta_v), log_level="DEBUG")
+        if plan.residual_delta_v < 0:
+            utils.log("Vehicle is {:.1f} m/s short of a {:.1f} m/s burn".format(-plan.residual_delta_v, delta_v),
+                      log_level="WARNING")
+    return plan
+
+
+class CutoffPredictor:
+
+    """ Predicts when a burn reaches its cutoff velocity. The acceleration is modelled from the thrust and the mass,
+    which falls as propellant is burnt, and the model is corrected by the acceleration measured from the velocity
+    samples. Without propulsion parameters only the measured acceleration is used.
+    """
+
+    # limits on the correction of the modelled acceleration, to ride out bad samples
+    MINIMUM_CORRECTION = 0.5
+    MAXIMUM_CORRECTION = 2.0
+
+    def __init__(self, velocity_at_cutoff, start_time, propulsion_parameters=None, window=config.BURN_SAMPLE_WINDOW):
+
+        """ Class constructor.
+        :param velocity_at_cutoff: the velocity to cut off at (m/s)
+        :type velocity_at_cutoff: float
+        :param start_time: time of ignition (s, time.monotonic())
+        :type start_time: float
+        :param propulsion_parameters: initial mass (t), thrust (kN) and specific impulse (s)
+        :type propulsion_parameters: tuple of float | None
+        :param window: number of samples to measure the acceleration over
+        :type window: int
+        :return: None
         """
-        Calculates the time to transfer from one orbit to another,
-        :param departure_orbit: departure orbit altitude
-        :param destination_orbit: destination orbit altitude
-        :param grav_param: orbiting body gravitational parameter
-        :return: a float in seconds of the time to transfer
+
+        self.velocity_at_cutoff = velocity_at_cutoff
+        self.samples = deque(maxlen=window)
+        self.throttle = 1.0
+        self.correction = 1.0
+        if propulsion_parameters:
+            self.mass, self.thrust, specific_impulse = propulsion_parameters
+            self.mass_flow = self.thrust / (specific_impulse * 9.81)  # t/s
+        else:
+            self.mass = self.thrust = self.mass_flow = None
+        self.mass_time = start_time
+
+    def set_throttle(self, throttle, effect_time):
+
+        """ Records a throttle change. The samples from before the change are discarded.
+        :param throttle: the new throttle setting, 0 to 1
+        :type throttle: float
+        :param effect_time: when the change takes effect (s, time.monotonic())
+        :type effect_time: float
+        :return: None
         """
-        tH = math.pi * math.sqrt(math.pow(departure_orbit + destination_orbit, 3) / (8 * grav_param))
-        return tH
 
-    @staticmethod
-    def calculate_phase_angle(departure_orbit, destination_orbit, grav_param):
-        """ Calculates the required phase angle for transfer.
-        :param departure_orbit: departure orbit altitude
-        :param destination_orbit: destination orbit altitude
-        :param grav_param: orbiting body gravitational parameter
-        :return: the required phase angle
-        """
-        #departure_planet_radius = get_telemetry("body_radius", body_number=TELEMACHUS_BODY_IDS["Kerbin"])
-        #departure_orbit += departure_planet_radius
-        #destination_orbit += departure_planet_radius
-        tH = HohmannTransfer.time_to_transfer(departure_orbit, destination_orbit, grav_param)
-        required_phase_angle = 180 - math.sqrt(grav_param / destination_orbit) * (tH / destination_orbit) * 180 / math.pi
-        return required_phase_angle
+        if self.mass is not None:
+            self.mass = self.get_mass(effect_time)
+            self.mass_time = effect_time
+        self.throttle = throttle
+        self.samples.clear()
 
-    @staticmethod
-    def calculate_delta_v(departure_altitude, destination_altitude, departure_body="Kerbin"):
+    def add_sample(self, sample_time, velocity):
+        self.samples.append((sample_time, velocity))
+
+    def get_mass(self, sample_time):
+        return self.mass - self.throttle * self.mass_flow * (sample_time - self.mass_time)
+
+    def get_model_acceleration(self, sample_time):
+        if self.mass is None:
+            return None
+        return self.throttle * self.thrust / self.get_mass(sample_time)
+
+    def get_measured_acceleration(self):
+
+        """ Measures the acceleration with a least squares fit to the velocity samples.
+        :return: the acceleration (m/s^2), or None if there aren't enough samples yet
+        :rtype: float | None
+        """
+
+        if len(self.samples) < 3:
+            return None
+        times, velocities = zip(*self.samples)
+        mean_time = sum(times) / len(times)
+        mean_velocity = sum(velocities) / len(velocities)
+        variance = sum((sample_time - mean_time) ** 2 for sample_time in times)
+        if variance == 0:
+            return None
+        return sum((sample_time - mean_time) * (velocity - mean_velocity)
+                   for sample_time, velocity in self.samples) / variance
+
+    def get_acceleration(self):
+
+        """ Estimates the acceleration at the latest sample.
+        :return: the acceleration (m/s^2), or None if it can't be estimated yet
+        :rtype: float | None
         """
-        Given a circular orbit at altitude departure_altitude and a target orbit at altitude
-        destination_altitude, return the delta-V budget of the two burns required for a Hohmann
-        transfer.
-    
-        departure_altitude and destination_altitude are in meters above the surface.
-        returns a float of the burn delta-v required, positive means prograde, negative means retrograde
-    
-        :param departure_body:
-        :param departure_altitude: departure orbit altitude
-        :param destination_altitude: destination orbit altitude
-        """
-        #departure_planet_radius = get_telemetry("body_radius", body_number=TELEMACHUS_BODY_IDS[departure_body])
-        r1 = departure_altitude
-        r2 = destination_altitude
-        mu = float(get_telemetry("body_gravParameter", body_number=TELEMACHUS_BODY_IDS[departure_body]))
-        sqrt_r1 = math.sqrt(r1)
-        sqrt_r2 = math.sqrt(r2)
-        sqrt_2_sum = math.sqrt(2 / (r1 + r2))
-        sqrt_mu = math.sqrt(mu)
-        delta_v_1 = sqrt_mu / sqrt_r1 * (sqrt_r2 * sqrt_2_sum - 1)
-        delta_v_2 = sqrt_mu / sqrt_r2 * (1 - sqrt_r1 * sqrt_2_sum)
-        return delta_v_1, delta_v_2
+
+        latest_time = self.samples[-1][0]
+        measured = self.get_measured_acceleration()
+        if self.mass is None:
+            return measured
+        if measured is not None:
+            # compare with the model at the middle of the samples
+            middle_time = (self.samples[0][0] + latest_time) / 2
+            correction = measured / self.get_model_acceleration(middle_time)
+            self.correction = min(max(correction, self.MINIMUM_CORRECTION), self.MAXIMUM_CORRECTION)
+        return self.correction * self.get_model_acceleration(latest_time)
+
+    def time_to_cutoff(self, throttle=None):
+
+        """ Predicts the time from the latest sample until the cutoff velocity is reached.
+        :param throttle: predict for this throttle setting (0 to 1) rather than the current one
+        :type throttle: float
+        :return: the time (s), negative if the cutoff velocity has been passed, or None if the acceleration isn't
+                 known yet
+        :rtype: float | None
+        """
+
+        if not self.samples:
+            return None
+        acceleration = self.get_acceleration()
+        if not acceleration or acceleration <= 0:
+            return None
+        if throttle is not None:
+            acceleration *= throttle / self.throttle
+        return (self.velocity_at_cutoff - self.samples[-1][1]) / acceleration
+
+
+class Guidance:
+
+    """ Closed loop steering for maneuver burns. The maneuver node defines a target orbit. Each cycle the required
+    velocity is the velocity at the vessel's current position that puts it on an orbit of the target's size, shape
+    and plane, and the engine is pointed along the velocity to be gained (required less current velocity). Errors in
+    thrust direction or timing are steered out during the burn, and because the required velocity is matched at the
+    vessel's actual radius, long burns still end on an orbit with the target's semi-major axis and eccentricity.
+    Each cycle is a fixed amount of closed form vector math.
+    """
+
+    def __init__(self, departure_orbit, time_of_node, node_delta_v):
+
+        """ Class constructor.
+        :param departure_orbit: the orbit before the burn
+        :type departure_orbit: orbital.Orbit
+        :param time_of_node: universal time of the maneuver node
+        :type time_of_node: float
+        :param node_delta_v: maneuver node delta-v (radial, normal, prograde)
+        :type node_delta_v: tuple of float
+        :return: None
+        """
+
+        position, velocity = orbital.orbit_state(departure_orbit, time_of_node)
+        target_velocity = velocity + np.array(node_delta_v) @ np.array(orbital.node_frame(position, velocity))
+        self.target_orbit = orbital.orbit_from_state(position, target_velocity, time_of_node,
+                                                     departure_orbit.grav_param)
+        self.delta_v = float(np.linalg.norm(node_delta_v))
+        self.velocity_to_be_gained = target_velocity - velocity
+
+        orbit = self.target_orbit
+        rotation = orbital.perifocal_to_inertial(orbit.inclination, orbit.lan, orbit.argument_of_periapsis)
+        self.periapsis_direction = rotation[:, 0]
+        self.periapsis_normal = rotation[:, 1]
+        self.orbit_normal = rotation[:, 2]
+        self.angular_momentum = np.sqrt(orbit.grav_param * orbit.sma * (1 - orbit.eccentricity ** 2))
+
+    def get_required_velocity(self, position):
+
+        """ Returns the velocity at position that puts the vessel on an orbit of the target orbit's semi-major axis,
+        eccentricity and plane, heading away from periapsis if the target orbit is at this point.
+        :param position: the vessel's position (m)
+        :type position: numpy.ndarray
+        :return: the velocity (m/s)
+        :rtype: numpy.ndarray
+        """
+
+        orbit = self.target_orbit
+        radius = np.linalg.norm(position)
+        in_plane = position - (position @ self.orbit_normal) * self.orbit_normal
+        radial = in_plane / np.linalg.norm(in_plane)
+        transverse = np.cross(self.orbit_normal, radial)
+
+        speed_squared = orbit.grav_param * (2 / radius - 1 / orbit.sma)
+        transverse_speed = self.angular_momentum / radius
+        radial_speed = np.sqrt(max(speed_squared - transverse_speed ** 2, 0.0))
+        if position @ self.periapsis_normal < 0:
+            # approaching periapsis
+            radial_speed = -radial_speed
+        return radial_speed * radial + transverse_speed * transverse
+
+    def update(self, position, velocity):
+
+        """ Recomputes the velocity to be gained.
+        :param position: the vessel's position (m)
+        :type position: numpy.ndarray
+        :param velocity: the vessel's velocity (m/s)
+        :type velocity: numpy.ndarray
+        :return: the velocity to be gained (m/s)
+        :rtype: numpy.ndarray
+        """
+
+        self.velocity_to_be_gained = self.get_required_velocity(position) - velocity
+        return self.velocity_to_be_gained
+
+    @property
+    def delta_v_gained(self):
+        return self.delta_v - float(np.linalg.norm(self.velocity_to_be_gained))
 
 
 class Burn:
 
     """ This object models a burn maneuver """
 
-    def __init__(self, delta_v, direction, time_of_ignition, time_of_node, burn_duration, recalc_function=None):
+    def __init__(self, delta_v, direction, time_of_ignition, time_of_node, burn_duration, recalc_function=None,
+                 node_delta_v=None, name=None, depends_on=None):
 
         """ Class constructor
 
@@ -267,14 +1081,29 @@ class Burn:
         :type direction: str (should be in config.DIRECTIONS)
         :param time_of_ignition: Time of Ignition, relative to Mission Elapsed Time
         :type time_of_ignition: float
+        :param recalc_function: replans the burn, returning False if it can't be replanned yet
+        :param node_delta_v: maneuver node delta-v (radial, normal, prograde), if not purely prograde
+        :type node_delta_v: tuple of float
+        :param name: name of the maneuver (eg "TMI"). A queued burn is replaced by a new burn with the same name
+        :type name: str | None
+        :param depends_on: the burn this burn was planned from. It is replanned when that burn changes or executes
+        :type depends_on: Burn | None
         :return: None
         """
         self.burn_duration = burn_duration
         self.recalc_function = recalc_function
+        self.name = name
+        self.depends_on = depends_on
+        # True when the burn must be replanned before it is executed
+        self.is_stale = False
+        self.is_executing = False
+        # if True the engine is enabled at TIG - 10 s without waiting for PROCEED on V99
+        self.is_auto_proceed = False
         self.delta_v_required = delta_v
         self.direction = direction
         self.time_of_ignition = time_of_ignition
         self.time_of_node = time_of_node
+        self.node_delta_v = node_delta_v or (0.0, 0.0, delta_v)
         self.time_until_ignition = self.calculate_time_to_ignition()
         
         self.is_display_blanked = False
@@ -289,11 +1118,33 @@ class Burn:
         self._is_thrust_reduced = False
         self.current_velocity = 0.0
 
+        self.cutoff_predictor = None
+        self.guidance = None
+        self._commanded_attitude = None
+        self.command_latency = config.BURN_COMMAND_LATENCY
+        self.sample_timer = None
+        self.throttle_down_timer = None
+        self.cutoff_timer = None
+        self.sample_interval = config.BURN_SAMPLE_INTERVAL
+        self._is_throttle_down_scheduled = False
+        self._is_cutoff_scheduled = False
+
     def recalculate(self):
-        self.recalc_function()
+
+        """ Replans the burn with its recalc function.
+        :return: True if the burn was replanned, False if it can't be replanned yet
+        :rtype: bool
+        """
+
+        if self.recalc_function and self.recalc_function() is False:
+            return False
+        self.is_stale = False
         self.time_until_ignition = self.calculate_time_to_ignition()
         self.velocity_at_cutoff = self._calculate_velocity_at_cutoff()
-    
+        self.update_maneuver_node()
+        computer.burn_replanned(self)
+        return True
+
     def execute(self):
 
         """ Entry point to execute this burn.
@@ -301,24 +1152,45 @@ class Burn:
         """
         
         # load the course start time monitor into the computers main loop
-        self.add_maneuver_node()
+        self.update_maneuver_node()
+        self.is_executing = True
         computer.main_loop_table.append(self._coarse_start_time_monitor)
         computer.execute_verb(verb="16", noun="40")
         
-    def add_maneuver_node(self):
+    def update_maneuver_node(self):
+
+        """ Puts the burn's maneuver node on the flight plan, or moves it if the burn has changed.
+        :return: None
+        """
 
-        telemachus.add_maneuver_node(ut=self.time_of_node, delta_v=(0.0, 0.0, self.delta_v_required))
+        computer.maneuver_nodes.set_node(self, self.time_of_node, self.node_delta_v)
         
     def terminate(self):
 
-        """ Terminates the burn, disabling autopilot if running
+        """ Stops executing the burn, disabling autopilot if running. The burn stays queued, so it can be executed
+        again; if it was interrupted after ignition it must be replanned first.
         :return: None
         """
         self._disable_directional_autopilot()
+        for timer in (self.sample_timer, self.throttle_down_timer, self.cutoff_timer):
+            if timer:
+                timer.stop()
+
+        for monitor in (self._coarse_start_time_monitor, self._fine_start_time_monitor):
+            if monitor in computer.main_loop_table:
+                computer.main_loop_table.remove(monitor)
 
         # if the throttle is open, close it
         telemachus.cut_throttle()
-        computer.remove_burn()
+        if self.is_active:
+            self.is_stale = True
+        self.is_active = False
+        self.is_executing = False
+        self.is_display_blanked = False
+        self.is_verb_99_executed = False
+        self._is_thrust_reduced = False
+        self._is_throttle_down_scheduled = False
+        self._is_cutoff_scheduled = False
 
     def _coarse_start_time_monitor(self):
 
@@ -345,11 +1217,15 @@ class Burn:
         # at TIG - 10, execute verb 99
         if int(self.time_until_ignition) <= 10:
             computer.main_loop_table.remove(self._coarse_start_time_monitor)
-            computer.execute_verb(verb="99", object_requesting_proceed=self._accept_enable_engine)
+            if self.is_auto_proceed:
+                self._accept_enable_engine("proceed")
+            else:
+                computer.execute_verb(verb="99", object_requesting_proceed=self._accept_enable_engine)
 
     def _accept_enable_engine(self, data):
         if data == "proceed":
             utils.log("Go for burn!", log_level="INFO")
+            journal.record(journal.BURN, milestone="go", delta_v=self.delta_v_required)
         else:
             return
         computer.main_loop_table.append(self._fine_start_time_monitor)
@@ -373,8 +1249,49 @@ class Burn:
         
         #self.actual_time_of_ignition = get_telemetry("universalTime")
         #self.time_of_cutoff = self.actual_time_of_ignition + self.burn_duration
-        telemachus.set_throttle(100)
-        computer.main_loop_table.append(self._thrust_monitor)
+        # burns to a maneuver node are steered by closed loop guidance if MechJeb's surface attitude mode is
+        # available, and cut off when the delta-v has been gained. Otherwise they are cut off by the speed
+        if self.direction == "node" and config.ENABLE_CLOSED_LOOP_GUIDANCE and "surface2" in telemachus.commands:
+            universal_time = get_telemetry("universalTime")
+            self.guidance = Guidance(get_vessel_orbit(universal_time), self.time_of_node, self.node_delta_v)
+            self.cutoff_predictor = CutoffPredictor(self.guidance.delta_v, time.monotonic(),
+                                                    get_propulsion_parameters())
+            self.sample_interval = config.GUIDANCE_INTERVAL
+        else:
+            # the predictor follows the delta-v gained, which rises for retrograde burns too
+            self.cutoff_predictor = CutoffPredictor(self.delta_v_required, time.monotonic(),
+                                                    get_propulsion_parameters())
+            self.sample_interval = config.BURN_SAMPLE_INTERVAL
+        self._set_throttle(100)
+        self.is_active = True
+        journal.record(journal.BURN, milestone="ignition", velocity=self.initial_speed,
+                       velocity_at_cutoff=self.velocity_at_cutoff, is_guided=self.guidance is not None)
+
+        # sample faster than the main loop runs, so that the cutoff can be timed precisely
+        self.sample_timer = QTimer()
+        self.sample_timer.timeout.connect(self._thrust_monitor)
+        self.sample_timer.start(self.sample_interval)
+        # the throttle back and the cutoff are timed between samples
+        self.throttle_down_timer = QTimer()
+        self.throttle_down_timer.setSingleShot(True)
+        self.throttle_down_timer.timeout.connect(self._throttle_down)
+        self.cutoff_timer = QTimer()
+        self.cutoff_timer.setSingleShot(True)
+        self.cutoff_timer.timeout.connect(self._cutoff)
+
+    def _set_throttle(self, throttle_percent):
+
+        """ Sets the throttle, measuring how long the command takes to reach KSP.
+        :param throttle_percent: the throttle setting, 0 to 100
+        :type throttle_percent: int
+        :return: None
+        """
+
+        command_time = time.monotonic()
+        telemachus.set_throttle(throttle_percent)
+        latency = time.monotonic() - command_time
+        self.command_latency = (self.command_latency + latency) / 2
+        self.cutoff_predictor.set_throttle(throttle_percent / 100, command_time + latency)
 
     #def _burn_time_monitor(self):
         #burn_duration_so_far = get_telemetry("universalTime") - self.actual_time_of_ignition
@@ -397,36 +1314,131 @@ class Burn:
     
     def _thrust_monitor(self):
 
-        # recalculate accumulated delta-v so far
-        self.accumulated_delta_v = self._calculate_accumulated_delta_v()
-        current_velocity = get_telemetry("orbitalVelocity")
-        #print("Accumulated dV: {:.2f}".format(self.accumulated_delta_v))
-        #print("dV required: {:.2f}".format(self.delta_v_required))
-        #print("Velocity at start: {:.2f}".format(self.initial_speed))
-        #print("Current Velocity: {:.2f}".format(current_velocity))
-        #print("Expected dV at cutoff: {}".format(self.velocity_at_cutoff))
-
-
-        if current_velocity > (self.velocity_at_cutoff - 13.5) and not self._is_thrust_reduced:
-            utils.log("Throttling back to 10%", log_level="DEBUG")
-            telemachus.set_throttle(10)
-            self._is_thrust_reduced = True
-            telemachus.disable_smartass()
-            telemachus.send_command_to_ksp("command=f.sas")
-
-        if current_velocity > (self.velocity_at_cutoff - 3.5):  # the 3.5 a hack otherwise it overshoots, FIXME!
-            telemachus.cut_throttle()
-            utils.log("Closing throttle, burn complete!", log_level="DEBUG")
-            computer.dsky.current_verb.terminate()
-            computer.execute_verb(verb="06", noun="14")
-            computer.main_loop_table.remove(self._thrust_monitor)
-            #computer.burn_complete()
-            self.terminate()
-            computer.go_to_poo()
+        """ Samples the velocity during the burn, and schedules the throttle back and the cutoff at their predicted
+        times, less the command latency.
+        :return: None
+        """
+
+        sample_start = time.monotonic()
+        try:
+            if self.guidance:
+                sample = self._guide()
+            else:
+                self.current_velocity = telemachus.sample_telemetry("orbitalVelocity")
+                self.accumulated_delta_v = self._get_speed_sign() * (self.current_velocity - self.initial_speed)
+                sample = self.accumulated_delta_v
+        except (telemachus.KSPNotConnected, telemachus.TelemetryNotAvailable):
+            return
+        now = time.monotonic()
+        # the sample was taken somewhere during the request, assume half way
+        sample_time = (sample_start + now) / 2
+        self.cutoff_predictor.add_sample(sample_time, sample)
+        time_to_cutoff = self.cutoff_predictor.time_to_cutoff()
+        if time_to_cutoff is None:
+            return
+        # time from now until the commands must be sent
+        time_to_cutoff -= (now - sample_time) + self.command_latency
+        sample_interval = self.sample_interval / 1000
+
+        if not self._is_throttle_down_scheduled:
+            time_to_throttle_down = time_to_cutoff - config.BURN_THROTTLE_DOWN_TIME
+            if time_to_throttle_down < sample_interval:
+                self._is_throttle_down_scheduled = True
+                self.throttle_down_timer.start(max(int(time_to_throttle_down * 1000), 0))
+            return
+
+        if self._is_thrust_reduced and not self._is_cutoff_scheduled and time_to_cutoff < sample_interval:
+            self._is_cutoff_scheduled = True
+            self.sample_timer.stop()
+            self.cutoff_timer.start(max(int(time_to_cutoff * 1000), 0))
+
+    def _guide(self):
+
+        """ Runs a guidance cycle: updates the velocity to be gained from the vessel's state, and points the engine
+        along it until the throttle has been reduced for the end of the burn, when the attitude is held.
+        :return: the delta-v gained so far
+        :rtype: float
+        """
+
+        universal_time = get_telemetry("universalTime")
+        # steer from the navigated state, but fix the state from telemetry for the cutoff
+        state_vector = computer.get_current_state_vector()
+        if state_vector and not self._is_throttle_down_scheduled:
+            position, velocity = state_vector.predict(universal_time)
+        else:
+            position, velocity = orbital.orbit_state(get_vessel_orbit(universal_time, from_telemetry=True),
+                                                     universal_time)
+        velocity_to_be_gained = self.guidance.update(position, velocity)
+        self.current_velocity = float(np.linalg.norm(velocity))
+        self.accumulated_delta_v = self.guidance.delta_v_gained
+
+        if not self._is_thrust_reduced:
+            heading, pitch = orbital.surface_attitude(position, velocity_to_be_gained)
+            # only send commands for changes larger than the deadband
+            if (self._commanded_attitude is None or
+                    abs((heading - self._commanded_attitude[0] + 180) % 360 - 180) > config.GUIDANCE_DEADBAND or
+                    abs(pitch - self._commanded_attitude[1]) > config.GUIDANCE_DEADBAND):
+                telemachus.set_mechjeb_surface(heading, pitch)
+                self._commanded_attitude = (heading, pitch)
+        return self.accumulated_delta_v
+
+    def _throttle_down(self):
+        if not self.is_active:
+            return
+        utils.log("Throttling back to {}%".format(config.BURN_FINAL_THROTTLE), log_level="DEBUG")
+        journal.record(journal.BURN, milestone="throttle_back", velocity=self.current_velocity)
+        self._set_throttle(config.BURN_FINAL_THROTTLE)
+        self._is_thrust_reduced = True
+        telemachus.disable_smartass()
+        telemachus.send_command_to_ksp("command=f.sas")
+
+    def _cutoff(self):
+        if not self.is_active:
+            return
+        telemachus.cut_throttle()
+        utils.log("Closing throttle, burn complete!", log_level="DEBUG")
+        journal.record(journal.BURN, milestone="cutoff", velocity=self.current_velocity,
+                       accumulated_delta_v=self.accumulated_delta_v, command_latency=self.command_latency)
+        computer.dsky.current_verb.terminate()
+        computer.execute_verb(verb="06", noun="14")
+        self.is_active = False
+        self.terminate()
+        computer.remove_burn(self)
+        computer.burn_complete()
+
+    def get_thrust_direction(self, position, velocity):
+
+        """ Returns the direction the engine is thrusting in: along the velocity to be gained for guided burns,
+        otherwise along the maneuver node or the velocity.
+        :param position: the vessel's position (m)
+        :type position: numpy.ndarray
+        :param velocity: the vessel's velocity (m/s)
+        :type velocity: numpy.ndarray
+        :return: unit vector
+        :rtype: numpy.ndarray
+        """
+
+        if self.guidance:
+            direction = self.guidance.velocity_to_be_gained
+        elif self.direction == "node":
+            direction = np.array(self.node_delta_v) @ np.array(orbital.node_frame(position, velocity))
+        else:
+            direction = self._get_speed_sign() * velocity
+        length = np.linalg.norm(direction)
+        if length == 0:
+            # the delta-v has been gained, the engine is cutting off
+            return np.zeros(3)
+        return direction / length
+
+    def _get_speed_sign(self):
 
+        # the speed falls during retrograde burns
+        if self.direction == "retrograde" or self.node_delta_v[2] < 0:
+            return -1.0
+        return 1.0
 
     def _calculate_velocity_at_cutoff(self):
-        return self.initial_speed + self.delta_v_required
+        return self.initial_speed + self._get_speed_sign() * self.delta_v_required
 
     def calculate_time_to_ignition(self):
 
@@ -439,7 +1451,7 @@ class Burn:
 
     def _calculate_accumulated_delta_v(self):
         current_speed = get_telemetry("orbitalVelocity")
-        return current_speed - self.initial_speed
+        return self._get_speed_sign() * (current_speed - self.initial_speed)
 
     def _disable_directional_autopilot(self):
 
@@ -455,7 +1467,8 @@ class Burn:
 
 def calc_burn_duration(initial_mass, thrust, specific_impulse, delta_v):
     '''
-    Calculates the duration of a burn in seconds.
+    Calculates the duration of a burn in seconds, for a single stage with unlimited propellant. Use plan_burn() for
+    the vehicle model.
     :param initial_mass: initial mass of spacecraft
     :type initial_mass: float
     :param thrust: total thrust of the spacecraft
@@ -466,15 +1479,4 @@ def calc_burn_duration(initial_mass, thrust, specific_impulse, delta_v):
     :type delta_v: float
     :returns: float time of burn in seconds
     '''
-    exhaust_velocity = specific_impulse * 9.81
-    burn_duration = (initial_mass * exhaust_velocity / thrust) * (1 - math.exp(-delta_v / exhaust_velocity))
-    utils.log(log_level="info")
-    utils.log("-" * 40, log_level="info")
-    utils.log("Burn duration calculations:", log_level="info")
-    utils.log("Initial mass: {} tonnes".format(initial_mass), log_level="info")
-    utils.log("Thrust: {} kN".format(thrust), log_level="info")
-    utils.log("Specific Impulse: {} seconds".format(specific_impulse), log_level="info")
-    utils.log("Exhaust Velocity: {:.2f} kg/s".format(exhaust_velocity), log_level="info")
-    utils.log("Burn Duration: {:.1f} seconds".format(burn_duration), log_level="info")
-    utils.log("-" * 40, log_level="info")
-    return burn_duration
\ No newline at end of file
+    return vehicle.burn_duration(vehicle.single_stage(initial_mass, thrust, specific_impulse), delta_v)
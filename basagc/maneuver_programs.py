@@ -0,0 +1,597 @@
+#!/usr/bin/env python3
+""" This module contains the programs that plan and execute burns. They need the orbital mechanics (and numpy), so
+programs.py registers them by name, and this module is only imported the first time one of them is run."""
+
+from PyQt5.QtCore import QTimer
+
+from basagc import config
+if config.DEBUG:
+    from pudb import set_trace  # lint:ok
+
+from basagc import utils, maneuver, vehicle
+from basagc.programs import Program
+from basagc.telemachus import KSPNotConnected, TelemetryNotAvailable, check_connection
+
+
+class Program15(Program):
+
+    """ Calculates TMI burn
+    :return: None
+    """
+
+    def __init__(self):
+
+        """ Class constructor.
+        :return: None
+        """
+        # sequence of events:
+        # V37E15E
+        # Flashing V01N30 displays target octal ID
+        # PRO to accept, V21 to change
+        # Display blanks for 5 seconds at TIG - 105 seconds
+        # Display V16N95
+        # at TIG - 10 seconds: Flashing V99
+        # if proceed: execute maneuver
+
+        # FIXME: this program should only *calculate* the maneuver, the actual execution of the burn should be
+        # FIXME: performed by P40
+
+        # TODO: scale final altitude based on crafts TWR
+        # TODO: request twr from user
+
+        super().__init__(description="TMI Calculate", number="15")
+        
+
+    def execute(self):
+
+        """ Entry point for the program
+        :return: None
+        """
+
+        super().execute()
+        
+        # if no connection to KSP, do P00DOO abort
+        if not check_connection():
+            self.computer.poodoo_abort(111)
+            self.terminate()
+            return
+        
+        # check that orbital parameters are within range to conduct burn
+        is_orbit_ok = maneuver.HohmannTransfer.check_orbital_parameters()
+        if is_orbit_ok == True:
+            # request mass
+            self.computer.execute_verb(verb="21", noun="25")
+            self.computer.dsky.request_data(requesting_object=self._accept_initial_mass_whole_part, display_location="data_1")
+        else:
+            self.computer.poodoo_abort(is_orbit_ok[1])
+
+    def _accept_initial_mass_whole_part(self, mass):
+        Program.computer.noun_data["25"][0] = mass
+        self.computer.execute_verb(verb="22", noun="25")
+        self.computer.dsky.request_data(requesting_object=self._accept_initial_mass_fractional_part, display_location="data_2")
+        
+    def _accept_initial_mass_fractional_part(self, mass):
+        Program.computer.noun_data["25"][1] = mass
+        self.computer.execute_verb(verb="21", noun="31")
+        self.computer.dsky.request_data(requesting_object=self._accept_thrust_whole_part, display_location="data_1")
+
+    def _accept_thrust_whole_part(self, thrust):
+        Program.computer.noun_data["31"][0] = thrust
+        self.computer.execute_verb(verb="22", noun="31")
+        self.computer.dsky.request_data(requesting_object=self._accept_thrust_fractional_part, display_location="data_2")
+
+    def _accept_thrust_fractional_part(self, thrust):
+        Program.computer.noun_data["31"][1] = thrust
+        self.computer.execute_verb(verb="21", noun="38")
+        self.computer.dsky.request_data(requesting_object=self._accept_isp, display_location="data_1")
+
+    def _accept_isp(self, isp):
+        Program.computer.noun_data["38"][0] = isp
+        self.calculate_maneuver()
+
+    def calculate_maneuver(self):
+
+        """ Calculates the maneuver parameters in the background, and loads the Burn object when done
+        :return: Nothing
+        """
+        self.computer.planner.submit_burn(self._plan_maneuver, on_complete=self._maneuver_planned,
+                                          on_error=self._planning_failed)
+
+    def _plan_maneuver(self):
+
+        # runs on a planner thread
+        self.maneuver = maneuver.HohmannTransfer()
+        return self.maneuver.plan()
+
+    def _maneuver_planned(self, burn):
+
+        # queue the insertion burn at the target, it is replanned once the vessel is on the transfer trajectory
+        second_burn = getattr(self.maneuver, "second_burn", None)
+        if second_burn and not self.computer.add_burn(second_burn):
+            return
+
+        # display burn parameters and go to poo
+        self.computer.execute_verb(verb="06", noun="95")
+        self.computer.go_to_poo()
+
+    def _planning_failed(self, exception):
+        if isinstance(exception, (KSPNotConnected, TelemetryNotAvailable)):
+            self.computer.poodoo_abort(111)
+        elif isinstance(exception, vehicle.VehicleNotLoaded):
+            self.computer.poodoo_abort(233)
+        else:
+            utils.log("Maneuver calculation failed: {!r}".format(exception), log_level="ERROR")
+            self.computer.poodoo_abort(228)
+
+class Program16(Program15):
+
+    """ Transfer window search. Finds the lowest delta-v transfer to the target selected in noun 30, and loads the
+    departure burn for P40.
+    :return: None
+    """
+
+    def __init__(self):
+
+        """ Class constructor.
+        :return: None
+        """
+
+        super(Program15, self).__init__(description="Transfer Window Search", number="16")
+        self.target_name = None
+
+    def execute(self):
+
+        """ Entry point for the program
+        :return: None
+        """
+
+        super(Program15, self).execute()
+
+        # if no connection to KSP, do P00DOO abort
+        if not check_connection():
+            self.computer.poodoo_abort(111)
+            self.terminate()
+            return
+
+        target_id = self.computer.noun_data["30"]
+        if isinstance(target_id, list):
+            target_id = target_id[0]
+        self.target_name = config.OCTAL_BODY_IDS.get(str(int(target_id)))
+        if self.target_name is None:
+            self.computer.poodoo_abort(223)
+            return
+
+        # request mass, thrust and Isp for the burn duration, then calculate_maneuver() is called
+        self.computer.execute_verb(verb="21", noun="25")
+        self.computer.dsky.request_data(requesting_object=self._accept_initial_mass_whole_part,
+                                        display_location="data_1")
+
+    def calculate_maneuver(self):
+
+        """ Searches for the transfer window in the background, then loads the departure burn.
+        :return: None
+        """
+
+        self.computer.planner.submit(self._search_transfer_window, on_complete=self._transfer_window_found,
+                                     on_error=self._planning_failed)
+
+    def _search_transfer_window(self):
+
+        # runs on a planner thread
+        window = maneuver.TransferWindow(self.target_name)
+        return window, window.search()
+
+    def _transfer_window_found(self, result):
+
+        window, is_found = result
+        if not is_found:
+            self.computer.poodoo_abort(223 if window.departure_orbit is None else 227)
+            return
+        self.computer.transfer_window = window
+        if window.is_interplanetary:
+            # the departure delta-v is the hyperbolic excess velocity, the ejection burn isn't calculated
+            utils.log("Interplanetary transfer window found, no burn loaded")
+        else:
+            self.computer.add_burn(window.create_burn())
+
+        # display transfer window and go to poo
+        self.computer.execute_verb(verb="06", noun="96")
+        self.computer.go_to_poo()
+
+
+class Program18(Program15):
+
+    """ Plane change. Changes the orbit's inclination to the one loaded in noun 47, at the cheaper of the ascending
+    and descending nodes, and loads the burn for P40.
+    :return: None
+    """
+
+    def __init__(self):
+
+        """ Class constructor.
+        :return: None
+        """
+
+        super(Program15, self).__init__(description="Plane Change", number="18")
+
+    def execute(self):
+
+        """ Entry point for the program
+        :return: None
+        """
+
+        super(Program15, self).execute()
+
+        # if no connection to KSP, do P00DOO abort
+        if not check_connection():
+            self.computer.poodoo_abort(111)
+            self.terminate()
+            return
+
+        self.computer.execute_verb(verb="21", noun="47")
+        self.computer.dsky.request_data(requesting_object=self._accept_inclination, display_location="data_1")
+
+    def _accept_inclination(self, inclination):
+        Program.computer.noun_data["47"][0] = inclination
+        # request mass, thrust and Isp for the burn duration, then calculate_maneuver() is called
+        self.computer.execute_verb(verb="21", noun="25")
+        self.computer.dsky.request_data(requesting_object=self._accept_initial_mass_whole_part,
+                                        display_location="data_1")
+
+    def _plan_maneuver(self):
+
+        # runs on a planner thread
+        inclination = float(self.computer.noun_data["47"][0]) / 100
+        self.maneuver = maneuver.PlaneChange(inclination)
+        return self.maneuver.plan()
+
+
+class Program19(Program18):
+
+    """ Orbit change. Changes the orbit's apoapsis and periapsis to the altitudes loaded in noun 48 with two burns at
+    apsides, and loads the first burn for P40. Run P19 again after the first burn for the second one.
+    :return: None
+    """
+
+    def __init__(self):
+
+        """ Class constructor.
+        :return: None
+        """
+
+        super(Program15, self).__init__(description="Orbit Change", number="19")
+
+    def execute(self):
+
+        """ Entry point for the program
+        :return: None
+        """
+
+        super(Program15, self).execute()
+
+        # if no connection to KSP, do P00DOO abort
+        if not check_connection():
+            self.computer.poodoo_abort(111)
+            self.terminate()
+            return
+
+        self.computer.execute_verb(verb="21", noun="48")
+        self.computer.dsky.request_data(requesting_object=self._accept_apoapsis, display_location="data_1")
+
+    def _accept_apoapsis(self, apoapsis):
+        Program.computer.noun_data["48"][0] = apoapsis
+        self.computer.execute_verb(verb="22", noun="48")
+        self.computer.dsky.request_data(requesting_object=self._accept_periapsis, display_location="data_2")
+
+    def _accept_periapsis(self, periapsis):
+        Program.computer.noun_data["48"][1] = periapsis
+        self.computer.execute_verb(verb="21", noun="25")
+        self.computer.dsky.request_data(requesting_object=self._accept_initial_mass_whole_part,
+                                        display_location="data_1")
+
+    def _plan_maneuver(self):
+
+        # runs on a planner thread
+        apoapsis = float(self.computer.noun_data["48"][0]) * 1000
+        periapsis = float(self.computer.noun_data["48"][1]) * 1000
+        self.maneuver = maneuver.OrbitChange(apoapsis, periapsis)
+        return self.maneuver.plan()
+
+
+class Program31(Program15):
+
+    """ Mun Orbit Insertion (MOI). Predicts the periapsis of the trajectory from the state vector and loads the burn
+    into a circular orbit there for P40. Rerun after midcourse corrections to retarget the burn.
+    :return: None
+    """
+
+    def __init__(self):
+
+        """ Class constructor.
+        :return: None
+        """
+
+        super(Program15, self).__init__(description="MOI Burn Calculator", number="31")
+
+    def execute(self):
+
+        """ Entry point for the program
+        :return: None
+        """
+
+        super(Program15, self).execute()
+
+        # if no connection to KSP, do P00DOO abort
+        if not check_connection():
+            self.computer.poodoo_abort(111)
+            self.terminate()
+            return
+
+        # request mass, thrust and Isp for the burn duration, then calculate_maneuver() is called
+        self.computer.execute_verb(verb="21", noun="25")
+        self.computer.dsky.request_data(requesting_object=self._accept_initial_mass_whole_part,
+                                        display_location="data_1")
+
+    def _plan_maneuver(self):
+
+        # runs on a planner thread
+        self.maneuver = maneuver.OrbitInsertion()
+        return self.maneuver.plan()
+
+    def _maneuver_planned(self, burn):
+        if burn is None:
+            self.computer.poodoo_abort(230)
+            return
+        super()._maneuver_planned(burn)
+
+
+class Program32(Program15):
+
+    """ Coelliptic rendezvous. Targets the CSI, CDH and TPI burns to rendezvous with the targeted vessel, and loads
+    them for P40 in order. While the program runs the burns are retargeted from fresh telemetry and displayed on N75.
+    :return: None
+    """
+
+    def __init__(self, description="Coelliptic Rendezvous", number="32"):
+
+        """ Class constructor.
+        :param description: description of the program
+        :param number: program number
+        :return: None
+        """
+
+        super(Program15, self).__init__(description=description, number=number)
+        self.rendezvous = None
+        self.refresh_timer = QTimer()
+        self.refresh_timer.timeout.connect(self._refresh)
+        self.is_refresh_pending = False
+
+    def execute(self):
+
+        """ Entry point for the program
+        :return: None
+        """
+
+        super(Program15, self).execute()
+
+        # if no connection to KSP, do P00DOO abort
+        if not check_connection():
+            self.computer.poodoo_abort(111)
+            self.terminate()
+            return
+
+        is_orbit_ok = maneuver.CoellipticRendezvous.check_orbital_parameters()
+        if is_orbit_ok is not True:
+            self.computer.poodoo_abort(is_orbit_ok[1])
+            return
+        # request mass, thrust and Isp for the burn durations, then calculate_maneuver() is called
+        self.computer.execute_verb(verb="21", noun="25")
+        self.computer.dsky.request_data(requesting_object=self._accept_initial_mass_whole_part,
+                                        display_location="data_1")
+
+    def calculate_maneuver(self):
+
+        """ Solves the rendezvous in the background, and loads the burns when done
+        :return: None
+        """
+
+        self.rendezvous = maneuver.CoellipticRendezvous()
+        self.computer.planner.submit(self.rendezvous.plan, on_complete=self._maneuver_planned,
+                                     on_error=self._planning_failed)
+
+    def _maneuver_planned(self, burns):
+        if not burns:
+            self.computer.poodoo_abort(229)
+            return
+        if not self.computer.add_burns(burns):
+            return
+        self.computer.rendezvous = self.rendezvous
+        self._start_refresh()
+
+    def _start_refresh(self):
+
+        # display rendezvous data, and keep it up to date until the program is terminated or another one runs
+        self.computer.execute_verb(verb="16", noun="75")
+        self.refresh_timer.start(config.RENDEZVOUS_REFRESH_INTERVAL)
+
+    def _refresh(self):
+        if self.computer.running_program is not self:
+            self.refresh_timer.stop()
+            return
+        stage = self.rendezvous.get_stage()
+        if stage >= len(self.rendezvous.burns):
+            self.refresh_timer.stop()
+            return
+        if self.is_refresh_pending or self.computer.next_burn.is_active:
+            return
+        self.is_refresh_pending = True
+        self.computer.planner.submit(self.rendezvous.solve, stage, on_complete=lambda is_solved: self._retargeted(
+            stage, is_solved), on_error=self._retarget_failed)
+
+    def _retargeted(self, stage, is_solved):
+        self.is_refresh_pending = False
+        if not is_solved:
+            self.computer.program_alarm(229)
+            return
+        # a burn may have been executed while solving
+        if stage == self.rendezvous.get_stage():
+            self.rendezvous.apply(stage)
+
+    def _retarget_failed(self, exception):
+
+        # the burns already loaded are still good, so alarm and keep them rather than aborting the program
+        self.is_refresh_pending = False
+        if isinstance(exception, (KSPNotConnected, TelemetryNotAvailable)):
+            self.computer.program_alarm(111)
+            return
+        if isinstance(exception, vehicle.VehicleNotLoaded):
+            self.computer.program_alarm(233)
+            return
+        utils.log("Retargeting failed: {!r}".format(exception), log_level="ERROR")
+        self.computer.program_alarm(228)
+
+    def terminate(self):
+
+        """ Terminates the program, leaving the burns loaded.
+        :return: None
+        """
+
+        self.refresh_timer.stop()
+        super().terminate()
+
+
+class Program33(Program32):
+
+    """ Rendezvous retargeting. Retargets the burns of the rendezvous loaded by P32 that are still to come, run it
+    after CSI and after CDH.
+    :return: None
+    """
+
+    def __init__(self):
+
+        """ Class constructor.
+        :return: None
+        """
+
+        super().__init__(description="Rendezvous Retargeting", number="33")
+
+    def execute(self):
+
+        """ Entry point for the program
+        :return: None
+        """
+
+        super(Program15, self).execute()
+
+        # if no connection to KSP, do P00DOO abort
+        if not check_connection():
+            self.computer.poodoo_abort(111)
+            self.terminate()
+            return
+
+        self.rendezvous = self.computer.rendezvous
+        if not self.rendezvous or self.rendezvous.get_stage() >= len(self.rendezvous.burns):
+            self.computer.poodoo_abort(115)
+            return
+        self._start_refresh()
+        self._refresh()
+
+
+class Program40(Program):
+    
+    '''
+    Controls a SPS (Service Propulsion System) burn.
+    '''
+    
+    def __init__(self):
+        '''
+        instance constructor.
+        :returns: None
+        '''
+        super().__init__(description="SPS Burn", number="40")
+        self.burn = self.computer.next_burn
+        self.replan_timer = QTimer()
+        self.replan_timer.timeout.connect(self._replan)
+
+    def execute(self):
+        '''
+        Executes the program
+        :returns: None
+        '''
+        super().execute()
+        if not self.burn:
+            self.computer.poodoo_abort(115)
+            return
+        # a burn planned from an estimate (or depending on a burn that has been replanned) is replanned first,
+        # retrying until it can be calculated (eg until the vessel is in the target's sphere of influence)
+        if self.burn.is_stale:
+            utils.log("Burn is stale, replanning")
+            self.computer.execute_verb(verb="16", noun="33")
+            self.replan_timer.start(config.BURN_REPLAN_INTERVAL)
+            self._replan()
+            return
+        self._arm()
+
+    def _replan(self):
+        '''
+        Part of the sequence of P40, replans a stale burn
+        :returns: None
+        '''
+        if self.computer.running_program is not self:
+            self.replan_timer.stop()
+            return
+        try:
+            is_replanned = self.burn.recalculate()
+        except (KSPNotConnected, TelemetryNotAvailable):
+            return
+        except vehicle.VehicleNotLoaded:
+            self.computer.poodoo_abort(233)
+            return
+        if not is_replanned:
+            return
+        # replanning can change the order of the queued burns
+        self.burn = self.computer.next_burn
+        if not self.burn.is_stale:
+            self.replan_timer.stop()
+            self._arm()
+
+    def _arm(self):
+        '''
+        Part of the sequence of P40, waits for the burn
+        :returns: None
+        '''
+        time_to_ignition = self.burn.calculate_time_to_ignition()
+        # if TIG < 2 mins away, abort burn
+        if time_to_ignition < config.MINIMUM_TIME_TO_IGNITION:
+            self.computer.remove_burn()
+            self.computer.poodoo_abort(226)
+            return
+        # if time to ignition if further than a hour away, display time to ignition
+        if utils.seconds_to_time(time_to_ignition)["hours"] > 0:
+            utils.log("TIG > 1 hour away")
+            self.computer.execute_verb(verb="16", noun="33")
+            self.computer.main_loop_table.append(self._ten_minute_monitor)
+        else:
+            utils.log("TIG < 1 hour away, enabling burn")
+            self.burn.execute()
+
+    def _ten_minute_monitor(self):
+        '''
+        Part of the sequence of P40
+        :returns: None
+        '''
+        if self.burn.calculate_time_to_ignition() < 600:
+            self.computer.main_loop_table.remove(self._ten_minute_monitor)
+            self.burn.execute()
+
+    def terminate(self):
+        '''
+        Terminates the program.
+        :returns: None
+        '''
+        super().terminate()
+        self.replan_timer.stop()
+        if self._ten_minute_monitor in self.computer.main_loop_table:
+            self.computer.main_loop_table.remove(self._ten_minute_monitor)
+        if self.burn:
+            self.burn.terminate()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+This module contains the spacecraft state vector. While the spacecraft coasts its trajectory is a conic, so once the
+state vector has been fixed from telemetry it can be propagated to any time with orbital.propagate() instead of
+polling Telemachus. The computer's servicer refixes the state vector whenever the flight phase changes, or the state
+vector is older than config.STATE_VECTOR_MAX_AGE. During burns the state vector is advanced by average-G integration
+of the sensed acceleration, and refixed every config.AVERAGE_G_FIX_INTERVAL.
+"""
+
+import numpy as np
+
+from basagc import config
+if config.DEBUG:
+    from pudb import set_trace  # lint:ok
+from basagc import maneuver
+from basagc import orbital
+from basagc import utils
+from basagc.telemachus import get_telemetry
+
+
+class StateVector:
+
+    """ The position and velocity of the spacecraft at an epoch, relative to the body it orbits. """
+
+    def __init__(self, position, velocity, epoch, body, grav_param, body_radius):
+
+        """ Class constructor.
+        :param position: position relative to the body (m)
+        :type position: numpy.ndarray
+        :param velocity: velocity relative to the body (m/s)
+        :type velocity: numpy.ndarray
+        :param epoch: universal time of the fix (s)
+        :type epoch: float
+        :param body: name of the orbited body
+        :type body: str
+        :param grav_param: gravitational parameter of the orbited body (m^3/s^2)
+        :type grav_param: float
+        :param body_radius: radius of the orbited body (m)
+        :type body_radius: float
+        :return: None
+        """
+
+        self.position = np.asarray(position, dtype=float)
+        self.velocity = np.asarray(velocity, dtype=float)
+        self.epoch = epoch
+        self.body = body
+        self.grav_param = grav_param
+        self.body_radius = body_radius
+        self.orbit = orbital.orbit_from_state(self.position, self.velocity, epoch, grav_param)
+        # universal time of the last fix from telemetry, and the sensed (non gravitational) acceleration (m/s^2)
+        self.fix_epoch = epoch
+        self.acceleration = np.zeros(3)
+
+    @classmethod
+    def from_telemetry(cls):
+
+        """ Fixes the state vector from telemetry.
+        :return: the state vector at the current universal time
+        :rtype: StateVector
+        """
+
+        universal_time = get_telemetry("universalTime")
+        body = get_telemetry("body")
+        body_id = config.TELEMACHUS_BODY_IDS[body]
+        orbit = maneuver.get_vessel_orbit(universal_time, from_telemetry=True)
+        position, velocity = orbital.orbit_state(orbit, universal_time)
+        return cls(position, velocity, universal_time, body, orbit.grav_param,
+                   get_telemetry("body_radius", body_number=body_id))
+
+    def age(self, universal_time):
+        return universal_time - self.epoch
+
+    def integrate(self, universal_time, acceleration):
+
+        """ Advances the state vector with an average-G step, taking the sensed acceleration to change linearly from
+        the last step's to acceleration.
+        :param universal_time: the time to advance to (s)
+        :type universal_time: float
+        :param acceleration: the sensed acceleration at universal_time (m/s^2)
+        :type acceleration: numpy.ndarray
+        :return: the state vector at universal_time
+        :rtype: StateVector
+        """
+
+        time_step = universal_time - self.epoch
+        sensed_delta_v = (self.acceleration + acceleration) * time_step / 2
+        position, velocity = orbital.average_g(self.position, self.velocity, sensed_delta_v, time_step,
+                                               self.grav_param)
+        state_vector = StateVector(position, velocity, universal_time, self.body, self.grav_param, self.body_radius)
+        state_vector.fix_epoch = self.fix_epoch
+        state_vector.acceleration = np.asarray(acceleration, dtype=float)
+        return state_vector
+
+    def predict(self, universal_time):
+
+        """ Extrapolates the state vector a short time ahead, holding the sensed acceleration.
+        :param universal_time: the time to extrapolate to (s)
+        :type universal_time: float
+        :return: position and velocity at universal_time
+        :rtype: tuple of numpy.ndarray
+        """
+
+        time_step = universal_time - self.epoch
+        return orbital.average_g(self.position, self.velocity, self.acceleration * time_step, time_step,
+                                 self.grav_param)
+
+    def at(self, universal_time):
+
+        """ Propagates the state vector.
+        :param universal_time: the time(s) to propagate to
+        :type universal_time: float | numpy.ndarray
+        :return: position(s) and velocity(s) at universal_time
+        :rtype: tuple of numpy.ndarray
+        """
+
+        return orbital.propagate(self.position, self.velocity, np.asarray(universal_time) - self.epoch,
+                                 self.grav_param)
+
+    @property
+    def apoapsis_altitude(self):
+        return self.orbit.sma * (1 + self.orbit.eccentricity) - self.body_radius
+
+    @property
+    def periapsis_altitude(self):
+        return self.orbit.sma * (1 - self.orbit.eccentricity) - self.body_radius
+
+    def time_to_apoapsis(self, universal_time):
+        return float(orbital.time_to_apoapsis(self.orbit, universal_time))
+
+
+class NavigationFilter:
+
+    """ Kalman filter for the spacecraft position and velocity. Telemetry fixes are noisy: each orbital element is a
+    separate request, so the elements and the universal time they are paired with are read at slightly different
+    times. While the spacecraft coasts the filter fuses successive fixes with the orbital dynamics (the state is
+    propagated along its conic), and gives an estimate with its covariance at any time. Its state transition matrix is
+    found by propagating perturbed states alongside the estimate.
+
+    A fix that the estimate can't explain (its innovation's squared Mahalanobis distance is above
+    config.NAVIGATION_INNOVATION_GATE) means the spacecraft has maneuvered, so the filter starts again from the fix
+    rather than averaging it with the old orbit.
+    """
+
+    def __init__(self, position_noise=config.NAVIGATION_POSITION_NOISE,
+                 velocity_noise=config.NAVIGATION_VELOCITY_NOISE,
+                 acceleration_noise=config.NAVIGATION_ACCELERATION_NOISE):
+
+        """ Class constructor.
+        :param position_noise: standard deviation of the fix position error (m)
+        :type position_noise: float
+        :param velocity_noise: standard deviation of the fix velocity error (m/s)
+        :type velocity_noise: float
+        :param acceleration_noise: standard deviation of the unmodelled acceleration, as white noise (m/s^2)
+        :type acceleration_noise: float
+        :return: None
+        """
+
+        self.position_noise = position_noise
+        self.velocity_noise = velocity_noise
+        self.acceleration_noise = acceleration_noise
+        self.state = None
+        self.covariance = None
+        self.epoch = None
+        self.body = None
+        self.grav_param = None
+        self.body_radius = None
+
+    def reset(self):
+
+        """ Discards the estimate, the next fix starts the filter again.
+        :return: None
+        """
+
+        self.state = None
+        self.covariance = None
+
+    def predict(self, universal_time):
+
+        """ Propagates the estimate.
+        :param universal_time: the time to propagate to (s)
+        :type universal_time: float
+        :return: the state (position and velocity) and its covariance at universal_time
+        :rtype: tuple of numpy.ndarray
+        """
+
+        time_step = universal_time - self.epoch
+        if time_step == 0:
+            return self.state, self.covariance
+        # the estimate and the estimate with each component perturbed, to find the state transition matrix
+        steps = np.array([1.0, 1.0, 1.0, 1e-3, 1e-3, 1e-3])
+        states = np.vstack([self.state, self.state + np.diag(steps)])
+        positions, velocities = orbital.propagate(states[:, :3], states[:, 3:], time_step, self.grav_param)
+        propagated = np.concatenate([positions, velocities], axis=1)
+        transition = ((propagated[1:] - propagated[0]) / steps[:, None]).T
+
+        # white noise acceleration
+        interval = abs(time_step)
+        identity = np.eye(3)
+        process_noise = self.acceleration_noise ** 2 * np.block([
+            [interval ** 3 / 3 * identity, interval ** 2 / 2 * identity],
+            [interval ** 2 / 2 * identity, interval * identity],
+        ])
+        covariance = transition @ self.covariance @ transition.T + process_noise
+        return propagated[0], covariance
+
+    def update(self, universal_time, measurement, model, noise):
+
+        """ Fuses a measurement of the state, unless it fails the innovation gate.
+        :param universal_time: time of the measurement (s)
+        :type universal_time: float
+        :param measurement: the measured values
+        :type measurement: numpy.ndarray
+        :param model: the measurement matrix, measurement = model @ state
+        :type model: numpy.ndarray
+        :param noise: standard deviation of each measured value
+        :type noise: numpy.ndarray
+        :return: True if the measurement was fused, False if it is too far from the estimate
+        :rtype: bool
+        """
+
+        state, covariance = self.predict(universal_time)
+        innovation = measurement - model @ state
+        innovation_covariance = model @ covariance @ model.T + np.diag(np.square(noise))
+        distance = float(innovation @ np.linalg.solve(innovation_covariance, innovation))
+        if distance > config.NAVIGATION_INNOVATION_GATE:
+            utils.log("Navigation fix rejected, innovation distance {:.0f}".format(distance), log_level="INFO")
+            return False
+        gain = np.linalg.solve(innovation_covariance, model @ covariance).T
+        # Joseph form, to keep the covariance symmetric and positive definite
+        correction = np.eye(6) - gain @ model
+        self.covariance = correction @ covariance @ correction.T + gain @ np.diag(np.square(noise)) @ gain.T
+        self.state = state + gain @ innovation
+        self.epoch = universal_time
+        return True
+
+    def add_fix(self, state_vector):
+
+        """ Fuses a state vector fixed from telemetry. The filter starts again from the fix if it has no estimate, the
+        orbited body has changed, or the fix fails the innovation gate.
+        :param state_vector: the fix
+        :type state_vector: StateVector
+        :return: None
+        """
+
+        measurement = np.concatenate([state_vector.position, state_vector.velocity])
+        noise = np.array([self.position_noise] * 3 + [self.velocity_noise] * 3)
+        if (self.state is not None and state_vector.body == self.body and
+                self.update(state_vector.epoch, measurement, np.eye(6), noise)):
+            return
+        self.state = measurement
+        self.covariance = np.diag(np.square(noise))
+        self.epoch = state_vector.epoch
+        self.body = state_vector.body
+        self.grav_param = state_vector.grav_param
+        self.body_radius = state_vector.body_radius
+
+    def get_state_vector(self, universal_time):
+
+        """ Returns the estimate as a state vector.
+        :param universal_time: the time of the state vector (s)
+        :type universal_time: float
+        :rtype: StateVector
+        """
+
+        state, _ = self.predict(universal_time)
+        return StateVector(state[:3], state[3:], universal_time, self.body, self.grav_param, self.body_radius)
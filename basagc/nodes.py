@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+This module keeps a local model of the vessel's maneuver nodes, so that maneuver node commands are only sent to KSP
+when a node actually changes. The model is seeded once from the maneuverNodes telemetry, then kept in step with the
+commands sent. Burns own the nodes they create; nodes that were already on the flight plan are left alone unless a
+burn adopts one (a node at the same time with the same delta-v, eg after the computer was restarted).
+
+KSP keeps the nodes sorted by universal time and refers to them by their index in that order, so the model does too.
+"""
+
+from basagc import config
+if config.DEBUG:
+    from pudb import set_trace  # lint:ok
+from basagc import telemachus
+from basagc import utils
+from basagc.telemachus import get_telemetry
+
+
+class ManeuverNode:
+
+    """ A maneuver node on the vessel's flight plan. """
+
+    def __init__(self, ut, delta_v, owner=None):
+
+        """ Class constructor.
+        :param ut: universal time of the node (s)
+        :type ut: float
+        :param delta_v: node delta-v (radial, normal, prograde) (m/s)
+        :type delta_v: tuple of float
+        :param owner: the burn the node belongs to, None for nodes that were already on the flight plan
+        :return: None
+        """
+
+        self.ut = float(ut)
+        self.delta_v = tuple(float(component) for component in delta_v)
+        self.owner = owner
+
+    def matches(self, ut, delta_v):
+
+        """ Checks if the node is at ut with delta_v, within config.MANEUVER_NODE_TIME_TOLERANCE and
+        config.MANEUVER_NODE_DELTA_V_TOLERANCE.
+        :return: True if the node matches
+        :rtype: bool
+        """
+
+        if abs(self.ut - ut) > config.MANEUVER_NODE_TIME_TOLERANCE:
+            return False
+        return all(abs(current - new) <= config.MANEUVER_NODE_DELTA_V_TOLERANCE
+                   for current, new in zip(self.delta_v, delta_v))
+
+
+class ManeuverNodes:
+
+    """ The vessel's maneuver nodes. Commands are sent from the GUI thread only. """
+
+    def __init__(self):
+        self.nodes = None
+        self.commands_sent = 0
+
+    def seed(self):
+
+        """ Reads the nodes on the flight plan from telemetry, the first time the model is used.
+        :return: None
+        """
+
+        if self.nodes is not None:
+            return
+        self.nodes = [ManeuverNode(node["UT"], node["deltaV"]) for node in get_telemetry("maneuverNodes") or []]
+        self.nodes.sort(key=lambda node: node.ut)
+        utils.log("{} maneuver nodes on flight plan".format(len(self.nodes)))
+
+    def reset(self):
+
+        """ Forgets the model, it is seeded again from telemetry when it is next used.
+        :return: None
+        """
+
+        self.nodes = None
+
+    def get_node(self, owner):
+        if self.nodes is None:
+            return None
+        for node in self.nodes:
+            if node.owner is owner:
+                return node
+        return None
+
+    def has_node(self, owner):
+        return self.get_node(owner) is not None
+
+    def set_node(self, owner, ut, delta_v):
+
+        """ Puts owner's node at ut with delta_v. The node is added if owner doesn't have one (adopting a matching
+        node if there is one), and updated only if it has moved by more than the tolerances.
+        :param owner: the burn the node belongs to
+        :param ut: universal time of the node (s)
+        :type ut: float
+        :param delta_v: node delta-v (radial, normal, prograde) (m/s)
+        :type delta_v: tuple of float
+        :return: True if a command was sent to KSP
+        :rtype: bool
+        """
+
+        self.seed()
+        node = self.get_node(owner)
+        if node is None:
+            for candidate in self.nodes:
+                if candidate.owner is None and candidate.matches(ut, delta_v):
+                    utils.log("Adopting maneuver node at {:.2f}".format(candidate.ut))
+                    candidate.owner = owner
+                    return False
+            telemachus.add_maneuver_node(ut=ut, delta_v=delta_v)
+            self.nodes.append(ManeuverNode(ut, delta_v, owner))
+        elif node.matches(ut, delta_v):
+            return False
+        else:
+            telemachus.update_maneuver_node(ut=ut, delta_v=delta_v, index=self.nodes.index(node))
+            node.ut = float(ut)
+            node.delta_v = tuple(float(component) for component in delta_v)
+        self.nodes.sort(key=lambda node: node.ut)
+        self.commands_sent += 1
+        return True
+
+    def remove_node(self, owner):
+
+        """ Removes owner's node from the flight plan, if it has one.
+        :param owner: the burn the node belongs to
+        :return: True if a command was sent to KSP
+        :rtype: bool
+        """
+
+        node = self.get_node(owner)
+        if node is None:
+            return False
+        telemachus.remove_maneuver_node(index=self.nodes.index(node))
+        self.nodes.remove(node)
+        self.commands_sent += 1
+        return True
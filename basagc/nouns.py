@@ -1,14 +1,12 @@
 #!/usr/bin/env python3
 """ This module contains all nouns used by the guidance computer."""
 
-import inspect
-import sys
-from collections import OrderedDict
-
 from basagc import config
 if config.DEBUG:
     from pudb import set_trace  # lint:ok
 from basagc import utils
+from basagc.formatting import Field, TimeField
+from basagc.registry import Registry
 from basagc.telemachus import get_telemetry, TelemetryNotAvailable
 
 computer = None
@@ -33,19 +31,117 @@ class NounNotImplementedError(Exception):
     pass
 
 
+class NounRegistry(Registry):
+
+    """ Maps noun numbers to noun classes, and holds a single long lived instance of each noun.
+
+    JRI many verbs access nouns['xx'] without first testing if we have a class for Nounxx. As a workaround, a
+    subclass of Noun named Nounxx is created (once) for any undefined noun. Its return_data() raises
+    NounNotImplementedError.
+    """
+
+    def __init__(self):
+        super().__init__("noun")
+        self.instances = {}
+        self.undefined_nouns = {}
+
+    def __getitem__(self, name):
+        try:
+            return super().__getitem__(name)
+        except KeyError:
+            pass
+        try:
+            return self.undefined_nouns[name]
+        except KeyError:
+            undefined_noun = type("Noun" + name, (Noun,), {
+                "__init__": lambda self: Noun.__init__(self, description="Undefined", number=name)
+            })
+            self.undefined_nouns[name] = undefined_noun
+            return undefined_noun
+
+    def get_instance(self, name):
+
+        """ Returns the instance of the given noun, creating it on first use.
+        :param name: the noun number
+        :type name: str
+        :return: the noun instance
+        :rtype: Noun
+        """
+
+        try:
+            return self.instances[name]
+        except KeyError:
+            instance = self[name]()
+            self.instances[name] = instance
+            return instance
+
+    def get_data(self, name):
+
+        """ Returns the data of the given noun. The data is computed once per main loop tick and shared by every
+        caller in that tick.
+        :param name: the noun number
+        :type name: str
+        :return: the data returned by the noun's return_data()
+        """
+
+        instance = self.get_instance(name)
+        if not instance.is_memoized:
+            return instance.return_data()
+        return utils.tick_cache.get(("noun", name), instance.return_data)
+
+    def reset(self, name=None):
+
+        """ Discards the state of the given noun, or of all nouns.
+        :param name: the noun number, or None for all nouns
+        :type name: str
+        :return: None
+        """
+
+        if name is None:
+            for instance in self.instances.values():
+                instance.reset()
+        elif name in self.instances:
+            self.instances[name].reset()
+
+
+nouns = NounRegistry()
+
+
 class Noun(object):
 
+    """ Noun base class. Nouns are long lived: the registry creates one instance of each noun and hands it out to
+    every verb that displays it, so per noun state (eg previous samples for rate calculations) can be kept in
+    self.state.
+
+    Nouns that only show data held by the computer (eg data loaded by the user) set is_memoized to False, so they
+    always show the current value rather than the value from earlier in the main loop tick.
+    """
+
+    is_memoized = True
+
     def __init__(self, description, number):
         self.description = description
         self.number = number
+        self.state = {}
 
     def return_data(self):
         raise NounNotImplementedError
 
+    def reset(self):
+
+        """ Discards any state kept between calls to return_data().
+        :return: None
+        """
+
+        self.state.clear()
+
 # -----------------------BEGIN NORMAL NOUNS--------------------------------------
 
+@nouns.register("09")
 class Noun09(Noun):
 
+    is_memoized = False
+
     def __init__(self):
         super().__init__(description="Alarm Codes", number="09")
 
@@ -67,8 +163,11 @@ class Noun09(Noun):
         return data
 
 
+@nouns.register("14")
 class Noun14(Noun):
 
+    fields = (Field(), Field(), Field(decimals=1))
+
     def __init__(self):
         super().__init__(description="Burn error display (Expected Δv at cutoff (xxxxx m/s), Actual Δv at"
                                                  "cutoff (xxxxx m/s), Difference (xxxx.x m/s)",
@@ -83,14 +182,11 @@ class Noun14(Noun):
         actual_delta_v_at_cutoff = get_telemetry("orbitalVelocity")
         delta_v_error = actual_delta_v_at_cutoff - expected_delta_v_at_cutoff
 
-        expected_delta_v_at_cutoff = str(int(expected_delta_v_at_cutoff)).replace(".", "")
-        actual_delta_v_at_cutoff = str(int(actual_delta_v_at_cutoff)).replace(".", "")
-        delta_v_error = str(round(delta_v_error, 1)).replace(".", "")
-
         data = {
             1: expected_delta_v_at_cutoff,
             2: actual_delta_v_at_cutoff,
             3: delta_v_error,
+            "fields": self.fields,
             "tooltips": [
                 "Expected velocity at cutoff (xxxxx m/s)",
                 "Actual velocity at cutoff (xxxxx m/s)",
@@ -107,30 +203,26 @@ class Noun14(Noun):
 # def noun16(calling_verb):
 #     raise NounNotImplementedError
 
+@nouns.register("17")
 class Noun17(Noun):
 
+    fields = (Field(decimals=1), Field(decimals=1), Field(decimals=1))
+
     def __init__(self):
         super().__init__("Attitude (Roll, Pitch, Yaw)", number="17")
 
     def return_data(self):
 
-        # FIXME: need to make sure that data is correct length (sometimes drops the last 0 when input is xxx.x rather
-        # then xxx.xx
-        try:
-            roll = str(round(get_telemetry("roll"), 1))
-            pitch = str(round(get_telemetry("pitch"), 1))
-            yaw = str(round(get_telemetry("heading"), 1))
-        except TelemetryNotAvailable:
-            raise
-
-        roll = roll.replace(".", "")
-        pitch = pitch.replace(".", "")
-        yaw = yaw.replace(".", "")
+        attitude = computer.imu.get_attitude()
+        roll = attitude["outer"][0]
+        pitch = attitude["inner"][0]
+        yaw = attitude["middle"][0]
 
         data = {
             1: roll,
             2: pitch,
             3: yaw,
+            "fields": self.fields,
             "is_octal": False,
             "tooltips": [
                 "Roll (0xxx.x°)",
@@ -141,19 +233,20 @@ class Noun17(Noun):
         return data
 
 
+@nouns.register("25")
 class Noun25(Noun):
     
+    is_memoized = False
+
     def __init__(self):
         
         super().__init__("Spacecraft mass", number="25")
-        self.mass_whole_part = computer.noun_data["25"][0]
-        self.mass_fractional_part = computer.noun_data["25"][1]
 
     def return_data(self):
 
         data = {
-            1: self.mass_whole_part,
-            2: self.mass_fractional_part,
+            1: computer.noun_data["25"][0],
+            2: computer.noun_data["25"][1],
             3: "bbbbb",
             "tooltips": ["Spacecraft mass ", None, None],
             "is_octal": True,
@@ -162,9 +255,33 @@ class Noun25(Noun):
 
 
 
-        
+
+@nouns.register("26")
+class Noun26(Noun):
+
+    is_memoized = False
+
+    def __init__(self):
+
+        super().__init__("Stage dry mass", number="26")
+
+    def return_data(self):
+
+        data = {
+            1: computer.noun_data["26"][0],
+            2: computer.noun_data["26"][1],
+            3: "bbbbb",
+            "tooltips": ["Stage dry mass (0 if not known)", None, None],
+            "is_octal": True,
+        }
+        return data
+
+
+@nouns.register("30")
 class Noun30(Noun):
     
+    is_memoized = False
+
     def __init__(self):
         
         super().__init__("Octal Target ID (000XX)", number="30")
@@ -184,8 +301,11 @@ class Noun30(Noun):
     def receive_data(self, data):
         computer.noun_data["30"] = data
 
+@nouns.register("31")
 class Noun31(Noun):
     
+    is_memoized = False
+
     def __init__(self):
         
         super().__init__("Stage Max Thrust", number="31")
@@ -202,8 +322,11 @@ class Noun31(Noun):
         }
         return data
 
+@nouns.register("33")
 class Noun33(Noun):
 
+    fields = (TimeField("bbbhh"), TimeField("bbbmm", wrap=True), TimeField("bbbss", wrap=True))
+
     def __init__(self):
         super().__init__("Time to Ignition (00xxx hours, 000xx minutes, 0xx.xx seconds)", number="33")
 
@@ -212,15 +335,13 @@ class Noun33(Noun):
         if not computer.next_burn:
             computer.program_alarm(alarm_code=115, message="No burn data loaded")
             return False
-        time_until_ignition = utils.seconds_to_time(computer.next_burn.calculate_time_to_ignition())
-        hours = str(int(time_until_ignition["hours"]))
-        minutes = str(int(time_until_ignition["minutes"]))
-        seconds = str(int(time_until_ignition["seconds"])).replace(".", "")
+        time_from_ignition = -computer.next_burn.calculate_time_to_ignition()
 
         data = {
-            1: "-" + hours,
-            2: "-000" + minutes,
-            3: "-000" + seconds,
+            1: time_from_ignition,
+            2: time_from_ignition,
+            3: time_from_ignition,
+            "fields": self.fields,
             "tooltips": [
                 "Time To Ignition (hhhhh)",
                 "Time To Ignition (bbbmm)",
@@ -231,8 +352,11 @@ class Noun33(Noun):
         return data
 
 
+@nouns.register("36")
 class Noun36(Noun):
 
+    fields = (TimeField("ddbhh"), TimeField("bbbmm", wrap=True), TimeField("bsscc", wrap=True))
+
     def __init__(self):
         super().__init__("Mission Elapsed Time (MET) (dddhh, bbbmm, bss.ss)", number="36")
 
@@ -242,18 +366,11 @@ class Noun36(Noun):
         except TelemetryNotAvailable:
             raise
 
-        minutes, seconds = divmod(telemetry, 60)
-        hours, minutes = divmod(minutes, 60)
-        days, hours = divmod(hours, 24)
-
-        days = str(int(days)).zfill(2)
-        hours = str(int(hours)).zfill(2)
-        minutes = str(int(minutes)).zfill(2)
-        seconds = str(round(seconds, 2)).replace(".", "").zfill(4)
         data = {
-            1: days + "b" + hours,
-            2: "bbb" + minutes,
-            3: "b" + seconds,
+            1: telemetry,
+            2: telemetry,
+            3: telemetry,
+            "fields": self.fields,
             "tooltips": [
                 "Mission Elapsed Time (ddbhh)",
                 "Mission Elapsed Time (bbbmm)",
@@ -263,8 +380,11 @@ class Noun36(Noun):
         }
         return data
 
+@nouns.register("38")
 class Noun38(Noun):
     
+    is_memoized = False
+
     def __init__(self):
         
         super().__init__("Specific Impulse", number="38")
@@ -283,8 +403,11 @@ class Noun38(Noun):
 
 #-----------------------BEGIN MIXED NOUNS--------------------------------------
 
+@nouns.register("40")
 class Noun40(Noun):
 
+    fields = (TimeField("mmbss"), Field(), Field())
+
     def __init__(self):
         super().__init__("Burn Data (Time from ignition, orbital velocity, accumulated Δv", number="40")
 
@@ -293,16 +416,12 @@ class Noun40(Noun):
             computer.program_alarm(115)
             return False
         burn = computer.next_burn
-        time_to_ignition = utils.seconds_to_time(burn.time_until_ignition)
-        minutes_to_ignition = str(int(time_to_ignition["minutes"])).zfill(2)
-        seconds_to_ignition = str(int(time_to_ignition["seconds"])).zfill(2)
-        velocity = str(int(get_telemetry("orbitalVelocity"))).replace(".", "")
-        accumulated_delta_v = str(int(burn.accumulated_delta_v)).replace(".", "")
 
         data = {
-            1: "-" + minutes_to_ignition + "b" + seconds_to_ignition,
-            2: velocity,
-            3: accumulated_delta_v,
+            1: -burn.time_until_ignition,
+            2: get_telemetry("orbitalVelocity"),
+            3: burn.accumulated_delta_v,
+            "fields": self.fields,
             "is_octal": False,
             "tooltips": [
                 "Time From Ignition (mmbss minutes, seconds)",
@@ -312,70 +431,61 @@ class Noun40(Noun):
         }
         return data
 
+@nouns.register("43")
 class Noun43(Noun):
 
+    fields = (Field(decimals=2), Field(decimals=2), Field(decimals=1, scale=0.001))
+
     def __init__(self):
         super().__init__("Geographic Position (Latitude, Longitude, Altitude)", number="43")
 
     def return_data(self):
         try:
-            # latitude = str(round(get_telemetry("lat"), 2)).replace(".", "").zfill(5)
-            # longitude = str(round(get_telemetry("long"), 2)).replace(".", "").zfill(5)
-            # altitude = str(round(get_telemetry("altitude") / 1000, 1)).replace(".", "").zfill(5)
-            latitude = str(round(get_telemetry("lat"), 2))
-            longitude = str(round(get_telemetry("long"), 2))
-            altitude = str(round(get_telemetry("altitude") / 1000, 1))
+            latitude = get_telemetry("lat")
+            longitude = get_telemetry("long")
+            altitude = get_telemetry("altitude")
         except TelemetryNotAvailable:
             raise
 
-        # the following fixes a problem that round() will discard a trailing 0 eg 100.10 becomes 100.1
-        if latitude[-2] == ".":
-            latitude += "0"
-        if longitude[-2] == ".":
-            longitude += "0"
-
-        latitude = latitude.replace(".", "")
-        longitude = longitude.replace(".", "")
-        altitude = altitude.replace(".", "")
-
         data = {
             1: latitude,
             2: longitude,
             3: altitude,
+            "fields": self.fields,
             "is_octal": False,
             "tooltips": [
                 "Latitude (xxx.xx°)",
                 "Longitude (xxx.xx°)",
-                "Altitude",  # TODO
+                "Altitude (xxxx.x km)",
             ],
         }
         return data
 
+@nouns.register("44")
 class Noun44(Noun):
+
+    fields = (Field(decimals=2, scale=0.001), Field(decimals=2, scale=0.001), TimeField("hmmss"))
+
     def __init__(self):
         super().__init__("Apoapsis (xxx.xx km), Periapsis (xxx.xx km), Time To Apoapsis (hmmss)",
                                      number="44")
 
     def return_data(self):
-        try:
-            apoapsis = str(round(get_telemetry("ApA") / 100, 1))
-            periapsis = str(round(get_telemetry("PeA") / 100, 1))
-            tff = int(get_telemetry("timeToAp"))
-        except TelemetryNotAvailable:
-            raise
-
-        apoapsis = apoapsis.replace(".", "")
-        periapsis = periapsis.replace(".", "")
-
-        tff_minutes, tff_seconds = divmod(tff, 60)
-        tff_hours, tff_minutes = divmod(tff_minutes, 60)
-
-        tff = str(tff_hours).zfill(1) + str(tff_minutes).zfill(2) + str(tff_seconds).zfill(2)
+        state_vector = computer.get_current_state_vector()
+        if state_vector:
+            apoapsis = state_vector.apoapsis_altitude
+            periapsis = state_vector.periapsis_altitude
+            time_to_apoapsis = state_vector.time_to_apoapsis(get_telemetry("universalTime"))
+        else:
+            apoapsis = get_telemetry("ApA")
+            periapsis = get_telemetry("PeA")
+            time_to_apoapsis = get_telemetry("timeToAp")
 
         data = {
             1: apoapsis,
             2: periapsis,
-            3: tff,
+            3: time_to_apoapsis,
+            "fields": self.fields,
             "tooltips": [
                 "Apoapsis Altitude (xxx.xx km)",
                 "Periapsis Altitude (xxx.xx km)",
@@ -386,6 +496,48 @@ class Noun44(Noun):
         return data
 
 
+@nouns.register("47")
+class Noun47(Noun):
+
+    is_memoized = False
+
+    def __init__(self):
+
+        super().__init__("Target inclination (xxx.xx°)", number="47")
+
+    def return_data(self):
+
+        data = {
+            1: computer.noun_data["47"][0],
+            2: "bbbbb",
+            3: "bbbbb",
+            "tooltips": ["Target inclination (xxx.xx°)", None, None],
+            "is_octal": True,
+        }
+        return data
+
+
+@nouns.register("48")
+class Noun48(Noun):
+
+    is_memoized = False
+
+    def __init__(self):
+
+        super().__init__("Target apoapsis (xxxxx km), target periapsis (xxxxx km)", number="48")
+
+    def return_data(self):
+
+        data = {
+            1: computer.noun_data["48"][0],
+            2: computer.noun_data["48"][1],
+            3: "bbbbb",
+            "tooltips": ["Target apoapsis altitude (xxxxx km)", "Target periapsis altitude (xxxxx km)", None],
+            "is_octal": True,
+        }
+        return data
+
+
 #class Noun49(Noun):
     #def __init__(self):
         #super().__init__("Phase angles for automaneuver", number="49")
@@ -421,19 +573,20 @@ class Noun44(Noun):
         #return data
         
 
+@nouns.register("50")
 class Noun50(Noun):
+
+    fields = (Field(decimals=1), Field(decimals=1), Field(decimals=1))
+
     def __init__(self):
         super().__init__("Surface Velocity Display (X, Y, Z in xxxx.x m/s)", number="50")
 
     def return_data(self):
-        surface_velocity_x = str(round(get_telemetry("surfaceVelocityx"), 1)).replace(".", "")
-        surface_velocity_y = str(round(get_telemetry("surfaceVelocityy"), 1)).replace(".", "")
-        surface_velocity_z = str(round(get_telemetry("surfaceVelocityz"), 1)).replace(".", "")
-
         data = {
-            1: surface_velocity_x,
-            2: surface_velocity_y,
-            3: surface_velocity_z,
+            1: get_telemetry("surfaceVelocityx"),
+            2: get_telemetry("surfaceVelocityy"),
+            3: get_telemetry("surfaceVelocityz"),
+            "fields": self.fields,
             "tooltips": [
                 "Surface Velocity X (xxxx.x m/s)",
                 "Surface Velocity Y (xxxx.x m/s)",
@@ -444,23 +597,20 @@ class Noun50(Noun):
         return data
 
 
+@nouns.register("62")
 class Noun62(Noun):
+
+    fields = (Field(decimals=1), Field(decimals=1), Field(decimals=1, scale=0.001))
+
     def __init__(self):
         super().__init__("Orbital Velocity, Altitude Rate, Altitude", number="62")
 
     def return_data(self):
-        surface_velocity = str(round(get_telemetry("relativeVelocity"), 1))
-        altitude_rate = str(round(get_telemetry("verticalSpeed"), 1))
-        altitude = str(round(get_telemetry("altitude") / 1000, 1))
-
-        surface_velocity = surface_velocity.replace(".", "")
-        altitude_rate = altitude_rate.replace(".", "")
-        altitude = altitude.replace(".", "")
-
         data = {
-            1: surface_velocity,
-            2: altitude_rate,
-            3: altitude,
+            1: get_telemetry("relativeVelocity"),
+            2: get_telemetry("verticalSpeed"),
+            3: get_telemetry("altitude"),
+            "fields": self.fields,
             "is_octal": False,
             "tooltips": [
                 "Inertial Velocity (xxxx.x m/s)",
@@ -471,8 +621,43 @@ class Noun62(Noun):
         return data
 
 
+@nouns.register("75")
+class Noun75(Noun):
+
+    fields = (Field(decimals=1, scale=0.001), Field(decimals=1), TimeField("mmbss"))
+
+    def __init__(self):
+        super().__init__("Rendezvous data (Δh (xxxx.x km), next burn Δv (xxxx.x m/s), time from TPI (mmbss))",
+                         number="75")
+
+    def return_data(self):
+
+        rendezvous = computer.rendezvous
+        if not rendezvous:
+            computer.program_alarm(229)
+            return False
+        stage = min(rendezvous.get_stage(), 2)
+
+        data = {
+            1: rendezvous.delta_height,
+            2: rendezvous.delta_v[stage],
+            3: get_telemetry("universalTime") - rendezvous.times[2],
+            "fields": self.fields,
+            "is_octal": False,
+            "tooltips": [
+                "Height Below Target Orbit (xxxx.x km)",
+                "Next Burn Δv (xxxx.x m/s)",
+                "Time From TPI (mmbss minutes, seconds)",
+            ],
+        }
+        return data
+
+
+@nouns.register("95")
 class Noun95(Noun):
-    
+
+    fields = (TimeField("mmbss"), Field(), Field())
+
     def __init__(self):
         super().__init__(description="TMI Burn Data Display", number="95")
 
@@ -482,16 +667,11 @@ class Noun95(Noun):
             computer.program_alarm(115)
             return False
 
-        time_to_ignition = utils.seconds_to_time(computer.next_burn.time_until_ignition)
-        minutes_to_ignition = str(int(time_to_ignition["minutes"])).zfill(2)
-        seconds_to_ignition = str(int(time_to_ignition["seconds"])).zfill(2)
-        delta_v = str(int(computer.next_burn.delta_v_required))
-        burn_duration = str(int(computer.next_burn.burn_duration))
-
         data = {
-            1: "-" + minutes_to_ignition + "b" + seconds_to_ignition,
-            2: delta_v,
-            3: burn_duration,
+            1: -computer.next_burn.time_until_ignition,
+            2: computer.next_burn.delta_v_required,
+            3: computer.next_burn.burn_duration,
+            "fields": self.fields,
             "is_octal": False,
             "tooltips": [
                 "Time To Ignition (TIG) (xxbxx mins, seconds)",
@@ -501,25 +681,36 @@ class Noun95(Noun):
         }
         return data
 
-# generate a OrderedDict of all nouns for inclusion in the computer
 
-# JRI many verbs access nouns['xx'] without first testing
-#   if we have a class for Nounxx. As a workaround, create a container class 
-#   here that dynamically creates a new subclass of Noun named Nounxx as needed
-class OrderedDictDefaultNoun(OrderedDict):
+@nouns.register("96")
+class Noun96(Noun):
+
+    fields = (TimeField("ddbhh"), Field(), TimeField("ddbhh"))
 
     def __init__(self):
-        super().__init__()
-    
-    def __getitem__(self, name):
-        try:
-            return super().__getitem__(name)
-        except KeyError:
-            self[name] = type("Noun" + name, (Noun,), {'__init__' : lambda self: Noun.__init__(self, description='Undefined', number=name)})
-            return self[name]
-            
-nouns = OrderedDictDefaultNoun()
-clsmembers = inspect.getmembers(sys.modules[__name__], inspect.isclass)
-for class_tuple in clsmembers:
-    if class_tuple[0][-1].isdigit():
-        nouns[class_tuple[0][-2:]] = class_tuple[1]
+        super().__init__("Transfer window (time to departure (ddbhh), departure Δv (xxxxx m/s), time of flight "
+                         "(ddbhh))", number="96")
+
+    def return_data(self):
+
+        window = computer.transfer_window
+        if not window:
+            computer.program_alarm(227)
+            return False
+
+        data = {
+            1: get_telemetry("universalTime") - window.time_of_departure,
+            2: window.departure_delta_v,
+            3: window.time_of_flight,
+            "fields": self.fields,
+            "is_octal": False,
+            "tooltips": [
+                "Time From Departure (ddbhh days, hours)",
+                "Departure Δv (xxxxx m/s)",
+                "Time Of Flight (ddbhh days, hours)",
+            ],
+        }
+        return data
+
+
+nouns.load_plugins("basagc.nouns")
@@ -0,0 +1,1014 @@
+#!/usr/bin/env python3
+"""
+This module contains the orbital mechanics kernels used for maneuver planning. The kernels work on NumPy arrays, so
+that one call can evaluate thousands of candidate orbits; scalars work too, and give 0-d arrays back (use float() on
+the results).
+
+Run this module to benchmark the kernels:
+    python3 -m basagc.orbital
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from basagc import config
+if config.DEBUG:
+    from pudb import set_trace  # lint:ok
+
+HohmannSolution = namedtuple("HohmannSolution", [
+    "delta_v_1",  # velocity change at departure (m/s)
+    "delta_v_2",  # velocity change at arrival (m/s)
+    "time_of_flight",  # time from departure to arrival (s)
+    "phase_angle",  # angle the target must lead the vessel by at departure (degrees)
+    "velocity_departure",  # circular orbit velocity at the departure radius (m/s)
+    "velocity_arrival",  # circular orbit velocity at the arrival radius (m/s)
+    "transfer_velocity_departure",  # transfer orbit velocity at the departure radius (m/s)
+    "transfer_velocity_arrival",  # transfer orbit velocity at the arrival radius (m/s)
+])
+
+Orbit = namedtuple("Orbit", [
+    "sma",  # semi-major axis (m)
+    "eccentricity",
+    "inclination",  # radians
+    "lan",  # longitude of the ascending node (radians)
+    "argument_of_periapsis",  # radians
+    "mean_anomaly",  # mean anomaly at epoch (radians)
+    "epoch",  # universal time of the mean anomaly (s)
+    "grav_param",  # gravitational parameter of the orbited body (m^3/s^2)
+])
+
+CoellipticSolution = namedtuple("CoellipticSolution", [
+    "cdh_time",  # universal time of CDH (s)
+    "cdh_position",  # position at CDH (m)
+    "cdh_velocity",  # velocity before the CDH burn (m/s)
+    "cdh_delta_v",  # velocity change at CDH (m/s)
+    "delta_height",  # height below the target orbit after CDH (m)
+    "tpi_time",  # universal time the target reaches the TPI elevation (s), NaN if it doesn't within an orbit
+])
+
+PorkchopSolution = namedtuple("PorkchopSolution", [
+    "departure_times",  # universal times of departure, shape (m,)
+    "flight_times",  # times of flight, shape (n,)
+    "departure_delta_v",  # delta-v needed at departure, shape (m, n)
+    "arrival_delta_v",  # velocity relative to the target at arrival, shape (m, n)
+    "best",  # (departure index, flight time index) of the smallest total delta-v
+    "departure_velocity_change",  # velocity change vector at departure for the best window
+])
+
+
+def hohmann(departure_radius, destination_radius, grav_param):
+
+    """ Calculates Hohmann transfers between circular, coplanar orbits. The arguments are broadcast against each
+    other, eg an array of departure radii with a single destination radius and gravitational parameter.
+    :param departure_radius: radius of the departure orbit (m)
+    :type departure_radius: float | numpy.ndarray
+    :param destination_radius: radius of the destination orbit (m)
+    :type destination_radius: float | numpy.ndarray
+    :param grav_param: gravitational parameter of the orbited body (m^3/s^2)
+    :type grav_param: float | numpy.ndarray
+    :return: the transfers. Positive delta-v is prograde, negative is retrograde
+    :rtype: HohmannSolution
+    """
+
+    r1 = np.asarray(departure_radius, dtype=float)
+    r2 = np.asarray(destination_radius, dtype=float)
+    mu = np.asarray(grav_param, dtype=float)
+
+    sma = (r1 + r2) / 2
+    velocity_departure = np.sqrt(mu / r1)
+    velocity_arrival = np.sqrt(mu / r2)
+    transfer_velocity_departure = np.sqrt(mu * (2 / r1 - 1 / sma))
+    transfer_velocity_arrival = np.sqrt(mu * (2 / r2 - 1 / sma))
+    time_of_flight = np.pi * np.sqrt(sma ** 3 / mu)
+    # the target moves through (its angular velocity * time of flight) during the transfer, and must arrive at the
+    # point opposite the departure point
+    phase_angle = 180 - np.degrees(velocity_arrival / r2 * time_of_flight)
+
+    return HohmannSolution(
+        delta_v_1=transfer_velocity_departure - velocity_departure,
+        delta_v_2=velocity_arrival - transfer_velocity_arrival,
+        time_of_flight=time_of_flight,
+        phase_angle=phase_angle,
+        velocity_departure=velocity_departure,
+        velocity_arrival=velocity_arrival,
+        transfer_velocity_departure=transfer_velocity_departure,
+        transfer_velocity_arrival=transfer_velocity_arrival,
+    )
+
+
+def orbit_from_elements(sma, eccentricity, inclination, lan, argument_of_periapsis, true_anomaly, epoch,
+                        grav_param):
+
+    """ Makes an Orbit from Keplerian elements, with the angles in degrees as given by Telemachus. Hyperbolic orbits
+    have a negative semi-major axis.
+    :param true_anomaly: true anomaly at epoch (degrees)
+    :param epoch: universal time of the true anomaly (s)
+    :return: the orbit
+    :rtype: Orbit
+    """
+
+    eccentricity = float(eccentricity)
+    mean_anomaly = true_to_mean_anomaly(np.radians(true_anomaly), eccentricity)
+    return Orbit(float(sma), eccentricity, float(np.radians(inclination)), float(np.radians(lan)),
+                 float(np.radians(argument_of_periapsis)), float(mean_anomaly), float(epoch), float(grav_param))
+
+
+def orbital_period(orbit):
+    return 2 * np.pi * np.sqrt(orbit.sma ** 3 / orbit.grav_param)
+
+
+def mean_motion(orbit):
+    return np.sqrt(orbit.grav_param / abs(orbit.sma) ** 3)
+
+
+def true_to_mean_anomaly(true_anomaly, eccentricity):
+
+    """ Converts true anomalies to mean anomalies. The mean anomaly of hyperbolic orbits is e sinh(F) - F, where F is
+    the hyperbolic anomaly.
+    :param true_anomaly: true anomaly (radians)
+    :type true_anomaly: float | numpy.ndarray
+    :param eccentricity: eccentricity
+    :type eccentricity: float
+    :return: mean anomaly (radians)
+    :rtype: numpy.ndarray
+    """
+
+    if eccentricity < 1:
+        eccentric_anomaly = 2 * np.arctan2(np.sqrt(1 - eccentricity) * np.sin(true_anomaly / 2),
+                                           np.sqrt(1 + eccentricity) * np.cos(true_anomaly / 2))
+        return eccentric_anomaly - eccentricity * np.sin(eccentric_anomaly)
+    hyperbolic_anomaly = 2 * np.arctanh(np.sqrt((eccentricity - 1) / (eccentricity + 1)) * np.tan(true_anomaly / 2))
+    return eccentricity * np.sinh(hyperbolic_anomaly) - hyperbolic_anomaly
+
+
+def solve_kepler(mean_anomaly, eccentricity, tolerance=1e-12, max_iterations=50):
+
+    """ Solves Kepler's equation (M = E - e sin E) for the eccentric anomaly of elliptical orbits, by Newton's
+    method.
+    :param mean_anomaly: mean anomaly (radians)
+    :type mean_anomaly: float | numpy.ndarray
+    :param eccentricity: eccentricity, less than 1
+    :type eccentricity: float | numpy.ndarray
+    :return: eccentric anomaly (radians)
+    :rtype: numpy.ndarray
+    """
+
+    mean_anomaly = np.asarray(mean_anomaly, dtype=float)
+    eccentric_anomaly = np.where(eccentricity < 0.8, mean_anomaly, np.pi + np.zeros_like(mean_anomaly))
+    for _ in range(max_iterations):
+        step = ((eccentric_anomaly - eccentricity * np.sin(eccentric_anomaly) - mean_anomaly) /
+                (1 - eccentricity * np.cos(eccentric_anomaly)))
+        eccentric_anomaly = eccentric_anomaly - step
+        if np.all(np.abs(step) < tolerance):
+            break
+    return eccentric_anomaly
+
+
+def solve_hyperbolic_kepler(mean_anomaly, eccentricity, tolerance=1e-12, max_iterations=50):
+
+    """ Solves Kepler's equation for hyperbolic orbits (M = e sinh F - F) for the hyperbolic anomaly, by Newton's
+    method.
+    :param mean_anomaly: mean anomaly (radians)
+    :type mean_anomaly: float | numpy.ndarray
+    :param eccentricity: eccentricity, greater than 1
+    :type eccentricity: float
+    :return: hyperbolic anomaly (radians)
+    :rtype: numpy.ndarray
+    """
+
+    mean_anomaly = np.asarray(mean_anomaly, dtype=float)
+    hyperbolic_anomaly = np.arcsinh(mean_anomaly / eccentricity)
+    for _ in range(max_iterations):
+        step = ((eccentricity * np.sinh(hyperbolic_anomaly) - hyperbolic_anomaly - mean_anomaly) /
+                (eccentricity * np.cosh(hyperbolic_anomaly) - 1))
+        hyperbolic_anomaly = hyperbolic_anomaly - step
+        if np.all(np.abs(step) < tolerance):
+            break
+    return hyperbolic_anomaly
+
+
+def perifocal_to_inertial(inclination, lan, argument_of_periapsis):
+
+    """ Returns the rotation matrix from the perifocal frame (x towards periapsis, z along the orbit normal) to the
+    frame the orbital elements are measured in.
+    """
+
+    cos_lan, sin_lan = np.cos(lan), np.sin(lan)
+    cos_inc, sin_inc = np.cos(inclination), np.sin(inclination)
+    cos_arg, sin_arg = np.cos(argument_of_periapsis), np.sin(argument_of_periapsis)
+    return np.array([
+        [cos_lan * cos_arg - sin_lan * sin_arg * cos_inc, -cos_lan * sin_arg - sin_lan * cos_arg * cos_inc,
+         sin_lan * sin_inc],
+        [sin_lan * cos_arg + cos_lan * sin_arg * cos_inc, -sin_lan * sin_arg + cos_lan * cos_arg * cos_inc,
+         -cos_lan * sin_inc],
+        [sin_arg * sin_inc, cos_arg * sin_inc, cos_inc],
+    ])
+
+
+def orbit_state(orbit, times):
+
+    """ Calculates position and velocity on an elliptical or hyperbolic orbit.
+    :param orbit: the orbit
+    :type orbit: Orbit
+    :param times: universal times (s)
+    :type times: float | numpy.ndarray
+    :return: positions (m) and velocities (m/s), each of shape times.shape + (3,)
+    :rtype: tuple of numpy.ndarray
+    """
+
+    times = np.asarray(times, dtype=float)
+    e = orbit.eccentricity
+    mean_anomaly = orbit.mean_anomaly + mean_motion(orbit) * (times - orbit.epoch)
+    if e < 1:
+        eccentric_anomaly = solve_kepler(mean_anomaly, e)
+        true_anomaly = 2 * np.arctan2(np.sqrt(1 + e) * np.sin(eccentric_anomaly / 2),
+                                      np.sqrt(1 - e) * np.cos(eccentric_anomaly / 2))
+        radius = orbit.sma * (1 - e * np.cos(eccentric_anomaly))
+    else:
+        hyperbolic_anomaly = solve_hyperbolic_kepler(mean_anomaly, e)
+        true_anomaly = 2 * np.arctan(np.sqrt((e + 1) / (e - 1)) * np.tanh(hyperbolic_anomaly / 2))
+        radius = orbit.sma * (1 - e * np.cosh(hyperbolic_anomaly))
+    speed_factor = np.sqrt(orbit.grav_param / (orbit.sma * (1 - e ** 2)))
+
+    zeros = np.zeros_like(true_anomaly)
+    position = np.stack([radius * np.cos(true_anomaly), radius * np.sin(true_anomaly), zeros], axis=-1)
+    velocity = np.stack([-speed_factor * np.sin(true_anomaly), speed_factor * (e + np.cos(true_anomaly)), zeros],
+                        axis=-1)
+    rotation = perifocal_to_inertial(orbit.inclination, orbit.lan, orbit.argument_of_periapsis)
+    return position @ rotation.T, velocity @ rotation.T
+
+
+def stumpff(z):
+
+    """ Returns the Stumpff functions C(z) and S(z) used by the universal variable formulation.
+    :param z: universal variable squared over the semi-major axis
+    :type z: numpy.ndarray
+    :return: C(z), S(z)
+    :rtype: tuple of numpy.ndarray
+    """
+
+    z = np.asarray(z, dtype=float)
+    c = np.full_like(z, 1 / 2)
+    s = np.full_like(z, 1 / 6)
+    positive = z > 1e-8
+    negative = z < -1e-8
+    with np.errstate(invalid="ignore", divide="ignore"):
+        root = np.sqrt(z[positive])
+        c[positive] = (1 - np.cos(root)) / z[positive]
+        s[positive] = (root - np.sin(root)) / root ** 3
+        root = np.sqrt(-z[negative])
+        c[negative] = (np.cosh(root) - 1) / -z[negative]
+        s[negative] = (np.sinh(root) - root) / root ** 3
+    return c, s
+
+
+def lambert(position_1, position_2, time_of_flight, grav_param, prograde=True, iterations=64):
+
+    """ Solves Lambert's problem (the orbit joining two positions in a given time) for many position pairs at once,
+    with the universal variable method. The universal variable is found by bisection, which always converges for
+    single revolution transfers and takes the same number of steps for every pair, so the whole batch is solved
+    together.
+    :param position_1: departure positions (m), shape (n, 3)
+    :type position_1: numpy.ndarray
+    :param position_2: arrival positions (m), shape (n, 3)
+    :type position_2: numpy.ndarray
+    :param time_of_flight: times of flight (s), shape (n,)
+    :type time_of_flight: numpy.ndarray
+    :param grav_param: gravitational parameter of the orbited body (m^3/s^2)
+    :type grav_param: float
+    :param prograde: if True, find transfers in the direction of motion of a prograde orbit
+    :type prograde: bool
+    :return: velocities at departure and at arrival (m/s), each shape (n, 3). Transfers that can't be solved
+             (eg the positions are 180 degrees apart) are NaN
+    :rtype: tuple of numpy.ndarray
+    """
+
+    position_1 = np.atleast_2d(np.asarray(position_1, dtype=float))
+    position_2 = np.atleast_2d(np.asarray(position_2, dtype=float))
+    time_of_flight = np.asarray(time_of_flight, dtype=float)
+    radius_1 = np.linalg.norm(position_1, axis=-1)
+    radius_2 = np.linalg.norm(position_2, axis=-1)
+    sqrt_grav_param = np.sqrt(grav_param)
+
+    cos_transfer_angle = np.clip(np.sum(position_1 * position_2, axis=-1) / (radius_1 * radius_2), -1, 1)
+    transfer_angle = np.arccos(cos_transfer_angle)
+    normal_z = np.cross(position_1, position_2)[..., 2]
+    long_way = normal_z < 0 if prograde else normal_z >= 0
+    transfer_angle = np.where(long_way, 2 * np.pi - transfer_angle, transfer_angle)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        a = np.sin(transfer_angle) * np.sqrt(radius_1 * radius_2 / (1 - cos_transfer_angle))
+
+        def y_of(z, c, s):
+            return radius_1 + radius_2 + a * (z * s - 1) / np.sqrt(c)
+
+        lower = np.full_like(time_of_flight, -4 * np.pi ** 2)
+        upper = np.full_like(time_of_flight, 4 * np.pi ** 2)
+        for _ in range(iterations):
+            z = (lower + upper) / 2
+            c, s = stumpff(z)
+            y = y_of(z, c, s)
+            time = ((y / c) ** 1.5 * s + a * np.sqrt(y)) / sqrt_grav_param
+            # y < 0 happens below the smallest z that gives a real transfer, so z must go up
+            too_short = (y < 0) | (time < time_of_flight)
+            lower = np.where(too_short, z, lower)
+            upper = np.where(too_short, upper, z)
+
+        z = (lower + upper) / 2
+        c, s = stumpff(z)
+        y = y_of(z, c, s)
+        f = 1 - y / radius_1
+        g = a * np.sqrt(y / grav_param)
+        g_dot = 1 - y / radius_2
+        velocity_1 = (position_2 - f[..., None] * position_1) / g[..., None]
+        velocity_2 = (g_dot[..., None] * position_2 - position_1) / g[..., None]
+    return velocity_1, velocity_2
+
+
+def propagate(position, velocity, time, grav_param, tolerance=1e-9, max_iterations=50):
+
+    """ Advances state vectors along their (elliptical, parabolic or hyperbolic) orbits with the universal variable
+    formulation of Kepler's equation. A single state can be propagated to many times, many states to one time, or
+    many states to a time each.
+    :param position: position(s) (m), shape (3,) or (n, 3)
+    :type position: numpy.ndarray
+    :param velocity: velocity(s) (m/s), shape (3,) or (n, 3)
+    :type velocity: numpy.ndarray
+    :param time: time(s) to advance by (s), may be negative
+    :type time: float | numpy.ndarray
+    :param grav_param: gravitational parameter of the orbited body (m^3/s^2)
+    :type grav_param: float
+    :return: positions and velocities after time, shape broadcast from the arguments + (3,)
+    :rtype: tuple of numpy.ndarray
+    """
+
+    position = np.asarray(position, dtype=float)
+    velocity = np.asarray(velocity, dtype=float)
+    time = np.asarray(time, dtype=float)
+    shape = np.broadcast_shapes(position.shape[:-1], velocity.shape[:-1], time.shape)
+    position = np.broadcast_to(position, shape + (3,))
+    velocity = np.broadcast_to(velocity, shape + (3,))
+    time = np.broadcast_to(time, shape)
+
+    sqrt_grav_param = np.sqrt(grav_param)
+    radius_0 = np.linalg.norm(position, axis=-1)
+    radial_velocity_0 = np.sum(position * velocity, axis=-1) / radius_0
+    # reciprocal of the semi-major axis, negative for hyperbolic orbits
+    alpha = 2 / radius_0 - np.sum(velocity * velocity, axis=-1) / grav_param
+
+    # solve the universal Kepler's equation for the universal anomaly chi by Newton's method
+    chi = sqrt_grav_param * np.abs(alpha) * time
+    for _ in range(max_iterations):
+        z = alpha * chi ** 2
+        c, s = stumpff(z)
+        function = (radius_0 * radial_velocity_0 / sqrt_grav_param * chi ** 2 * c +
+                    (1 - alpha * radius_0) * chi ** 3 * s + radius_0 * chi - sqrt_grav_param * time)
+        derivative = (radius_0 * radial_velocity_0 / sqrt_grav_param * chi * (1 - z * s) +
+                      (1 - alpha * radius_0) * chi ** 2 * c + radius_0)
+        step = function / derivative
+        chi = chi - step
+        if np.all(np.abs(step) < tolerance):
+            break
+
+    z = alpha * chi ** 2
+    c, s = stumpff(z)
+    f = 1 - chi ** 2 / radius_0 * c
+    g = time - chi ** 3 * s / sqrt_grav_param
+    new_position = f[..., None] * position + g[..., None] * velocity
+    radius = np.linalg.norm(new_position, axis=-1)
+    f_dot = sqrt_grav_param / (radius * radius_0) * (z * chi * s - chi)
+    g_dot = 1 - chi ** 2 / radius * c
+    new_velocity = f_dot[..., None] * position + g_dot[..., None] * velocity
+    return new_position, new_velocity
+
+
+def gravity(position, grav_param):
+
+    """ Calculates the gravitational acceleration of a point mass body.
+    :param position: position(s) (m), shape (..., 3)
+    :param grav_param: gravitational parameter of the orbited body (m^3/s^2)
+    :return: the acceleration(s) (m/s^2)
+    :rtype: numpy.ndarray
+    """
+
+    position = np.asarray(position, dtype=float)
+    radius = np.linalg.norm(position, axis=-1)
+    return -grav_param * position / radius[..., None] ** 3
+
+
+def average_g(position, velocity, sensed_delta_v, time_step, grav_param):
+
+    """ Advances a state vector under thrust with the Apollo average-G method: the position is advanced with the
+    gravity at the start of the step and half of the sensed velocity change, then the velocity with the sensed
+    velocity change and the average of the gravity at the start and end of the step.
+    :param position: position (m), shape (..., 3)
+    :param velocity: velocity (m/s), shape (..., 3)
+    :param sensed_delta_v: velocity change measured by the accelerometers over the step, ie without gravity (m/s)
+    :param time_step: length of the step (s)
+    :param grav_param: gravitational parameter of the orbited body (m^3/s^2)
+    :return: position and velocity at the end of the step
+    :rtype: tuple of numpy.ndarray
+    """
+
+    position = np.asarray(position, dtype=float)
+    velocity = np.asarray(velocity, dtype=float)
+    sensed_delta_v = np.asarray(sensed_delta_v, dtype=float)
+    initial_gravity = gravity(position, grav_param)
+    new_position = position + time_step * (velocity + initial_gravity * time_step / 2 + sensed_delta_v / 2)
+    new_velocity = velocity + sensed_delta_v + (initial_gravity + gravity(new_position, grav_param)) * time_step / 2
+    return new_position, new_velocity
+
+
+def orbit_from_state(position, velocity, epoch, grav_param):
+
+    """ Calculates the Keplerian elements of an elliptical or hyperbolic orbit from a state vector.
+    :param position: position (m), shape (3,)
+    :param velocity: velocity (m/s), shape (3,)
+    :param epoch: universal time of the state vector (s)
+    :param grav_param: gravitational parameter of the orbited body (m^3/s^2)
+    :return: the orbit
+    :rtype: Orbit
+    """
+
+    position = np.asarray(position, dtype=float)
+    velocity = np.asarray(velocity, dtype=float)
+    radius = np.linalg.norm(position)
+    angular_momentum = np.cross(position, velocity)
+    node = np.cross([0.0, 0.0, 1.0], angular_momentum)
+    eccentricity_vector = np.cross(velocity, angular_momentum) / grav_param - position / radius
+    eccentricity = np.linalg.norm(eccentricity_vector)
+    sma = 1 / (2 / radius - velocity @ velocity / grav_param)
+    inclination = np.arccos(np.clip(angular_momentum[2] / np.linalg.norm(angular_momentum), -1, 1))
+
+    # equatorial orbits have no ascending node, and circular orbits no periapsis: measure from the x axis instead
+    node_length = np.linalg.norm(node)
+    if node_length < 1e-9 * np.linalg.norm(angular_momentum):
+        node = np.array([1.0, 0.0, 0.0])
+        node_length = 1.0
+    lan = np.arctan2(node[1], node[0])
+    if eccentricity < 1e-9:
+        periapsis_direction = node / node_length
+    else:
+        periapsis_direction = eccentricity_vector / eccentricity
+    periapsis_normal = np.cross(angular_momentum, periapsis_direction) / np.linalg.norm(angular_momentum)
+    argument_of_periapsis = np.arctan2(periapsis_direction @ np.cross(angular_momentum, node) /
+                                       (np.linalg.norm(angular_momentum) * node_length),
+                                       periapsis_direction @ node / node_length)
+    true_anomaly = np.arctan2(position @ periapsis_normal, position @ periapsis_direction)
+    mean_anomaly = true_to_mean_anomaly(true_anomaly, eccentricity)
+    return Orbit(float(sma), float(eccentricity), float(inclination), float(lan), float(argument_of_periapsis),
+                 float(mean_anomaly), float(epoch), float(grav_param))
+
+
+def time_to_apoapsis(orbit, universal_time):
+
+    """ Returns the time until the next apoapsis of an elliptical orbit.
+    :param orbit: the orbit
+    :type orbit: Orbit
+    :param universal_time: the time to measure from (s)
+    :type universal_time: float | numpy.ndarray
+    :return: time to apoapsis (s)
+    """
+
+    return time_to_true_anomaly(orbit, np.pi, universal_time)
+
+
+def time_to_periapsis(orbit, universal_time):
+
+    """ Returns the time until the next periapsis. Hyperbolic orbits only have one periapsis, if it has been passed
+    the time is negative.
+    :param orbit: the orbit
+    :type orbit: Orbit
+    :param universal_time: the time to measure from (s)
+    :type universal_time: float | numpy.ndarray
+    :return: time to periapsis (s)
+    :rtype: numpy.ndarray
+    """
+
+    mean_anomaly = orbit.mean_anomaly + mean_motion(orbit) * (np.asarray(universal_time, dtype=float) - orbit.epoch)
+    if orbit.eccentricity < 1:
+        return np.mod(-mean_anomaly, 2 * np.pi) / mean_motion(orbit)
+    return -mean_anomaly / mean_motion(orbit)
+
+
+def time_to_true_anomaly(orbit, true_anomaly, universal_time):
+
+    """ Returns the time until an elliptical orbit next passes through the given true anomalies.
+    :param orbit: the orbit
+    :type orbit: Orbit
+    :param true_anomaly: true anomalies (radians)
+    :type true_anomaly: float | numpy.ndarray
+    :param universal_time: the time to measure from (s)
+    :type universal_time: float
+    :return: times to the true anomalies (s)
+    :rtype: numpy.ndarray
+    """
+
+    e = orbit.eccentricity
+    true_anomaly = np.asarray(true_anomaly, dtype=float)
+    eccentric_anomaly = 2 * np.arctan2(np.sqrt(1 - e) * np.sin(true_anomaly / 2),
+                                       np.sqrt(1 + e) * np.cos(true_anomaly / 2))
+    target_mean_anomaly = eccentric_anomaly - e * np.sin(eccentric_anomaly)
+    motion = mean_motion(orbit)
+    mean_anomaly = orbit.mean_anomaly + motion * (universal_time - orbit.epoch)
+    return np.mod(target_mean_anomaly - mean_anomaly, 2 * np.pi) / motion
+
+
+def plane_change(orbit, inclination, universal_time):
+
+    """ Calculates the burns that change an orbit's inclination at its ascending and descending nodes, keeping the
+    longitude of the ascending node.
+    :param orbit: the orbit
+    :type orbit: Orbit
+    :param inclination: the new inclination (radians)
+    :type inclination: float
+    :param universal_time: the time to search from (s)
+    :type universal_time: float
+    :return: for the ascending and descending nodes: the times of the nodes (s, shape (2,)), the delta-v in maneuver
+             node components (radial, normal, prograde; shape (2, 3)) and the delta-v magnitudes (shape (2,))
+    :rtype: tuple of numpy.ndarray
+    """
+
+    node_true_anomalies = np.array([-orbit.argument_of_periapsis, np.pi - orbit.argument_of_periapsis])
+    times = universal_time + time_to_true_anomaly(orbit, node_true_anomalies, universal_time)
+    position, velocity = orbit_state(orbit, times)
+
+    radius = np.linalg.norm(position, axis=-1, keepdims=True)
+    radial = position / radius
+    normal = np.cross(position, velocity)
+    normal /= np.linalg.norm(normal, axis=-1, keepdims=True)
+    transverse = np.cross(normal, radial)
+    horizontal_speed = np.sum(velocity * transverse, axis=-1, keepdims=True)
+
+    # the horizontal velocity is rotated about the position vector: positive rotations increase the inclination at
+    # the ascending node and decrease it at the descending node
+    change = (inclination - orbit.inclination) * np.array([[1.0], [-1.0]])
+    delta_v = horizontal_speed * ((np.cos(change) - 1) * transverse + np.sin(change) * normal)
+
+    speed = np.linalg.norm(velocity, axis=-1, keepdims=True)
+    prograde = velocity / speed
+    radial_out = np.cross(prograde, normal)
+    node_delta_v = np.stack([np.sum(delta_v * radial_out, axis=-1), np.sum(delta_v * normal, axis=-1),
+                             np.sum(delta_v * prograde, axis=-1)], axis=-1)
+    return times, node_delta_v, np.linalg.norm(delta_v, axis=-1)
+
+
+def apsis_change(orbit, apoapsis_radius, periapsis_radius, universal_time):
+
+    """ Calculates the two burn sequences that change an orbit's apsides: a burn at the current periapsis or apoapsis
+    sets the opposite side of the orbit to the new apoapsis or periapsis, and a second burn half an orbit later sets
+    the other one.
+    :param orbit: the orbit
+    :type orbit: Orbit
+    :param apoapsis_radius: the new apoapsis radius (m)
+    :type apoapsis_radius: float
+    :param periapsis_radius: the new periapsis radius (m)
+    :type periapsis_radius: float
+    :param universal_time: the time to search from (s)
+    :type universal_time: float
+    :return: the times of the first burn at periapsis and apoapsis (s, shape (2,)), and for each of those and each
+             new radius set first (apoapsis, periapsis), the prograde delta-v of the first burn and the total delta-v
+             of the sequence (m/s, shape (2, 2))
+    :rtype: tuple of numpy.ndarray
+    """
+
+    mu = orbit.grav_param
+    times = universal_time + time_to_true_anomaly(orbit, np.array([0.0, np.pi]), universal_time)
+    burn_radius = orbit.sma * np.array([[1 - orbit.eccentricity], [1 + orbit.eccentricity]])
+    first_radius = np.array([[apoapsis_radius, periapsis_radius]])
+    second_radius = np.array([[periapsis_radius, apoapsis_radius]])
+
+    transfer_sma = (burn_radius + first_radius) / 2
+    first_delta_v = np.sqrt(mu * (2 / burn_radius - 1 / transfer_sma)) - np.sqrt(mu * (2 / burn_radius - 1 / orbit.sma))
+    final_sma = (apoapsis_radius + periapsis_radius) / 2
+    second_delta_v = (np.sqrt(mu * (2 / first_radius - 1 / final_sma)) -
+                      np.sqrt(mu * (2 / first_radius - 1 / transfer_sma)))
+    return times, first_delta_v, np.abs(first_delta_v) + np.abs(second_delta_v)
+
+
+def elevation_angle(position, target_position):
+
+    """ Returns the elevation of the line of sight to a target above the local horizontal.
+    :param position: vessel positions (m), shape (..., 3)
+    :type position: numpy.ndarray
+    :param target_position: target positions (m), shape (..., 3)
+    :type target_position: numpy.ndarray
+    :return: elevation angles (radians)
+    :rtype: numpy.ndarray
+    """
+
+    line_of_sight = target_position - position
+    sine = np.sum(line_of_sight * position, axis=-1) / (np.linalg.norm(line_of_sight, axis=-1) *
+                                                         np.linalg.norm(position, axis=-1))
+    return np.arcsin(np.clip(sine, -1, 1))
+
+
+def elevation_time(position, velocity, epoch, target_orbit, elevation, duration, steps=120, tolerance=0.1):
+
+    """ Finds when the target first rises through an elevation angle, as seen from vessels coasting from state vectors.
+    Each pass evaluates steps times per vessel and narrows each vessel's interval to the step the elevation rises
+    through, until the steps are shorter than tolerance.
+    :param position: vessel positions at epoch (m), shape (..., 3)
+    :type position: numpy.ndarray
+    :param velocity: vessel velocities at epoch (m/s), shape (..., 3)
+    :type velocity: numpy.ndarray
+    :param epoch: universal times of the state vectors (s), shape (...)
+    :type epoch: float | numpy.ndarray
+    :param target_orbit: the target's orbit, around the same body
+    :type target_orbit: Orbit
+    :param elevation: the elevation angle (radians)
+    :type elevation: float
+    :param duration: how long after epoch to search (s), shape (...)
+    :type duration: float | numpy.ndarray
+    :param steps: number of times evaluated for each vessel in each pass
+    :type steps: int
+    :param tolerance: the time tolerance (s)
+    :type tolerance: float
+    :return: universal times (s), NaN where the target doesn't rise through the elevation angle within duration
+    :rtype: numpy.ndarray
+    """
+
+    position = np.asarray(position, dtype=float)
+    velocity = np.asarray(velocity, dtype=float)
+    shape = np.broadcast_shapes(position.shape[:-1], velocity.shape[:-1], np.shape(epoch), np.shape(duration))
+    epoch = np.broadcast_to(np.asarray(epoch, dtype=float), shape)
+    start = np.zeros(shape)
+    width = np.broadcast_to(np.asarray(duration, dtype=float), shape) / steps
+    found = np.ones(shape, dtype=bool)
+    fractions = np.linspace(0, steps, steps + 1)
+    while True:
+        offsets = start[..., None] + width[..., None] * fractions
+        vessel_position, _ = propagate(position[..., None, :], velocity[..., None, :], offsets,
+                                       target_orbit.grav_param)
+        target_position, _ = orbit_state(target_orbit, epoch[..., None] + offsets)
+        difference = elevation_angle(vessel_position, target_position) - elevation
+        rising = (difference[..., :-1] < 0) & (difference[..., 1:] >= 0)
+        found &= rising.any(axis=-1)
+        index = np.argmax(rising, axis=-1)
+        start = start + index * width
+        if np.all(width < tolerance):
+            before = np.take_along_axis(difference, index[..., None], axis=-1)[..., 0]
+            after = np.take_along_axis(difference, index[..., None] + 1, axis=-1)[..., 0]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                # linear interpolation within the final step
+                times = epoch + start + width * before / (before - after)
+            return np.where(found, times, np.nan)
+        width = width / steps
+
+
+def coelliptic_delta_v(position, velocity, target_orbit):
+
+    """ Calculates the burns that make orbits coelliptic with a target orbit: the apsides on the same line as the
+    target's, at a constant height below the target's apsides. The orbits keep their planes.
+    :param position: positions (m), shape (..., 3)
+    :type position: numpy.ndarray
+    :param velocity: velocities (m/s), shape (..., 3)
+    :type velocity: numpy.ndarray
+    :param target_orbit: the target's orbit, around the same body
+    :type target_orbit: Orbit
+    :return: the velocity changes (m/s, shape (..., 3)) and the heights below the target orbit (m, shape (...))
+    :rtype: tuple of numpy.ndarray
+    """
+
+    position = np.asarray(position, dtype=float)
+    velocity = np.asarray(velocity, dtype=float)
+    rotation = perifocal_to_inertial(target_orbit.inclination, target_orbit.lan, target_orbit.argument_of_periapsis)
+    # the target orbit's true anomaly in line with each position
+    true_anomaly = np.arctan2(position @ rotation[:, 1], position @ rotation[:, 0])
+    radius = np.linalg.norm(position, axis=-1)
+    periapsis_radius = target_orbit.sma * (1 - target_orbit.eccentricity)
+    apoapsis_radius = target_orbit.sma * (1 + target_orbit.eccentricity)
+
+    # the height difference puts the position on the orbit with apsides that much below the target's:
+    # 2 (rp - h) (ra - h) = r (ra + rp - 2 h + (ra - rp) cos(true anomaly)), the smaller root of the quadratic in h
+    half_sum = (periapsis_radius + apoapsis_radius - radius) / 2
+    constant = (2 * periapsis_radius * apoapsis_radius - radius * (apoapsis_radius + periapsis_radius +
+                (apoapsis_radius - periapsis_radius) * np.cos(true_anomaly)))
+    delta_height = half_sum - np.sqrt(half_sum ** 2 - constant / 2)
+
+    new_periapsis_radius = periapsis_radius - delta_height
+    new_apoapsis_radius = apoapsis_radius - delta_height
+    eccentricity = (new_apoapsis_radius - new_periapsis_radius) / (new_apoapsis_radius + new_periapsis_radius)
+    semi_latus_rectum = 2 * new_periapsis_radius * new_apoapsis_radius / (new_apoapsis_radius + new_periapsis_radius)
+    speed_factor = np.sqrt(target_orbit.grav_param / semi_latus_rectum)
+
+    radial = position / radius[..., None]
+    normal = np.cross(position, velocity)
+    normal /= np.linalg.norm(normal, axis=-1, keepdims=True)
+    transverse = np.cross(normal, radial)
+    new_velocity = ((speed_factor * eccentricity * np.sin(true_anomaly))[..., None] * radial +
+                    (speed_factor * (1 + eccentricity * np.cos(true_anomaly)))[..., None] * transverse)
+    return new_velocity - velocity, delta_height
+
+
+def coelliptic_sequence(position, velocity, epoch, target_orbit, elevation, cdh_time=None):
+
+    """ Follows coelliptic sequences from state vectors just after CSI: coasts to CDH, makes the orbit coelliptic with
+    the target's, and finds when the target reaches the TPI elevation angle.
+    :param position: positions at epoch (m), shape (..., 3)
+    :type position: numpy.ndarray
+    :param velocity: velocities at epoch (m/s), shape (..., 3)
+    :type velocity: numpy.ndarray
+    :param epoch: universal time of the state vectors (s)
+    :type epoch: float
+    :param target_orbit: the target's orbit, around the same body
+    :type target_orbit: Orbit
+    :param elevation: the TPI elevation angle (radians)
+    :type elevation: float
+    :param cdh_time: universal time of CDH (s). If None, CDH is half an orbit after epoch
+    :type cdh_time: float | None
+    :return: the solutions, with NaN for state vectors that aren't on elliptical orbits
+    :rtype: CoellipticSolution
+    """
+
+    position = np.asarray(position, dtype=float)
+    velocity = np.asarray(velocity, dtype=float)
+    shape = np.broadcast_shapes(position.shape[:-1], velocity.shape[:-1])
+    position = np.broadcast_to(position, shape + (3,))
+    velocity = np.broadcast_to(velocity, shape + (3,))
+    grav_param = target_orbit.grav_param
+    if cdh_time is None:
+        with np.errstate(invalid="ignore"):
+            reciprocal_sma = 2 / np.linalg.norm(position, axis=-1) - np.sum(velocity * velocity, axis=-1) / grav_param
+            cdh_time = epoch + np.pi * np.sqrt(np.where(reciprocal_sma > 0, reciprocal_sma, np.nan) ** -3 / grav_param)
+    cdh_time = np.broadcast_to(np.asarray(cdh_time, dtype=float), shape)
+    coast_time = np.nan_to_num(cdh_time - epoch)
+    cdh_position, cdh_velocity = propagate(position, velocity, coast_time, grav_param)
+    cdh_delta_v, delta_height = coelliptic_delta_v(cdh_position, cdh_velocity, target_orbit)
+
+    # search one orbit after CDH
+    period = 2 * np.pi * np.sqrt((target_orbit.sma - delta_height) ** 3 / grav_param)
+    tpi_time = elevation_time(cdh_position, cdh_velocity + cdh_delta_v, cdh_time, target_orbit, elevation,
+                              np.nan_to_num(period))
+    tpi_time = np.where(np.isfinite(cdh_time) & (delta_height > 0), tpi_time, np.nan)
+    return CoellipticSolution(cdh_time, cdh_position, cdh_velocity, cdh_delta_v, delta_height, tpi_time)
+
+
+def solve_csi(position, velocity, epoch, target_orbit, elevation, tpi_time, max_delta_v, tolerance=0.01, steps=40):
+
+    """ Finds the horizontal CSI burn that, with CDH half an orbit later, brings the target to the TPI elevation angle
+    at the required time. The candidate burns are evaluated together, then the pair bracketing the smallest solution
+    is subdivided until it is narrower than tolerance.
+    :param position: position at CSI (m), shape (3,)
+    :type position: numpy.ndarray
+    :param velocity: velocity before the CSI burn (m/s), shape (3,)
+    :type velocity: numpy.ndarray
+    :param epoch: universal time of CSI (s)
+    :type epoch: float
+    :param target_orbit: the target's orbit, around the same body
+    :type target_orbit: Orbit
+    :param elevation: the TPI elevation angle (radians)
+    :type elevation: float
+    :param tpi_time: the required universal time of TPI (s)
+    :type tpi_time: float
+    :param max_delta_v: the largest CSI burn searched (m/s)
+    :type max_delta_v: float
+    :param tolerance: the delta-v tolerance (m/s)
+    :type tolerance: float
+    :param steps: number of candidate burns evaluated in each pass
+    :type steps: int
+    :return: the CSI delta-v along the horizontal (m/s, negative is backwards), or None if there is no solution
+    :rtype: float | None
+    """
+
+    position = np.asarray(position, dtype=float)
+    velocity = np.asarray(velocity, dtype=float)
+    normal = np.cross(position, velocity)
+    horizontal = np.cross(normal, position)
+    horizontal /= np.linalg.norm(horizontal)
+
+    low, high = -max_delta_v, max_delta_v
+    while True:
+        candidates = np.linspace(low, high, steps + 1)
+        solution = coelliptic_sequence(position, velocity + candidates[:, None] * horizontal, epoch, target_orbit,
+                                       elevation)
+        error = solution.tpi_time - tpi_time
+        with np.errstate(invalid="ignore"):
+            crossings = np.flatnonzero(np.sign(error[:-1]) * np.sign(error[1:]) <= 0)
+        if not len(crossings):
+            return None
+        index = crossings[np.argmin(np.abs(candidates[crossings]))]
+        low, high = candidates[index], candidates[index + 1]
+        if high - low < tolerance:
+            if error[index] == error[index + 1]:
+                return float(low)
+            # the first TPI time jumps where the target's first rise moves to a later pass: not a solution
+            if abs(error[index] - error[index + 1]) > (tpi_time - epoch) / 100:
+                return None
+            # linear interpolation within the final step
+            return float(low + (high - low) * error[index] / (error[index] - error[index + 1]))
+
+
+def intercept(position, velocity, epoch, target_orbit, transfer_time):
+
+    """ Calculates the burn that intercepts the target after a transfer time.
+    :param position: position (m), shape (3,)
+    :type position: numpy.ndarray
+    :param velocity: velocity (m/s), shape (3,)
+    :type velocity: numpy.ndarray
+    :param epoch: universal time of the burn (s)
+    :type epoch: float
+    :param target_orbit: the target's orbit, around the same body
+    :type target_orbit: Orbit
+    :param transfer_time: time from the burn to the intercept (s)
+    :type transfer_time: float
+    :return: the velocity change of the burn and the velocity relative to the target at the intercept (m/s, shape
+             (3,))
+    :rtype: tuple of numpy.ndarray
+    """
+
+    target_position, target_velocity = orbit_state(target_orbit, epoch + transfer_time)
+    transfer_velocity_1, transfer_velocity_2 = lambert(position, target_position, np.array([transfer_time]),
+                                                       target_orbit.grav_param)
+    return transfer_velocity_1[0] - velocity, transfer_velocity_2[0] - target_velocity
+
+
+def phase_angle(departure_orbit, target_orbit, times):
+
+    """ Calculates the phase angle of a target, the angle it leads the vessel by, measured in the vessel's orbital
+    plane in the direction of motion.
+    :param departure_orbit: the vessel's orbit
+    :type departure_orbit: Orbit
+    :param target_orbit: the target's orbit, around the same body
+    :type target_orbit: Orbit
+    :param times: universal times (s)
+    :type times: float | numpy.ndarray
+    :return: phase angles (degrees, 0 to 360)
+    :rtype: numpy.ndarray
+    """
+
+    position, _ = orbit_state(departure_orbit, times)
+    target_position, _ = orbit_state(target_orbit, times)
+    normal = perifocal_to_inertial(departure_orbit.inclination, departure_orbit.lan,
+                                   departure_orbit.argument_of_periapsis)[:, 2]
+    angle = np.arctan2(np.cross(position, target_position) @ normal, np.sum(position * target_position, axis=-1))
+    return np.mod(np.degrees(angle), 360)
+
+
+def solve_phase_angle_time(departure_orbit, target_orbit, required_phase_angle, start_time, tolerance=0.01,
+                           steps=360):
+
+    """ Finds the first time at or after start_time when the target's phase angle equals the required phase angle.
+    Both orbits are propagated with Kepler's equation, so eccentric orbits are handled. The search covers one synodic
+    period in steps, then the bracketing step is subdivided until it is shorter than tolerance.
+    :param departure_orbit: the vessel's orbit
+    :type departure_orbit: Orbit
+    :param target_orbit: the target's orbit, around the same body
+    :type target_orbit: Orbit
+    :param required_phase_angle: the phase angle to find (degrees)
+    :type required_phase_angle: float
+    :param start_time: universal time to search from (s)
+    :type start_time: float
+    :param tolerance: the time tolerance (s)
+    :type tolerance: float
+    :param steps: number of times evaluated in each pass
+    :type steps: int
+    :return: the universal time, or None if the phase angle doesn't change (equal periods)
+    :rtype: float | None
+    """
+
+    rate = 1 / orbital_period(departure_orbit) - 1 / orbital_period(target_orbit)
+    if abs(rate) < 1e-12:
+        return None
+    # the extra step allows for the phase angle rate varying around eccentric orbits
+    start, end = start_time, start_time + (1 + 2 / steps) / abs(rate)
+    while True:
+        times = np.linspace(start, end, steps + 1)
+        # the difference wrapped to -180..180, the root is where it changes sign without wrapping around
+        difference = np.mod(phase_angle(departure_orbit, target_orbit, times) - required_phase_angle + 180, 360) - 180
+        crossings = np.flatnonzero((np.sign(difference[:-1]) != np.sign(difference[1:])) &
+                                   (np.abs(difference[:-1] - difference[1:]) < 180))
+        if not len(crossings):
+            return None
+        index = crossings[0]
+        start, end = times[index], times[index + 1]
+        if end - start < tolerance:
+            # linear interpolation within the final step
+            fraction = difference[index] / (difference[index] - difference[index + 1])
+            return float(start + fraction * (end - start))
+
+
+def node_frame(position, velocity):
+
+    """ Returns the maneuver node directions at a state vector.
+    :param position: position (m), shape (3,)
+    :param velocity: velocity (m/s), shape (3,)
+    :return: unit vectors radial out, normal and prograde
+    :rtype: tuple of numpy.ndarray
+    """
+
+    prograde = velocity / np.linalg.norm(velocity)
+    normal = np.cross(position, velocity)
+    normal /= np.linalg.norm(normal)
+    radial = np.cross(prograde, normal)
+    return radial, normal, prograde
+
+
+def surface_attitude(position, direction):
+
+    """ Converts a direction to a heading and pitch in the local horizontal frame, the frame MechJeb's surface
+    attitude mode uses. The z axis of the frame the vectors are given in is the orbited body's rotation axis.
+    :param position: position (m), shape (3,)
+    :param direction: the direction to point in, shape (3,)
+    :return: heading (degrees from north, towards east) and pitch (degrees above the horizon)
+    :rtype: tuple of float
+    """
+
+    up = position / np.linalg.norm(position)
+    east = np.cross([0.0, 0.0, 1.0], up)
+    east /= np.linalg.norm(east)
+    north = np.cross(up, east)
+    direction = direction / np.linalg.norm(direction)
+    heading = np.degrees(np.arctan2(direction @ east, direction @ north)) % 360
+    pitch = np.degrees(np.arcsin(np.clip(direction @ up, -1, 1)))
+    return float(heading), float(pitch)
+
+
+def porkchop(departure_orbit, target_orbit, departure_times, flight_times):
+
+    """ Evaluates transfers from an orbit to a target for a grid of departure times and times of flight.
+    :param departure_orbit: the orbit departed from
+    :type departure_orbit: Orbit
+    :param target_orbit: the target's orbit, around the same body
+    :type target_orbit: Orbit
+    :param departure_times: universal times of departure (s)
+    :type departure_times: numpy.ndarray
+    :param flight_times: times of flight (s)
+    :type flight_times: numpy.ndarray
+    :return: the delta-v of every transfer, and the best one
+    :rtype: PorkchopSolution
+    """
+
+    departure_times = np.asarray(departure_times, dtype=float)
+    flight_times = np.asarray(flight_times, dtype=float)
+    shape = (len(departure_times), len(flight_times))
+
+    departure_position, departure_velocity = orbit_state(departure_orbit, departure_times)
+    arrival_position, arrival_velocity = orbit_state(target_orbit,
+                                                     (departure_times[:, None] + flight_times[None, :]).ravel())
+    departure_position = np.repeat(departure_position, shape[1], axis=0)
+    departure_velocity = np.repeat(departure_velocity, shape[1], axis=0)
+    transfer_velocity_1, transfer_velocity_2 = lambert(departure_position, arrival_position,
+                                                       np.tile(flight_times, shape[0]), departure_orbit.grav_param)
+
+    velocity_change = transfer_velocity_1 - departure_velocity
+    departure_delta_v = np.linalg.norm(velocity_change, axis=-1).reshape(shape)
+    arrival_delta_v = np.linalg.norm(arrival_velocity - transfer_velocity_2, axis=-1).reshape(shape)
+    total = departure_delta_v + arrival_delta_v
+    if np.all(np.isnan(total)):
+        best = None
+        best_velocity_change = None
+    else:
+        best = np.unravel_index(np.nanargmin(total), shape)
+        best_velocity_change = velocity_change[best[0] * shape[1] + best[1]]
+    return PorkchopSolution(departure_times, flight_times, departure_delta_v, arrival_delta_v, best,
+                            best_velocity_change)
+
+
+def main():
+
+    """ Benchmarks the kernels. """
+
+    import timeit
+
+    kerbin_grav_param = 3.5316e12
+    candidates = 100000
+    departure_radius = np.linspace(670000, 2000000, candidates)
+    destination_radius = np.linspace(12000000, 47000000, candidates)
+
+    seconds = min(timeit.repeat(lambda: hohmann(departure_radius, destination_radius, kerbin_grav_param),
+                                number=10, repeat=5)) / 10
+    print("hohmann: {:.0f} transfers per ms".format(candidates / seconds / 1000))
+
+    kerbin = Orbit(700000, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, kerbin_grav_param)
+    mun = Orbit(12000000, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, kerbin_grav_param)
+    departure_times = np.linspace(0, orbital_period(kerbin), 100)
+    flight_times = np.linspace(20000, 50000, 100)
+    seconds = min(timeit.repeat(lambda: porkchop(kerbin, mun, departure_times, flight_times),
+                                number=1, repeat=5))
+    print("porkchop: {} transfers in {:.1f} ms".format(len(departure_times) * len(flight_times), seconds * 1000))
+
+    position, velocity = orbit_state(kerbin, np.zeros(candidates))
+    times = np.linspace(-100000, 100000, candidates)
+    seconds = min(timeit.repeat(lambda: propagate(position, velocity, times, kerbin_grav_param),
+                                number=1, repeat=5))
+    print("propagate: {:.0f} state vectors per ms".format(candidates / seconds / 1000))
+
+    seconds = min(timeit.repeat(lambda: average_g(position[0], velocity[0], np.zeros(3), 0.1, kerbin_grav_param),
+                                number=1000, repeat=5)) / 1000
+    print("average_g: {:.1f} us per step".format(seconds * 1e6))
+
+    seconds = min(timeit.repeat(lambda: solve_phase_angle_time(kerbin, mun, 110.0, 0.0), number=10, repeat=5)) / 10
+    print("solve_phase_angle_time: {:.2f} ms".format(seconds * 1000))
+
+    chaser = Orbit(675000, 0.005, 0.0, 0.0, 1.0, 0.2, 0.0, kerbin_grav_param)
+    target = Orbit(700000, 0.01, 0.0, 0.0, 0.3, 1.5, 0.0, kerbin_grav_param)
+    position, velocity = orbit_state(chaser, 0.0)
+    tpi_time = float(orbital_period(chaser))
+    seconds = min(timeit.repeat(lambda: solve_csi(position, velocity, 0.0, target, np.radians(26.6), tpi_time, 150.0),
+                                number=1, repeat=5))
+    print("solve_csi: {:.1f} ms".format(seconds * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+This module contains the maneuver planning service. Maneuver calculations (which fetch telemetry and can run long
+searches) are run on a thread pool, so that the DSKY keeps responding while they run. The computer polls the planner
+from its main loop, which flashes COMP ACTY while plans are pending and delivers the results on the GUI thread.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from basagc import config
+if config.DEBUG:
+    from pudb import set_trace  # lint:ok
+from basagc import utils
+
+
+class Planner:
+
+    """ Runs maneuver calculations in the background. """
+
+    def __init__(self, computer, workers=config.PLANNER_WORKERS):
+
+        """ Class constructor.
+        :param computer: the computer results are delivered to
+        :type computer: basagc.computer.Computer
+        :param workers: number of worker threads
+        :type workers: int
+        :return: None
+        """
+
+        self.computer = computer
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="planner")
+        # (future, on_complete, on_error) for each plan that hasn't been delivered
+        self.pending = []
+        self.last_flash = 0.0
+
+    @property
+    def is_busy(self):
+        return bool(self.pending)
+
+    def submit(self, function, *args, on_complete=None, on_error=None):
+
+        """ Runs function(*args) on the worker pool.
+        :param function: the calculation. It runs on a worker thread, so it must not touch the DSKY
+        :param on_complete: called on the GUI thread with the result
+        :param on_error: called on the GUI thread with the exception, if the calculation raises one
+        :return: the future of the result
+        :rtype: concurrent.futures.Future
+        """
+
+        future = self.executor.submit(function, *args)
+        self.pending.append((future, on_complete, on_error))
+        return future
+
+    def submit_burn(self, function, *args, on_complete=None, on_error=None):
+
+        """ Runs a calculation that returns a Burn on the worker pool. When it completes the burn is loaded with
+        Computer.add_burn(), then on_complete is called with it. If the burn fails validation the computer raises the
+        alarm and on_complete isn't called.
+        :param function: the calculation, returning a maneuver.Burn or None
+        :param on_complete: called on the GUI thread with the burn
+        :param on_error: called on the GUI thread with the exception, if the calculation raises one
+        :return: the future of the burn
+        :rtype: concurrent.futures.Future
+        """
+
+        def deliver(burn):
+            if burn is not None and not self.computer.add_burn(burn):
+                return
+            if on_complete:
+                on_complete(burn)
+
+        return self.submit(function, *args, on_complete=deliver, on_error=on_error)
+
+    def poll(self):
+
+        """ Delivers completed plans and flashes COMP ACTY while plans are pending. Called from the main loop.
+        :return: None
+        """
+
+        if not self.pending:
+            return
+        now = time.monotonic()
+        if now - self.last_flash > 2 * config.COMP_ACTY_FLASH_DURATION / 1000:
+            self.computer.flash_comp_acty()
+            self.last_flash = now
+
+        for plan in [plan for plan in self.pending if plan[0].done()]:
+            self.pending.remove(plan)
+            future, on_complete, on_error = plan
+            if future.cancelled():
+                continue
+            exception = future.exception()
+            if exception is not None:
+                if on_error:
+                    on_error(exception)
+                else:
+                    utils.log("Maneuver calculation failed: {!r}".format(exception), log_level="ERROR")
+            elif on_complete:
+                on_complete(future.result())
+
+    def shutdown(self):
+
+        """ Cancels pending plans and stops the worker threads.
+        :return: None
+        """
+
+        self.pending = []
+        self.executor.shutdown(wait=False, cancel_futures=True)
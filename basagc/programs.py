@@ -1,22 +1,20 @@
 #!/usr/bin/env python3
 """ This module contains all programs (major modes) used by the guidance computer."""
 
-import inspect
-import sys
-import math
-from collections import OrderedDict
-
-
 from PyQt5.QtCore import QTimer
 
 from basagc import config
 if config.DEBUG:
     from pudb import set_trace  # lint:ok
 
-from basagc import utils, maneuver
+from basagc import utils, journal, telemachus
+
+from basagc.filters import RateFilter
+from basagc.registry import Registry
+from basagc.telemachus import KSPNotConnected, TelemetryNotAvailable, check_connection
 
-from basagc.maneuver import Burn
-from basagc.telemachus import get_telemetry, KSPNotConnected, check_connection
+
+programs = Registry("program")
 
 
 class Program(object):
@@ -43,6 +41,7 @@ class Program(object):
         """
 
         utils.log("Executing Program {}: {}".format(self.number, self.description))
+        journal.record(journal.PROGRAM, program=self.number)
         self.computer.flash_comp_acty(500)
         self.computer.dsky.set_register(self.number, "program")
         self.computer.running_program = self
@@ -66,6 +65,7 @@ class Program(object):
         return "Program {} ({}) ".format(self.number, self.description)
 
 
+@programs.register("00")
 class Program00(Program):
 
     """ AGC Idling.
@@ -81,6 +81,7 @@ class Program00(Program):
         super(Program00, self).__init__(description="AGC Idling", number="00")
 
 
+@programs.register("01")
 class Program01(Program):
     
     '''
@@ -121,6 +122,7 @@ class Program01(Program):
         Program.computer.execute_program("02")
 
 
+@programs.register("02")
 class Program02(Program):
     '''
     Waits until liftoff is detected, blanks display and starts P11
@@ -134,6 +136,10 @@ class Program02(Program):
         super().__init__(description="Prelaunch or service - Gyrocompassing program", number="02")
         self.timer = QTimer()
         self.timer.timeout.connect(self.timeout)
+        self.sample_timer = QTimer()
+        self.sample_timer.timeout.connect(self.check_for_liftoff)
+        self.vertical_speed_filter = RateFilter(config.VERTICAL_SPEED_NOISE,
+                                                config.VERTICAL_SPEED_RATE_NOISE)
 
     def execute(self):
 
@@ -141,12 +147,24 @@ class Program02(Program):
         :return: None
         """
         super().execute()
-        Program.computer.add_to_mainloop(self.check_for_liftoff)
+        self.sample_timer.start(config.LIFTOFF_SAMPLE_INTERVAL)
 
     def check_for_liftoff(self):
-        if get_telemetry("verticalSpeed") > 1:
+
+        """ Samples the vertical speed, and detects liftoff once the filtered vertical speed is confidently above
+        config.LIFTOFF_VERTICAL_SPEED, so that a single jittery sample can't trigger it.
+        :return: None
+        """
+
+        try:
+            universal_time, vertical_speed = telemachus.sample_telemetry_values("universalTime", "verticalSpeed")
+        except (KSPNotConnected, TelemetryNotAvailable):
+            return
+        self.vertical_speed_filter.add_sample(universal_time, vertical_speed)
+        vertical_speed, _, deviation = self.vertical_speed_filter.get_estimate(universal_time)
+        if vertical_speed - config.LIFTOFF_CONFIDENCE * deviation > config.LIFTOFF_VERTICAL_SPEED:
             utils.log("Liftoff discrete")
-            Program.computer.remove_from_mainloop(self.check_for_liftoff)
+            self.sample_timer.stop()
 
             # Clear display
             for register in ["verb", "noun", "program", "data_1", "data_2", "data_3"]:
@@ -158,6 +176,14 @@ class Program02(Program):
         self.timer.stop()
         Program.computer.execute_program("11")
 
+    def terminate(self):
+
+        """Terminates the program"""
+
+        self.sample_timer.stop()
+        super().terminate()
+
+@programs.register("11")
 class Program11(Program):
 
     """ Earth Orbit Insertion Monitor.
@@ -203,212 +229,16 @@ class Program11(Program):
         self.computer.execute_verb(verb="16", noun="62")
 
 
-class Program15(Program):
-
-    """ Calculates TMI burn
-    :return: None
-    """
-
-    def __init__(self):
-
-        """ Class constructor.
-        :return: None
-        """
-        # sequence of events:
-        # V37E15E
-        # Flashing V01N30 displays target octal ID
-        # PRO to accept, V21 to change
-        # Display blanks for 5 seconds at TIG - 105 seconds
-        # Display V16N95
-        # at TIG - 10 seconds: Flashing V99
-        # if proceed: execute maneuver
-
-        # FIXME: this program should only *calculate* the maneuver, the actual execution of the burn should be
-        # FIXME: performed by P40
-
-        # TODO: scale final altitude based on crafts TWR
-        # TODO: request twr from user
-
-        super().__init__(description="TMI Calculate", number="15")
-        
-
-    def execute(self):
-
-        """ Entry point for the program
-        :return: None
-        """
-
-        super().execute()
-        
-        # if no connection to KSP, do P00DOO abort
-        if not check_connection():
-            self.computer.poodoo_abort(111)
-            self.terminate()
-            return
-        
-        # check that orbital parameters are within range to conduct burn
-        is_orbit_ok = maneuver.HohmannTransfer.check_orbital_parameters()
-        if is_orbit_ok == True:
-            # request mass
-            self.computer.execute_verb(verb="21", noun="25")
-            self.computer.dsky.request_data(requesting_object=self._accept_initial_mass_whole_part, display_location="data_1")
-        else:
-            self.computer.poodoo_abort(is_orbit_ok[1])
-
-    def _accept_initial_mass_whole_part(self, mass):
-        Program.computer.noun_data["25"][0] = mass
-        self.computer.execute_verb(verb="22", noun="25")
-        self.computer.dsky.request_data(requesting_object=self._accept_initial_mass_fractional_part, display_location="data_2")
-        
-    def _accept_initial_mass_fractional_part(self, mass):
-        Program.computer.noun_data["25"][1] = mass
-        self.computer.execute_verb(verb="21", noun="31")
-        self.computer.dsky.request_data(requesting_object=self._accept_thrust_whole_part, display_location="data_1")
-
-    def _accept_thrust_whole_part(self, thrust):
-        Program.computer.noun_data["31"][0] = thrust
-        self.computer.execute_verb(verb="22", noun="31")
-        self.computer.dsky.request_data(requesting_object=self._accept_thrust_fractional_part, display_location="data_2")
-
-    def _accept_thrust_fractional_part(self, thrust):
-        Program.computer.noun_data["31"][1] = thrust
-        self.computer.execute_verb(verb="21", noun="38")
-        self.computer.dsky.request_data(requesting_object=self._accept_isp, display_location="data_1")
-
-    def _accept_isp(self, isp):
-        Program.computer.noun_data["38"][0] = isp
-        self.calculate_maneuver()
+# programs that plan or execute burns are imported on first use, see maneuver_programs.py
+programs.register("15", "basagc.maneuver_programs:Program15")
+programs.register("16", "basagc.maneuver_programs:Program16")
+programs.register("18", "basagc.maneuver_programs:Program18")
+programs.register("19", "basagc.maneuver_programs:Program19")
+programs.register("31", "basagc.maneuver_programs:Program31")
+programs.register("32", "basagc.maneuver_programs:Program32")
+programs.register("33", "basagc.maneuver_programs:Program33")
+programs.register("40", "basagc.maneuver_programs:Program40")
 
-    def calculate_maneuver(self):
-
-        """ Calculates the maneuver parameters and creates a Burn object
-        :return: Nothing
-        """
-        self.maneuver = maneuver.HohmannTransfer()
-        self.maneuver.execute()
-        # display burn parameters and go to poo
-        self.computer.execute_verb(verb="06", noun="95")
-        self.computer.go_to_poo()
-
-class Program31(Program):
-    '''
-    Mun Orbital Insertion (MOI) burn calculator
-    '''
-    def __init__(self):
-        
-        """ Class constructor.
-        :return: None
-        """
-        super().__init__(description="MOI Burn Calculator", number="31")
-        self.delta_v = Program.computer.moi_burn_delta_v
-        self.time_of_node = get_telemetry("timeOfPeriapsisPassage")
-        self.time_of_ignition = None
-
-    def update_parameters(self):
-        
-        self.delta_v = Program.computer.moi_burn_delta_v
-        self.time_of_node = get_telemetry("timeOfPeriapsisPassage")
-
-        initial_mass = float(self.computer.noun_data["25"][0] + "." + self.computer.noun_data["25"][1])
-        thrust = float(self.computer.noun_data["31"][0] + "." + self.computer.noun_data["31"][1])
-        specific_impulse = float(self.computer.noun_data["38"][0])
-        self.duration_of_burn = maneuver.calc_burn_duration(initial_mass, thrust, specific_impulse, self.delta_v)
-        self.time_of_ignition = self.time_of_node - (self.duration_of_burn / 2)
-        
-    def execute(self):  # FIXME: this needs to be refactored into something better, just trying to get it working now
-        
-        self.computer.execute_verb(verb="21", noun="25")
-        self.computer.dsky.request_data(requesting_object=self._accept_initial_mass_whole_part, display_location="data_1")
-        
-    def _accept_initial_mass_whole_part(self, mass):
-        Program.computer.noun_data["25"][0] = mass
-        self.computer.execute_verb(verb="22", noun="25")
-        self.computer.dsky.request_data(requesting_object=self._accept_initial_mass_fractional_part, display_location="data_2")
-        
-    def _accept_initial_mass_fractional_part(self, mass):
-        Program.computer.noun_data["25"][1] = mass
-        self.computer.execute_verb(verb="21", noun="31")
-        self.computer.dsky.request_data(requesting_object=self._accept_thrust_whole_part, display_location="data_1")
-
-    def _accept_thrust_whole_part(self, thrust):
-        Program.computer.noun_data["31"][0] = thrust
-        self.computer.execute_verb(verb="22", noun="31")
-        self.computer.dsky.request_data(requesting_object=self._accept_thrust_fractional_part, display_location="data_2")
-
-    def _accept_thrust_fractional_part(self, thrust):
-        Program.computer.noun_data["31"][1] = thrust
-        self.computer.execute_verb(verb="21", noun="38")
-        self.computer.dsky.request_data(requesting_object=self._accept_isp, display_location="data_1")
-
-    def _accept_isp(self, isp):
-        Program.computer.noun_data["38"][0] = isp
-        self.calculate_maneuver()
-
-    def calculate_maneuver(self):
-        self.update_parameters()
-        self.burn = Burn(delta_v=self.delta_v,
-                         direction="retrograde",
-                         time_of_ignition=self.time_of_of_ignition,
-                         time_of_node=self.time_of_node,
-                         calling_program=self)
-
-        # load the Burn object into computer
-        self.computer.add_burn_to_queue(self.burn, execute=False)
-
-        ## display burn parameters and go to poo
-        self.computer.execute_verb(verb="06", noun="95")
-        self.computer.go_to_poo()
-
-class Program40(Program):
-    
-    '''
-    Controls a SPS (Service Propulsion System) burn.
-    '''
-    
-    def __init__(self):
-        '''
-        instance constructor.
-        :returns: None
-        '''
-        super().__init__(description="SPS Burn", number="40")
-        self.burn = self.computer.next_burn
-
-    def execute(self):
-        '''
-        Executes the program
-        :returns: None
-        '''
-        super().execute()
-        # if TIG < 2 mins away, abort burn
-        if utils.seconds_to_time(self.burn.time_until_ignition)["minutes"] < 2:
-            self.computer.remove_burn()
-            self.computer.poodoo_abort(226)
-            return
-        # if time to ignition if further than a hour away, display time to ignition
-        if utils.seconds_to_time(self.burn.time_until_ignition)["hours"] > 0:
-            utils.log("TIG > 1 hour away")
-            self.computer.execute_verb(verb="16", noun="33")
-            self.computer.main_loop_table.append(self._ten_minute_monitor)
-        else:
-            utils.log("TIG < 1 hour away, enabling burn")
-            self.burn.execute()
-
-    def _ten_minute_monitor(self):
-        '''
-        Part of the sequence of P40
-        :returns: None
-        '''
-        if utils.seconds_to_time(self.burn.time_until_ignition)["minutes"] < 10:
-            self.computer.main_loop_table.remove(self._ten_minute_monitor)
-            self.burn.execute()
-
-    def terminate(self):
-        '''
-        Terminates the program.
-        :returns: None
-        '''
-        super().terminate()
-        self.burn.terminate()
 
 class ProgramNotImplementedError(Exception):
 
@@ -418,8 +248,4 @@ class ProgramNotImplementedError(Exception):
     pass
 
 
-programs = OrderedDict()
-clsmembers = inspect.getmembers(sys.modules[__name__], inspect.isclass)
-for class_tuple in clsmembers:
-    if class_tuple[0][-1].isdigit():
-        programs[class_tuple[0][-2:]] = class_tuple[1]
+programs.load_plugins("basagc.programs")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+This module contains the registry used for the verb, noun and program dispatch tables. Implementations register
+themselves by number with a decorator:
+
+    programs = Registry("program")
+
+    @programs.register("11")
+    class Program11(Program):
+        ...
+
+An entry can also be given as a "module:attribute" string, which is only imported the first time the entry is
+looked up. Other packages can add verbs, nouns and programs (eg a mission specific program pack) by declaring entry
+points in the "basagc.verbs", "basagc.nouns" or "basagc.programs" groups, named by number:
+
+    [project.entry-points."basagc.programs"]
+    "63" = "lunar_pack.programs:Program63"
+
+Entry points are only looked up the first time the registry is used, and plugin modules when their entry is looked
+up. Plugins can't replace a built in entry with the same number.
+"""
+
+import importlib
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from basagc import config
+if config.DEBUG:
+    from pudb import set_trace  # lint:ok
+from basagc import utils
+
+
+class Registry(Mapping):
+
+    """ Maps verb, noun or program numbers to their implementing classes. """
+
+    def __init__(self, kind):
+
+        """ Class constructor.
+        :param kind: what is registered, eg "verb". Used in log messages
+        :type kind: str
+        :return: None
+        """
+
+        self.kind = kind
+        # number: class, or "module:attribute" string for entries that haven't been imported yet
+        self.entries = OrderedDict()
+        # entry point groups to load plugins from the first time the registry is used
+        self.plugin_groups = []
+
+    def register(self, number, entry=None):
+
+        """ Registers an entry. Used as a class decorator if entry is not given.
+        :param number: the verb, noun or program number
+        :type number: str
+        :param entry: the class, or a "module:attribute" string to import it from on first use
+        :return: entry, or the decorator if no entry was given
+        """
+
+        if entry is not None:
+            self.entries[number] = entry
+            return entry
+
+        def decorator(cls):
+            self.entries[number] = cls
+            return cls
+        return decorator
+
+    def load_plugins(self, group):
+
+        """ Registers the entry points in the given group. Entry points are read the first time the registry is used,
+        plugin modules are not imported until used.
+        :param group: the entry point group, eg "basagc.programs"
+        :type group: str
+        :return: None
+        """
+
+        self.plugin_groups.append(group)
+
+    def _load_plugin_groups(self):
+        if not self.plugin_groups:
+            return
+        # importlib.metadata is slow to import, and not needed until the first lookup
+        import importlib.metadata
+        groups, self.plugin_groups = self.plugin_groups, []
+        for group in groups:
+            for entry_point in importlib.metadata.entry_points(group=group):
+                if entry_point.name in self.entries:
+                    utils.log("Plugin {} {} from {} ignored, {} {} already exists".format(
+                        self.kind, entry_point.name, entry_point.value, self.kind, entry_point.name),
+                        log_level="WARNING")
+                    continue
+                self.entries[entry_point.name] = entry_point.value
+
+    def is_loaded(self, number):
+        self._load_plugin_groups()
+        return not isinstance(self.entries.get(number), str)
+
+    def __getitem__(self, number):
+        self._load_plugin_groups()
+        entry = self.entries[number]
+        if isinstance(entry, str):
+            entry = self._import(number, entry)
+        return entry
+
+    def _import(self, number, path):
+        module_name, _, attribute = path.partition(":")
+        try:
+            module = importlib.import_module(module_name)
+            entry = getattr(module, attribute) if attribute else module
+        except (ImportError, AttributeError) as exception:
+            utils.log("Cannot load {} {} from {}: {}".format(self.kind, number, path, exception), log_level="ERROR")
+            del self.entries[number]
+            raise KeyError(number)
+        utils.log("Loaded {} {} from {}".format(self.kind, number, path), log_level="DEBUG")
+        self.entries[number] = entry
+        return entry
+
+    def __contains__(self, number):
+        self._load_plugin_groups()
+        return number in self.entries
+
+    def __iter__(self):
+        self._load_plugin_groups()
+        return iter(self.entries)
+
+    def __len__(self):
+        self._load_plugin_groups()
+        return len(self.entries)
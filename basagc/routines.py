@@ -202,7 +202,7 @@ def charin(keypress, state, dsky, computer):
     
         computer.reset_alarm_codes()
         dsky.reset_annunciators()
-        if dsky.annunciators["opr_err"].blink_timer.isActive():
+        if dsky.annunciators["opr_err"].is_blinking:
             dsky.annunciators["opr_err"].stop_blink()
 
     def handle_noun_keypress():
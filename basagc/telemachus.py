@@ -70,6 +70,56 @@ def get_api_listing():
 
 
 def get_telemetry(data, body_number=None):
+    """ Returns the requested data. Telemachus is contacted at most once per main loop tick for each value, later
+    requests in the same tick get the same value.
+
+    :param data: The API call required
+    :type data: str | float
+    :param body_number: Specify which body to obtain data for
+    :type body_number: string
+    :rtype: string
+    """
+
+    return utils.tick_cache.get(("telemetry", data, body_number), _fetch_telemetry, data, body_number)
+
+
+def sample_telemetry(data, body_number=None):
+    """ Returns the requested data straight from Telemachus, bypassing the tick cache. Used for sampling faster than
+    the main loop, eg the velocity during a burn.
+
+    :param data: The API call required
+    :type data: str | float
+    :param body_number: Specify which body to obtain data for
+    :type body_number: string
+    :rtype: string
+    """
+
+    return _fetch_telemetry(data, body_number)
+
+
+def sample_telemetry_values(*data):
+    """ Returns several values straight from Telemachus in one request, bypassing the tick cache.
+
+    :param data: The API calls required
+    :type data: str
+    :rtype: tuple
+    """
+
+    try:
+        query_string = "&".join(name + "=" + telemetry[name] for name in data)
+    except KeyError:
+        raise KSPNotConnected
+    try:
+        raw_response = urllib.request.urlopen(config.URL + query_string)
+    except urllib.error.URLError:
+        utils.log("Query string: {}".format(query_string), log_level="ERROR")
+        utils.log("Caught exception urllib2.URLERROR", log_level="ERROR")
+        raise KSPNotConnected
+    json_response = json.loads(raw_response.read().decode("utf-8"))
+    return tuple(json_response[name] for name in data)
+
+
+def _fetch_telemetry(data, body_number=None):
     """ Contacts telemachus for the requested data.
 
     :param data: The API call required
@@ -107,6 +157,11 @@ def set_mechjeb_smartass(direction):
     command_string = "command=" + commands[direction]
     send_command_to_ksp(command_string)
 
+def set_mechjeb_surface(heading, pitch):
+
+    command_string = "command=" + commands["surface2"] + "[" + str(round(heading, 2)) + "," + str(round(pitch, 2)) + "]"
+    send_command_to_ksp(command_string)
+
 def disable_smartass():
     command_string = "command=" + commands["smartassoff"]
     send_command_to_ksp(command_string)
@@ -150,10 +205,14 @@ def add_maneuver_node(ut, delta_v):
     command_string = "command=" + telemetry["addManeuverNode"] + "[" + str(ut) + "," + delta_v_x  + "," + delta_v_y  + "," + delta_v_z + "]"
     send_command_to_ksp(command_string)
 
-def update_maneuver_node(ut, delta_v):
+def update_maneuver_node(ut, delta_v, index=0):
     ut = str(round(ut, 2))
     delta_v_x = str(round(delta_v[0], 2))
     delta_v_y = str(round(delta_v[1], 2))
     delta_v_z = str(round(delta_v[2], 2))
-    command_string = "command=" + telemetry["updateManeuverNode"] + "[0," + str(ut) + "," + delta_v_x  + "," + delta_v_y  + "," + delta_v_z + "]"
+    command_string = "command=" + telemetry["updateManeuverNode"] + "[" + str(index) + "," + str(ut) + "," + delta_v_x  + "," + delta_v_y  + "," + delta_v_z + "]"
+    send_command_to_ksp(command_string)
+
+def remove_maneuver_node(index):
+    command_string = "command=" + telemetry["removeManeuverNode"] + "[" + str(index) + "]"
     send_command_to_ksp(command_string)
\ No newline at end of file
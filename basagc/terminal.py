@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+This module contains a curses based DSKY for use in a terminal. It provides the same output widgets as gui.GUI, so
+the computer and DSKY code doesn't know the difference. Only elements that have changed are redrawn.
+"""
+
+import curses
+
+from PyQt5.QtCore import QCoreApplication, QTimer
+
+from basagc import config
+if config.DEBUG:
+    from pudb import set_trace  # lint:ok
+from basagc.gui import BlinkClock
+
+KEYMAP = {
+    ord("v"): "V",
+    ord("n"): "N",
+    ord("e"): "E",
+    ord("p"): "P",
+    ord("c"): "C",
+    ord("r"): "R",
+    ord("k"): "K",
+    ord("+"): "+",
+    ord("-"): "-",
+    ord("\n"): "E",
+    ord("\r"): "E",
+    curses.KEY_ENTER: "E",
+}
+for _digit in "0123456789":
+    KEYMAP[ord(_digit)] = _digit
+for _key, _value in list(KEYMAP.items()):
+    if 0 < _key < 256 and chr(_key).isalpha():
+        KEYMAP[ord(chr(_key).upper())] = _value
+
+ANNUNCIATOR_WIDTH = 11
+ANNUNCIATOR_LAYOUT = [
+    # name, label, row, column
+    ("uplink_acty", "UPLINK ACTY", 1, 1),
+    ("temp", "TEMP", 1, 13),
+    ("no_att", "NO ATT", 2, 1),
+    ("gimbal_lock", "GIMBAL LOCK", 2, 13),
+    ("stby", "STBY", 3, 1),
+    ("prog", "PROG", 3, 13),
+    ("key_rel", "KEY REL", 4, 1),
+    ("restart", "RESTART", 4, 13),
+    ("opr_err", "OPR ERR", 5, 1),
+    ("tracker", "TRACKER", 5, 13),
+    ("blank1", "", 6, 1),
+    ("blank2", "", 6, 13),
+    ("blank3", "", 7, 1),
+    ("blank4", "", 7, 13),
+    ("comp_acty", "COMP ACTY", 1, 27),
+]
+STATIC_TEXT = [
+    # text, row, column
+    ("PROG", 1, 40),
+    ("VERB", 4, 27),
+    ("NOUN", 4, 40),
+    ("-" * 17, 6, 27),
+    ("-" * 17, 8, 27),
+    ("-" * 17, 10, 27),
+    ("VERB v  NOUN n  ENTR Enter  PRO p  CLR c  RSET r  KEY REL k  quit q", 13, 1),
+]
+
+
+class TerminalElement:
+
+    """ Base class for all elements drawn on the terminal DSKY. """
+
+    def __init__(self, screen, row, column):
+
+        """ Class constructor.
+        :param screen: the terminal DSKY that this element is drawn on
+        :type screen: TerminalDSKY
+        :param row: screen row of the element
+        :type row: int
+        :param column: screen column of the element
+        :type column: int
+        :return: None
+        """
+
+        self.screen = screen
+        self.row = row
+        self.column = column
+
+    def draw(self, window):
+        raise NotImplementedError
+
+    def set_tooltip(self, tooltip):
+        pass
+
+
+class TerminalDigit(TerminalElement):
+
+    """ A single digit of a register. """
+
+    def __init__(self, screen, row, column):
+        super().__init__(screen, row, column)
+        self.blink_data = {
+            "blink_value": None,
+            "is_blinking": False,
+            "is_blinking_lit": False,
+        }
+        self.display("b")
+
+    def display(self, number_to_display):
+        number_to_display = str(number_to_display)
+        if number_to_display != self.blink_data["blink_value"]:
+            self.blink_data["blink_value"] = number_to_display
+            self.screen.mark_dirty(self)
+
+    def start_blink(self):
+        self.blink_data["is_blinking"] = True
+        BlinkClock.get_instance().add(self)
+
+    def stop_blink(self):
+        BlinkClock.get_instance().remove(self)
+        self.blink_data["is_blinking"] = False
+        self.blink_data["is_blinking_lit"] = False
+        self.screen.mark_dirty(self)
+
+    def set_blink_phase(self, is_lit):
+        self.blink_data["is_blinking_lit"] = is_lit
+        self.screen.mark_dirty(self)
+
+    def draw(self, window):
+        value = self.blink_data["blink_value"]
+        if value == "b" or (self.blink_data["is_blinking"] and not self.blink_data["is_blinking_lit"]):
+            value = " "
+        window.addstr(self.row, self.column, value, curses.A_BOLD)
+
+
+class TerminalSignDigit(TerminalDigit):
+
+    """ The sign digit of a data register. Also shows the register tooltip to the right of the register. """
+
+    def __init__(self, screen, row, column):
+        self.tooltip = ""
+        super().__init__(screen, row, column)
+
+    def set_tooltip(self, tooltip):
+        tooltip = tooltip or ""
+        if tooltip != self.tooltip:
+            self.tooltip = tooltip
+            self.screen.mark_dirty(self)
+
+    def draw(self, window):
+        super().draw(window)
+        window.move(self.row, self.column + 8)
+        window.clrtoeol()
+        window.addnstr(self.row, self.column + 8, self.tooltip, max(0, window.getmaxyx()[1] - self.column - 9))
+
+
+class TerminalAnnunciator(TerminalElement):
+
+    """ A warning or status lamp. """
+
+    def __init__(self, screen, label, row, column):
+        super().__init__(screen, row, column)
+        self.label = label.center(ANNUNCIATOR_WIDTH)
+        self.is_lit = False
+
+    @property
+    def is_blinking(self):
+        return BlinkClock.get_instance().is_blinking(self)
+
+    def on(self):
+        if not self.is_lit:
+            self.is_lit = True
+            self.screen.mark_dirty(self)
+
+    def off(self):
+        if self.is_lit:
+            self.is_lit = False
+            self.screen.mark_dirty(self)
+
+    def start_blink(self):
+        BlinkClock.get_instance().add(self)
+
+    def stop_blink(self):
+        BlinkClock.get_instance().remove(self)
+        self.off()
+
+    def set_blink_phase(self, is_lit):
+        if is_lit:
+            self.on()
+        else:
+            self.off()
+
+    def draw(self, window):
+        attributes = curses.A_REVERSE if self.is_lit else curses.A_DIM
+        window.addstr(self.row, self.column, self.label, attributes)
+
+
+class TerminalRegister:
+
+    """ A control or data register, ie a row of digits. """
+
+    def __init__(self, *digits):
+        self.digits = list(digits)
+
+    def display(self, data):
+        for digit, value in zip(self.digits, data):
+            digit.display(value)
+
+    def set_tooltip(self, tooltip):
+        for digit in self.digits:
+            digit.set_tooltip(tooltip)
+
+
+class TerminalDSKY:
+
+    """ A DSKY drawn with curses. Stands in for gui.GUI. """
+
+    def __init__(self, window):
+
+        """ Class constructor.
+        :param window: the curses window to draw on
+        :return: None
+        """
+
+        self.window = window
+        self.window.nodelay(True)
+        self.window.keypad(True)
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+        self.key_event_handler = None
+        self.dirty_elements = set()
+
+        self.annunciators = {}
+        for name, label, row, column in ANNUNCIATOR_LAYOUT:
+            self.annunciators[name] = TerminalAnnunciator(self, label, row, column)
+
+        self.control_registers = {
+            "program": self._make_control_register(2, 40),
+            "verb": self._make_control_register(5, 27),
+            "noun": self._make_control_register(5, 40),
+        }
+        self.data_registers = {
+            1: self._make_data_register(7, 27),
+            2: self._make_data_register(9, 27),
+            3: self._make_data_register(11, 27),
+        }
+
+        for text, row, column in STATIC_TEXT:
+            self._addstr(row, column, text)
+        self.dirty_elements.update(self._all_elements())
+
+        self.refresh_timer = QTimer()
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(config.TERMINAL_REFRESH_INTERVAL)
+
+    def _make_control_register(self, row, column):
+        return TerminalRegister(TerminalDigit(self, row, column), TerminalDigit(self, row, column + 1))
+
+    def _make_data_register(self, row, column):
+        digits = [TerminalSignDigit(self, row, column)]
+        digits += [TerminalDigit(self, row, column + index) for index in range(1, 6)]
+        return TerminalRegister(*digits)
+
+    def _addstr(self, row, column, text, attributes=curses.A_NORMAL):
+        # writing to the bottom right corner, or outside a small terminal, raises curses.error
+        try:
+            self.window.addstr(row, column, text, attributes)
+        except curses.error:
+            pass
+
+    def get_output_widgets(self):
+
+        """returns the objects that are output objects"""
+
+        return self.annunciators, self.control_registers, self.data_registers
+
+    def register_key_event_handler(self, handler_func):
+        self.key_event_handler = handler_func
+
+    def mark_dirty(self, element):
+        self.dirty_elements.add(element)
+
+    def refresh(self):
+
+        """ Handles any waiting keypresses, then redraws elements that have changed.
+        :return: None
+        """
+
+        while True:
+            key = self.window.getch()
+            if key == -1:
+                break
+            if key in [ord("q"), ord("Q")]:
+                QTimer.singleShot(0, QCoreApplication.instance().quit)
+                return
+            if key == curses.KEY_RESIZE:
+                self.window.clear()
+                for text, row, column in STATIC_TEXT:
+                    self._addstr(row, column, text)
+                self.dirty_elements.update(self._all_elements())
+            elif key in KEYMAP and self.key_event_handler:
+                self.key_event_handler(KEYMAP[key])
+
+        if not self.dirty_elements:
+            return
+        for element in self.dirty_elements:
+            try:
+                element.draw(self.window)
+            except curses.error:
+                pass
+        self.dirty_elements.clear()
+        self.window.refresh()
+
+    def _all_elements(self):
+        elements = list(self.annunciators.values())
+        for register in list(self.control_registers.values()) + list(self.data_registers.values()):
+            elements += register.digits
+        return elements
+
+
+def run(app):
+
+    """ Runs basaGC with a terminal DSKY until the user quits.
+    :param app: the Qt application to run the event loop of
+    :type app: QCoreApplication
+    :return: the application exit code
+    :rtype: int
+    """
+
+    def main(window):
+        from basagc import computer
+        config.LOG_TO_STDOUT = False
+        ui = TerminalDSKY(window)
+        guidance_computer = computer.Computer(ui)
+        return app.exec_()
+
+    return curses.wrapper(main)
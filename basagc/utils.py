@@ -1,22 +1,182 @@
 #!/usr/bin/env python3
 """ This module contains various utility functions and classes used by basaGC"""
 
+import atexit
+import collections
 import logging
+import logging.handlers
+import queue
+import sys
+import threading
 import time
 
 from basagc import config
 if config.DEBUG:
     from pudb import set_trace  # lint:ok
 
+# the log viewer window, created the first time it is shown
 LOG_VIEWER = None
 
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
-                    datefmt='%d/%m/%y %H:%M',
-                    filename='../gc.log',
-                    filemode='a')
+LOG_LEVEL_NUMBERS = {level_name: getattr(logging, level_name) for level_name in config.LOG_LEVELS}
 
-gc_log = logging.getLogger()
+# the most recent formatted log lines, for the log viewer. Lines are added by the log listener thread, and read from the
+# GUI thread with get_log_lines()
+log_buffer = collections.deque(maxlen=config.LOG_BUFFER_LENGTH)
+_log_buffer_lock = threading.Lock()
+_log_line_count = 0
+
+# state used to suppress repeats of the same message, log() is called from the planner threads too
+_repeated_message_lock = threading.Lock()
+_repeated_message = {
+    "message": None,
+    "level": None,
+    "time": 0.0,
+    "count": 0,
+}
+
+
+class _BufferHandler(logging.Handler):
+
+    """ Keeps formatted log lines in log_buffer """
+
+    def emit(self, record):
+        global _log_line_count
+        line = self.format(record)
+        with _log_buffer_lock:
+            log_buffer.append(line)
+            _log_line_count += 1
+
+
+class _StdoutHandler(logging.StreamHandler):
+
+    """ Prints log lines to stdout, unless config.LOG_TO_STDOUT is turned off """
+
+    def emit(self, record):
+        if config.LOG_TO_STDOUT:
+            super().emit(record)
+
+
+# log records are put on a queue by log(), and formatted and written out by a listener thread so that callers never
+# wait on the disk or the console
+_file_handler = logging.FileHandler(config.LOG_FILE, mode="a", delay=True)
+_file_handler.setFormatter(logging.Formatter("%(asctime)s %(name)-12s %(levelname)-8s %(message)s",
+                                             datefmt="%d/%m/%y %H:%M"))
+_stdout_handler = _StdoutHandler(sys.stdout)
+_stdout_handler.setFormatter(logging.Formatter("%(asctime)-20s%(levelname)-10s%(message)s",
+                                               datefmt="%d/%m/%Y %H:%M:%S"))
+_buffer_handler = _BufferHandler()
+_buffer_handler.setFormatter(_stdout_handler.formatter)
+
+_log_queue = queue.Queue()
+_log_listener = logging.handlers.QueueListener(_log_queue, _file_handler, _stdout_handler, _buffer_handler)
+_log_listener.start()
+
+gc_log = logging.getLogger("basaGC")
+gc_log.setLevel(logging.DEBUG)
+gc_log.propagate = False
+gc_log.addHandler(logging.handlers.QueueHandler(_log_queue))
+
+
+def get_log_lines(start=0):
+
+    """ Returns the buffered log lines logged since a previous call.
+    :param start: the number of lines logged at the previous call, 0 for all buffered lines
+    :type start: int
+    :return: the lines logged since start that are still in the buffer, and the number of lines logged so far
+    :rtype: tuple
+    """
+
+    with _log_buffer_lock:
+        new_lines = min(_log_line_count - start, len(log_buffer))
+        return list(log_buffer)[len(log_buffer) - new_lines:], _log_line_count
+
+
+def _log_repeat_count():
+
+    # logs how many times the previous message was repeated, if it was. Called with _repeated_message_lock held
+    if _repeated_message["count"]:
+        gc_log.log(_repeated_message["level"],
+                   "Previous message repeated {} times".format(_repeated_message["count"]))
+        _repeated_message["count"] = 0
+
+
+def _stop_logging():
+
+    # the repeat count of the last message is only logged when another message arrives, so log it before the
+    # listener writes out the queue and stops
+    with _repeated_message_lock:
+        _log_repeat_count()
+    _log_listener.stop()
+
+
+atexit.register(_stop_logging)
+
+
+class TickCache:
+
+    """ Memoizes values for the current main loop tick, so that the DSKY, the logger and programs running in the
+    same tick share one computation (eg one telemetry fetch) rather than repeating it. The computer starts a new
+    tick at the start of each main loop cycle. Values also expire if the main loop hasn't started a new tick
+    within a loop interval, eg before the computer is switched on.
+
+    The cache is also used from the planner threads. Values are computed outside the lock, and a value is only
+    memoized if no new tick has started while it was being computed, so that a slow fetch can't put a value from the
+    previous tick into the new one.
+    """
+
+    def __init__(self, lifetime):
+
+        """ Class constructor.
+        :param lifetime: the longest time a value is kept for, in seconds
+        :type lifetime: float
+        :return: None
+        """
+
+        self.lifetime = lifetime
+        self.values = {}
+        self.tick_start = time.monotonic()
+        # counts the ticks, so a value computed across a new tick can be discarded
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def new_tick(self):
+
+        """ Discards all memoized values.
+        :return: None
+        """
+
+        with self.lock:
+            self._new_tick()
+
+    def _new_tick(self):
+        self.values.clear()
+        self.tick_start = time.monotonic()
+        self.generation += 1
+
+    def get(self, key, function, *args):
+
+        """ Returns the value memoized for key in this tick, calling function(*args) to compute it if there isn't
+        one. Exceptions raised by function are not memoized.
+        :param key: a hashable key identifying the value
+        :param function: the function that computes the value
+        :return: the value
+        """
+
+        with self.lock:
+            if time.monotonic() - self.tick_start > self.lifetime:
+                self._new_tick()
+            try:
+                return self.values[key]
+            except KeyError:
+                generation = self.generation
+        value = function(*args)
+        with self.lock:
+            if self.generation == generation:
+                self.values[key] = value
+        return value
+
+
+tick_cache = TickCache(config.LOOP_TIMER_INTERVAL / 1000)
 
 
 def seconds_to_time(seconds):
@@ -49,21 +209,22 @@ def log(message="", log_level="DEBUG"):
     :return: nothing
     """
 
-    if log_level not in config.LOG_LEVELS:
+    level = LOG_LEVEL_NUMBERS.get(log_level)
+    if level is None:
         gc_log.error("Log level does not exist!")
         return
-    now = time.strftime("%d/%m/%Y %H:%M:%S")
-
-    if log_level == "DEBUG":
-        gc_log.debug(message)
-    elif log_level == "INFO":
-        gc_log.info(message)
-    elif log_level == "WARNING":
-        gc_log.warning(message)
-    elif log_level == "ERROR":
-        gc_log.error(message)
-    elif log_level == "CRITICAL":
-        gc_log.critical(message)
-    
-    # since there is no logging window yet, print message to stdout
-    print("{:20}{:10}{}".format(now, log_level, message))
+    # filter by level before doing any other work
+    if level < LOG_LEVEL_NUMBERS[config.current_log_level]:
+        return
+
+    # if this is the same message as last time, just count it
+    now = time.monotonic()
+    with _repeated_message_lock:
+        if message == _repeated_message["message"] and now - _repeated_message["time"] < config.LOG_REPEAT_INTERVAL:
+            _repeated_message["count"] += 1
+            return
+        _log_repeat_count()
+        _repeated_message["message"] = message
+        _repeated_message["level"] = level
+        _repeated_message["time"] = now
+        gc_log.log(level, message)
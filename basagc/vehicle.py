@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+This module contains the vehicle model used to plan burns. A vehicle is a tuple of stages, in the order they burn.
+Each stage is described by the vehicle mass at the stage's ignition and at its burnout, its thrust and its specific
+impulse, so the mass of jettisoned parts is the difference between one stage's dry mass and the next stage's mass.
+Vehicles are tuples of namedtuples, so results are cached by vehicle configuration.
+"""
+
+import functools
+import math
+from collections import namedtuple
+
+from basagc import config
+if config.DEBUG:
+    from pudb import set_trace  # lint:ok
+
+STANDARD_GRAVITY = 9.81
+
+Stage = namedtuple("Stage", [
+    "mass",  # vehicle mass at stage ignition (t)
+    "dry_mass",  # vehicle mass when the stage's propellant is exhausted (t)
+    "thrust",  # (kN)
+    "specific_impulse",  # (s)
+])
+
+StageProfile = namedtuple("StageProfile", [
+    "exhaust_velocity",  # (m/s)
+    "mass_flow",  # (t/s)
+    "delta_v",  # delta-v capacity of the stage (m/s)
+    "burn_time",  # time to burn all of the stage's propellant (s)
+])
+
+
+
+class VehicleNotLoaded(Exception):
+    """ This exception is raised when a burn is planned before the vehicle has been loaded """
+    pass
+
+
+BurnPlan = namedtuple("BurnPlan", [
+    "duration",  # total burn time, including staged burns (s)
+    "staging_times",  # time from ignition of each staging event during the burn (s)
+    "stage_delta_v",  # delta-v gained in each stage used (m/s)
+    "final_mass",  # vehicle mass at cutoff (t)
+    "residual_delta_v",  # delta-v capacity left after the burn, negative if the vehicle can't complete it (m/s)
+])
+
+
+def single_stage(mass, thrust, specific_impulse, dry_mass=None):
+
+    """ Makes a one stage vehicle.
+    :param mass: vehicle mass (t)
+    :param thrust: thrust (kN)
+    :param specific_impulse: specific impulse (s)
+    :param dry_mass: vehicle mass with no propellant (t), None if not known. Burns are then never limited by
+                     propellant
+    :return: the vehicle
+    :rtype: tuple of Stage
+    """
+
+    return (Stage(float(mass), float(dry_mass or 0.0), float(thrust), float(specific_impulse)),)
+
+
+def load_stages(path):
+
+    """ Reads a vehicle from a vehicle uplink file. Each line is a stage, in the order they burn: the vehicle mass
+    at the stage's ignition and at its burnout (t), its thrust (kN) and its specific impulse (s), separated by
+    whitespace. Blank lines and lines starting with # are ignored.
+    :param path: the file to read
+    :type path: str
+    :return: the vehicle
+    :rtype: tuple of Stage
+    :raises ValueError: if the file doesn't describe a vehicle
+    """
+
+    stages = []
+    with open(path) as vehicle_file:
+        for line in vehicle_file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            values = [float(value) for value in line.split()]
+            if len(values) != 4:
+                raise ValueError("Stage needs 4 values, got {}: {}".format(len(values), line))
+            stage = Stage(*values)
+            if not 0 <= stage.dry_mass < stage.mass or stage.thrust < 0 or stage.specific_impulse <= 0:
+                raise ValueError("Invalid stage: {}".format(line))
+            if stages and stage.mass > stages[-1].dry_mass:
+                raise ValueError("Stage is heavier than the previous stage's burnout mass: {}".format(line))
+            stages.append(stage)
+    if not stages:
+        raise ValueError("No stages in {}".format(path))
+    return tuple(stages)
+
+
+@functools.lru_cache(maxsize=16)
+def get_profile(stages):
+
+    """ Calculates each stage's exhaust velocity, mass flow, delta-v capacity and burn time.
+    :param stages: the vehicle
+    :type stages: tuple of Stage
+    :return: the stage profiles
+    :rtype: tuple of StageProfile
+    """
+
+    profiles = []
+    for stage in stages:
+        exhaust_velocity = stage.specific_impulse * STANDARD_GRAVITY
+        mass_flow = stage.thrust / exhaust_velocity if stage.thrust > 0 else 0.0
+        if stage.dry_mass > 0:
+            delta_v = exhaust_velocity * math.log(stage.mass / stage.dry_mass)
+        else:
+            delta_v = math.inf
+        burn_time = (stage.mass - stage.dry_mass) / mass_flow if mass_flow else 0.0
+        profiles.append(StageProfile(exhaust_velocity, mass_flow, delta_v, burn_time))
+    return tuple(profiles)
+
+
+@functools.lru_cache(maxsize=64)
+def plan_burn(stages, delta_v):
+
+    """ Plans a burn across stage boundaries with the rocket equation. Stages without thrust (eg decouplers) are
+    jettisoned without burning.
+    :param stages: the vehicle
+    :type stages: tuple of Stage
+    :param delta_v: delta-v required (m/s)
+    :type delta_v: float
+    :return: the burn plan
+    :rtype: BurnPlan
+    """
+
+    remaining = abs(delta_v)
+    duration = 0.0
+    staging_times = []
+    stage_delta_v = []
+    profiles = get_profile(stages)
+    final_mass = stages[0].mass if stages else 0.0
+    for index, (stage, profile) in enumerate(zip(stages, profiles)):
+        if profile.mass_flow == 0:
+            continue
+        if remaining <= profile.delta_v:
+            final_mass = stage.mass * math.exp(-remaining / profile.exhaust_velocity)
+            duration += (stage.mass - final_mass) / profile.mass_flow
+            stage_delta_v.append(remaining)
+            residual = profile.exhaust_velocity * math.log(final_mass / stage.dry_mass) if stage.dry_mass else math.inf
+            residual += sum(later.delta_v for later in profiles[index + 1:] if later.mass_flow)
+            return BurnPlan(duration, tuple(staging_times), tuple(stage_delta_v), final_mass, residual)
+        duration += profile.burn_time
+        remaining -= profile.delta_v
+        stage_delta_v.append(profile.delta_v)
+        final_mass = stage.dry_mass
+        if index + 1 < len(stages):
+            staging_times.append(duration)
+    # not enough delta-v: the plan ends at the last stage's burnout
+    return BurnPlan(duration, tuple(staging_times), tuple(stage_delta_v), final_mass, -remaining)
+
+
+def burn_duration(stages, delta_v):
+    return plan_burn(stages, delta_v).duration
@@ -1,13 +1,11 @@
 #!/usr/bin/env python3
 """ This module contains classes of all of the verbs used by basaGC."""
 
-import inspect
 import logging
-import sys
-from collections import OrderedDict
 
 from PyQt5.QtCore import QTimer
-from basagc import config, nouns, utils, dsky
+from basagc import config, nouns, utils, dsky, journal
+from basagc.registry import Registry
 from basagc.telemachus import KSPNotConnected, TelemetryNotAvailable
 from basagc import telemachus
 if config.DEBUG:
@@ -38,6 +36,9 @@ INVALID_VERBS = [
 ]
 
 
+verbs = Registry("verb")
+
+
 class NounNotAcceptableError(Exception):
 
     """ This exception is raised when the noun selected is not available with the verb selected."""
@@ -70,13 +71,17 @@ class Verb:
 
     def _format_output_data(self, data):
 
-        """ Formats data for output to the DSKY.
+        """ Formats data for output to the DSKY. Nouns that declare fields return numbers, which are encoded by the
+        fields. Otherwise the noun returns strings of digits, which are padded here.
         :param data: data to display
         :type data: dict
         :return: DSKY formatted output
         :rtype: list of strings
         """
 
+        if "fields" in data:
+            return [field.encode(data[register]) for register, field in enumerate(data["fields"], start=1)]
+
         raw_data = [data[1], data[2], data[3]]
         out_data = []
         for item in raw_data:
@@ -103,6 +108,7 @@ class Verb:
         if self.noun in self.illegal_nouns:
             raise NounNotAcceptableError
         utils.log("Executing Verb {}: {}".format(self.number, self.name))
+        journal.record(journal.VERB, verb=self.number, noun=self.noun)
         self.dsky.current_verb = self
         if self.noun:
             Verb.computer.dsky.set_register(self.noun, "noun")
@@ -202,24 +208,18 @@ class MonitorVerb(DisplayVerb):
         self.timer = QTimer()
         self.timer.timeout.connect(self._update_display)
         self.is_tooltips_set = False
+        self.last_output = None
 
     def _send_output(self):
 
         """ Sends the requested output to the DSKY """
 
-        # check if the display update interval needs to be changed
-        if self.timer.interval() != config.DISPLAY_UPDATE_INTERVAL:
-            # stop and start the timer to change the update interval
-            self.timer.stop()
-            self.timer.start(config.DISPLAY_UPDATE_INTERVAL)
-
         if self.noun is None:
             self.noun = Verb.computer.keyboard_state["requested_noun"]
         if self.noun in self.illegal_nouns:
             raise NounNotAcceptableError
-        noun_function = Verb.computer.nouns[self.noun]()
         try:
-            data = noun_function.return_data()
+            data = Verb.computer.nouns.get_data(self.noun)
         except nouns.NounNotImplementedError:
             self.computer.operator_error("Noun {} not implemented yet. Sorry about that...".format(self.noun))
             self.terminate()
@@ -241,8 +241,19 @@ class MonitorVerb(DisplayVerb):
             # terminate and return
             self.terminate()
             return
+
+        # check if the display update interval needs to be changed
+        update_interval = self._get_update_interval()
+        if self.timer.isActive() and self.timer.interval() != update_interval:
+            self.timer.setInterval(update_interval)
+
         output = self._format_output_data(data)
-        
+
+        # skip the redraw if nothing displayed has changed
+        if output == self.last_output:
+            return
+        self.last_output = output
+
         # set tooltips
         if not self.is_tooltips_set:
             Verb.computer.dsky.set_tooltip("data_1", data["tooltips"][0])
@@ -265,6 +276,10 @@ class MonitorVerb(DisplayVerb):
         # if Verb.computer.keyboard_state["backgrounded_update"] is not None:
         #     Verb.computer.keyboard_state["backgrounded_update"].terminate()
         Verb.computer.keyboard_state["display_lock"] = self
+        self.last_output = None
+        if self.noun is not None:
+            # samples kept from an earlier display of this noun are stale by now
+            Verb.computer.nouns.reset(self.noun)
 
         try:
             self._send_output()
@@ -275,7 +290,19 @@ class MonitorVerb(DisplayVerb):
         if self.noun is None:   #JRI if monitoring was terminated noun=None and we don't want to start the timer.
             return
 
-        self.timer.start(config.DISPLAY_UPDATE_INTERVAL)
+        self.timer.start(self._get_update_interval())
+
+    def _get_update_interval(self):
+
+        """ Returns the display update interval for the noun being monitored in the current flight phase.
+        :return: the update interval in milliseconds
+        :rtype: int
+        """
+
+        intervals = config.DISPLAY_UPDATE_INTERVALS.get(self.noun)
+        if not intervals:
+            return config.DISPLAY_UPDATE_INTERVAL
+        return intervals.get(Verb.computer.get_flight_phase(), config.DISPLAY_UPDATE_INTERVAL)
 
     def _update_display(self):
 
@@ -359,6 +386,7 @@ class LoadVerb(Verb):
 # no verb 00
 
 
+@verbs.register("01")
 class Verb01(DisplayVerb):
 
     """ Displays Octal component 1 in R1
@@ -379,8 +407,7 @@ class Verb01(DisplayVerb):
         """
         
         super().execute()
-        noun_function = Verb.computer.nouns[self.noun]()
-        noun_data = noun_function.return_data()
+        noun_data = Verb.computer.nouns.get_data(self.noun)
         if noun_data is False:
             # No data returned from noun, noun should have raised a program alarm, all we need to do it quit here
             return
@@ -388,6 +415,7 @@ class Verb01(DisplayVerb):
         Verb.computer.dsky.set_register(output[0], "data_1")
 
 
+@verbs.register("02")
 class Verb02(DisplayVerb):
 
     """ Displays Octal component 2 in R1
@@ -408,14 +436,14 @@ class Verb02(DisplayVerb):
         """
         
         super().execute()
-        noun_function = Verb.computer.nouns[self.noun]()
-        noun_data = noun_function.return_data()
+        noun_data = Verb.computer.nouns.get_data(self.noun)
         if noun_data is False:
             # No data returned from noun, noun should have raised a program alarm, all we need to do it quit here
             return
         output = self._format_output_data(noun_data)
         Verb.computer.dsky.set_register(output[1], "data_2")
 
+@verbs.register("03")
 class Verb03(DisplayVerb):
 
     """ Displays Octal component 3 in R1
@@ -437,14 +465,14 @@ class Verb03(DisplayVerb):
         
 
         super().execute()
-        noun_function = Verb.computer.nouns[self.noun]()
-        noun_data = noun_function.return_data()
+        noun_data = Verb.computer.nouns.get_data(self.noun)
         if noun_data is False:
             # No data returned from noun, noun should have raised a program alarm, all we need to do it quit here
             return
         output = self._format_output_data(noun_data)
         Verb.computer.dsky.set_register(output[2], "data_3")
 
+@verbs.register("04")
 class Verb04(DisplayVerb):
 
     """ Displays Octal components 1, 2 in R1, R2
@@ -472,6 +500,7 @@ class Verb04(DisplayVerb):
         Verb.computer.dsky.set_register(output[1], "data_2")
 
 
+@verbs.register("05")
 class Verb05(DisplayVerb):
 
     """ Displays Octal components 1, 2, 3 in R1, R2, R3
@@ -493,8 +522,7 @@ class Verb05(DisplayVerb):
         """
 
         super().execute()
-        noun_function = Verb.computer.nouns[Verb.computer.keyboard_state["requested_noun"]]()
-        noun_data = noun_function.return_data()
+        noun_data = Verb.computer.nouns.get_data(Verb.computer.keyboard_state["requested_noun"])
         if not noun_data:
             # No data returned from noun, noun should have raised a program alarm, all we need to do it quit here
             return
@@ -504,6 +532,7 @@ class Verb05(DisplayVerb):
         Verb.computer.dsky.set_register(output[2], "data_3")
 
 
+@verbs.register("06")
 class Verb06(DisplayVerb):
 
     """ Displays Decimal in R1 or in R1, R2 or in R1, R2, R3
@@ -525,8 +554,7 @@ class Verb06(DisplayVerb):
         """
 
         super().execute()
-        noun_function = Verb.computer.nouns[self.noun]()
-        noun_data = noun_function.return_data()
+        noun_data = Verb.computer.nouns.get_data(self.noun)
         if not noun_data:
             # No data returned from noun, noun should have raised a program alarm, all we need to do it quit here
             return
@@ -547,6 +575,7 @@ class Verb06(DisplayVerb):
 # no verb 10
 
 
+@verbs.register("11")
 class Verb11(MonitorVerb):
 
     """ Monitors Octal component 1 in R1
@@ -561,6 +590,7 @@ class Verb11(MonitorVerb):
         super().__init__(name="Monitor Octal component 1 in R1", verb_number="11", noun=noun)
 
 
+@verbs.register("12")
 class Verb12(MonitorVerb):
 
     """ Monitors Octal component 2 in R1
@@ -575,6 +605,7 @@ class Verb12(MonitorVerb):
         super().__init__(name="Monitor Octal component 2 in R1", verb_number="12", noun=noun)
 
 
+@verbs.register("13")
 class Verb13(MonitorVerb):
 
     """ Monitors Octal component 3 in R1
@@ -589,6 +620,7 @@ class Verb13(MonitorVerb):
         super().__init__(name="Monitor Octal component 3 in R1", verb_number="13", noun=noun)
 
 
+@verbs.register("14")
 class Verb14(MonitorVerb):
 
     """ Monitors Octal components 1, 2 in R1, R2
@@ -603,6 +635,7 @@ class Verb14(MonitorVerb):
         super().__init__(name="Monitor Octal components 1, 2 in R1, R2", verb_number="14", noun=noun)
 
 
+@verbs.register("15")
 class Verb15(MonitorVerb):
 
     """ Monitors Octal components 1, 2, 3 in R1, R2, R3
@@ -617,6 +650,7 @@ class Verb15(MonitorVerb):
         super().__init__(name="Monitor Octal components 1, 2, 3 in R1, R2, R3", verb_number="15", noun=noun)
 
 
+@verbs.register("16")
 class Verb16(MonitorVerb):
 
     """ Monitors Decimal in R1 or in R1, R2 or in R1, R2, R3
@@ -639,6 +673,7 @@ class Verb16(MonitorVerb):
         self.start_monitor()
 
 
+@verbs.register("17")
 class Verb17(MonitorVerb):
 
     """ Monitors Double Precision Decimal in R1, R2 (test only)
@@ -660,6 +695,7 @@ class Verb17(MonitorVerb):
 # no verb 20
 
 
+@verbs.register("21")
 class Verb21(LoadVerb):
 
     """ Loads component 1 into R1
@@ -682,6 +718,7 @@ class Verb21(LoadVerb):
         Verb.computer.dsky.request_data(self.accept_input, display_location="data_1")
 
 
+@verbs.register("22")
 class Verb22(LoadVerb):
 
     """ Loads component 2 into R2
@@ -704,6 +741,7 @@ class Verb22(LoadVerb):
         Verb.computer.dsky.request_data(self.accept_input, display_location="data_2")
 
 
+@verbs.register("23")
 class Verb23(LoadVerb):
 
     """ Loads component 3 into R3
@@ -825,6 +863,7 @@ class Verb23(LoadVerb):
             #utils.log("V33 called, but nothing to proceed with!")
 
 
+@verbs.register("34")
 class Verb34(Verb):
 
     """ Terminate program
@@ -855,6 +894,7 @@ class Verb34(Verb):
             utils.log("V34 called, but nothing to terminate!")
 
 
+@verbs.register("35")
 class Verb35(Verb):
 
     """Lamp test"""
@@ -908,6 +948,7 @@ class Verb35(Verb):
         self.computer.memory_hack = None
         
 
+@verbs.register("36")
 class Verb36(Verb):
 
     """ Request fresh start
@@ -930,6 +971,7 @@ class Verb36(Verb):
         Verb.computer.fresh_start()
 
 
+@verbs.register("37")
 class Verb37(Verb):
 
     """ Change program (Major Mode)
@@ -968,6 +1010,30 @@ class Verb37(Verb):
 # BEGIN EXTENDED VERBS
 ###############################################################################
 
+@verbs.register("71")
+class Verb71(ExtendedVerb):
+
+    """ Universal update, block address. Uplinks the staged vehicle model from the vehicle uplink file.
+    """
+
+    def __init__(self):
+
+        """ Class constructor
+        :return: None
+        """
+
+        super().__init__(name="Universal update, block address", verb_number="71")
+
+    def execute(self):
+
+        """ Executes the verb.
+        :return: None
+        """
+
+        Verb.computer.accept_vehicle_uplink()
+
+
+@verbs.register("75")
 class Verb75(ExtendedVerb):
 
     """ Backup liftoff
@@ -990,6 +1056,7 @@ class Verb75(ExtendedVerb):
         program.execute()
 
 
+@verbs.register("82")
 class Verb82(ExtendedVerb):
 
     """ Request orbital parameters display (R30)
@@ -1014,6 +1081,7 @@ class Verb82(ExtendedVerb):
         Verb.computer.execute_verb(verb="16", noun="44")
 
 
+@verbs.register("93")
 class Verb93(ExtendedVerb):
 
     '''
@@ -1039,6 +1107,7 @@ class Verb93(ExtendedVerb):
         Verb.computer.disable_direction_autopilot()
 
 
+@verbs.register("98")
 class Verb98(ExtendedVerb):
     '''
     Debug verb
@@ -1084,6 +1153,7 @@ class Verb98(ExtendedVerb):
                 else:
                     print("{}: {}".format(key, value))
 
+@verbs.register("99")
 class Verb99(ExtendedVerb):
 
     """ Please enable engine
@@ -1119,8 +1189,4 @@ class Verb99(ExtendedVerb):
                              is_proceed_available=True)
 
 
-verbs = OrderedDict()
-clsmembers = inspect.getmembers(sys.modules[__name__], inspect.isclass)
-for class_tuple in clsmembers:
-    if class_tuple[0][-1].isdigit():
-        verbs[class_tuple[0][-2:]] = class_tuple[1]
+verbs.load_plugins("basagc.verbs")
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+This module contains a small HTTP/WebSocket server that mirrors the DSKY in a web browser. The page is served over
+plain HTTP, then a WebSocket carries display changes to the browser and keypresses back to the computer.
+
+Only elements that have changed since the last update are sent, as a JSON object of element name to value (see
+DSKY.get_display_state()). The display is sampled once per main loop tick no matter how many viewers are attached.
+Each viewer has its own sender thread, so a stalled browser can't block the main loop; a viewer that falls more than
+config.WEB_DSKY_SEND_QUEUE_SIZE frames behind is disconnected.
+
+There is no authentication, and viewers can key in verbs, so the server only listens on the local machine unless
+config.WEB_DSKY_IP is changed.
+"""
+
+import base64
+import hashlib
+import json
+import queue
+import socket
+import socketserver
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from basagc import config, utils
+if config.DEBUG:
+    from pudb import set_trace  # lint:ok
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+VALID_KEYS = "0123456789+-VNECPRK"
+
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+CLOSE_PROTOCOL_ERROR = 1002
+# longest client message accepted (bytes), clients only send keypresses
+MAX_MESSAGE_LENGTH = 256
+# how long a closing connection waits for its queued frames to be sent (s)
+SENDER_CLOSE_TIMEOUT = 1.0
+
+
+def encode_frame(payload, opcode=OPCODE_TEXT):
+
+    """ Encodes a single unmasked (server to client) WebSocket frame.
+    :param payload: the data to send
+    :type payload: bytes
+    :param opcode: the frame opcode
+    :type opcode: int
+    :return: the encoded frame
+    :rtype: bytes
+    """
+
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 65536:
+        header += bytes([126]) + struct.pack("!H", length)
+    else:
+        header += bytes([127]) + struct.pack("!Q", length)
+    return header + payload
+
+
+class WebSocketClient:
+
+    """ A browser connected to the web DSKY. """
+
+    def __init__(self, rfile, wfile, connection=None):
+
+        """ Class constructor. Starts the sender thread.
+        :param rfile: the file to read frames from
+        :param wfile: the file to write frames to
+        :param connection: the client socket, shut down to disconnect the client
+        :type connection: socket.socket | None
+        :return: None
+        """
+
+        self.rfile = rfile
+        self.wfile = wfile
+        self.connection = connection
+        # frames waiting for the sender thread, None to close the connection once they have been sent
+        self.send_queue = queue.Queue(maxsize=config.WEB_DSKY_SEND_QUEUE_SIZE)
+        self.is_open = True
+        self.sender = threading.Thread(target=self._send_frames, name="web_dsky_sender", daemon=True)
+        self.sender.start()
+
+    def send_frame(self, frame):
+
+        """ Queues an already encoded frame for the sender thread, without blocking. A client whose queue is full
+        is too slow to keep up, and is disconnected.
+        :param frame: the encoded frame
+        :type frame: bytes
+        :return: None
+        """
+
+        if not self.is_open:
+            return
+        try:
+            self.send_queue.put_nowait(frame)
+        except queue.Full:
+            utils.log("Web DSKY client is not keeping up, disconnecting", log_level="WARNING")
+            self.is_open = False
+            self._shutdown()
+
+    def close(self):
+
+        """ Closes the connection once the frames already queued have been sent, without blocking.
+        :return: None
+        """
+
+        self.is_open = False
+        try:
+            self.send_queue.put_nowait(None)
+        except queue.Full:
+            self._shutdown()
+
+    def _send_frames(self):
+
+        # runs on the sender thread, the only thread that writes to the client once it is connected
+        while True:
+            frame = self.send_queue.get()
+            if frame is None:
+                break
+            try:
+                self.wfile.write(frame)
+                self.wfile.flush()
+            except (OSError, ValueError):
+                # ValueError if the request handler has already closed the file
+                break
+        self.is_open = False
+        self._shutdown()
+
+    def _shutdown(self):
+
+        # unblocks the sender and the request handler if they are stuck on the socket
+        if self.connection is None:
+            return
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def read_message(self):
+
+        """ Reads frames until a text message arrives. The connection is closed if a frame is unmasked (RFC 6455
+        requires clients to mask their frames) or longer than MAX_MESSAGE_LENGTH.
+        :return: the message text, or None if the connection has closed
+        :rtype: str
+        """
+
+        while self.is_open:
+            header = self._read(2)
+            if header is None:
+                break
+            opcode = header[0] & 0x0F
+            is_masked = header[1] & 0x80
+            length = header[1] & 0x7F
+            if length == 126:
+                extended_length = self._read(2)
+                if extended_length is None:
+                    break
+                length = struct.unpack("!H", extended_length)[0]
+            elif length == 127:
+                extended_length = self._read(8)
+                if extended_length is None:
+                    break
+                length = struct.unpack("!Q", extended_length)[0]
+            if not is_masked or length > MAX_MESSAGE_LENGTH:
+                utils.log("Web DSKY client sent an unmasked or oversized frame, disconnecting", log_level="WARNING")
+                self.send_frame(encode_frame(struct.pack("!H", CLOSE_PROTOCOL_ERROR), OPCODE_CLOSE))
+                break
+            mask = self._read(4)
+            payload = self._read(length)
+            if mask is None or payload is None:
+                break
+            payload = bytearray(payload)
+            for index in range(len(payload)):
+                payload[index] ^= mask[index % 4]
+
+            if opcode == OPCODE_CLOSE:
+                self.send_frame(encode_frame(b"", OPCODE_CLOSE))
+                break
+            elif opcode == OPCODE_PING:
+                self.send_frame(encode_frame(bytes(payload), OPCODE_PONG))
+            elif opcode == OPCODE_TEXT:
+                return payload.decode("utf-8", "ignore")
+        self.is_open = False
+        return None
+
+    def _read(self, length):
+
+        # a short read means the connection has closed
+        data = self.rfile.read(length)
+        if len(data) < length:
+            return None
+        return data
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+
+    """ Serves the web DSKY page and upgrades /ws requests to WebSockets. """
+
+    def do_GET(self):
+        if self.path == "/ws" and self.headers.get("Upgrade", "").lower() == "websocket":
+            self._handle_websocket()
+        elif self.path in ["/", "/index.html"]:
+            self._send_page()
+        else:
+            self.send_error(404)
+
+    def _send_page(self):
+        with open(config.WEB_DSKY_PAGE, "rb") as page_file:
+            page = page_file.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    def _handle_websocket(self):
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode("ascii")).digest()).decode("ascii")
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        web_dsky = self.server.web_dsky
+        client = WebSocketClient(self.rfile, self.wfile, self.connection)
+        web_dsky.add_client(client)
+        try:
+            while True:
+                message = client.read_message()
+                if message is None:
+                    break
+                web_dsky.queue_keypresses(message)
+        except OSError:
+            pass
+        finally:
+            # let the sender write out the queued frames (eg the close frame) before the handler closes the file
+            client.close()
+            client.sender.join(SENDER_CLOSE_TIMEOUT)
+
+    def log_message(self, format_string, *args):
+        utils.log("Web DSKY {}: {}".format(self.address_string(), format_string % args))
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class WebDSKYServer:
+
+    """ Mirrors the DSKY of a computer to any number of web browsers. """
+
+    def __init__(self, computer, address=config.WEB_DSKY_IP, port=config.WEB_DSKY_PORT):
+
+        """ Class constructor.
+        :param computer: the instance of the computer to mirror
+        :param address: the address to listen on
+        :type address: str
+        :param port: the port to listen on
+        :type port: int
+        :return: None
+        """
+
+        self.computer = computer
+        self.address = address
+        self.port = port
+        self.clients = []
+        self.new_clients = queue.Queue()
+        self.keypress_queue = queue.Queue()
+        self.display_state = {}
+        self.httpd = None
+
+    def start(self):
+
+        """ Starts serving, and adds the display sampler to the computer main loop.
+        :return: None
+        """
+
+        self.httpd = _ThreadingHTTPServer((self.address, self.port), _RequestHandler)
+        self.httpd.web_dsky = self
+        thread = threading.Thread(target=self.httpd.serve_forever, name="web_dsky", daemon=True)
+        thread.start()
+        self.computer.add_to_mainloop(self.service)
+        utils.log("Web DSKY listening on http://{}:{}/".format(self.address, self.port), log_level="INFO")
+
+    def stop(self):
+
+        """ Stops serving and disconnects all viewers.
+        :return: None
+        """
+
+        self.computer.remove_from_mainloop(self.service)
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+        for client in self.clients:
+            client.send_frame(encode_frame(b"", OPCODE_CLOSE))
+            client.close()
+        self.clients = []
+
+    def add_client(self, client):
+
+        """ Called from the server thread when a browser connects. The client is sent the full display on the next
+        main loop tick.
+        :param client: the new client
+        :type client: WebSocketClient
+        :return: None
+        """
+
+        self.new_clients.put(client)
+
+    def queue_keypresses(self, message):
+
+        """ Called from the server thread with keys sent by a browser. Keys are passed to the computer from the main
+        loop, since the computer isn't thread safe.
+        :param message: one or more key names
+        :type message: str
+        :return: None
+        """
+
+        for key in message.strip().upper():
+            if key in VALID_KEYS:
+                self.keypress_queue.put(key)
+
+    def service(self):
+
+        """ Main loop job: passes keypresses to the computer and sends display changes to all viewers.
+        :return: None
+        """
+
+        while True:
+            try:
+                key = self.keypress_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.computer.charin(key)
+
+        if self.new_clients.empty() and not self.clients:
+            return
+
+        new_state = self.computer.dsky.get_display_state()
+        changes = {name: value for name, value in new_state.items() if self.display_state.get(name) != value}
+        self.display_state = new_state
+
+        if changes:
+            frame = encode_frame(json.dumps(changes, separators=(",", ":")).encode("utf-8"))
+            for client in self.clients:
+                client.send_frame(frame)
+
+        while not self.new_clients.empty():
+            client = self.new_clients.get_nowait()
+            client.send_frame(encode_frame(json.dumps(new_state, separators=(",", ":")).encode("utf-8")))
+            self.clients.append(client)
+
+        self.clients = [client for client in self.clients if client.is_open]
@@ -0,0 +1,56 @@
+""" Tests for the navigation filter. """
+
+import numpy as np
+
+from basagc import navigation, orbital
+
+KERBIN_GRAV_PARAM = 3.5316e12
+KERBIN_RADIUS = 600000.0
+FIX_INTERVAL = 60.0
+
+
+def _fix(rng, position, velocity, epoch):
+    position = position + rng.normal(0.0, 10.0, 3)
+    velocity = velocity + rng.normal(0.0, 0.01, 3)
+    return navigation.StateVector(position, velocity, epoch, "Kerbin", KERBIN_GRAV_PARAM, KERBIN_RADIUS)
+
+
+def _fly(navigation_filter, rng, position, velocity, epoch, fixes):
+    for _ in range(fixes):
+        position, velocity = orbital.propagate(position, velocity, FIX_INTERVAL, KERBIN_GRAV_PARAM)
+        epoch += FIX_INTERVAL
+        navigation_filter.add_fix(_fix(rng, position, velocity, epoch))
+    return position, velocity, epoch
+
+
+def _start():
+    # 100 km circular orbit of Kerbin
+    rng = np.random.default_rng(1)
+    position = np.array([KERBIN_RADIUS + 100000.0, 0.0, 0.0])
+    velocity = np.array([0.0, np.sqrt(KERBIN_GRAV_PARAM / position[0]), 0.0])
+    navigation_filter = navigation.NavigationFilter()
+    navigation_filter.add_fix(_fix(rng, position, velocity, 0.0))
+    return navigation_filter, rng, position, velocity
+
+
+def test_fixes_are_fused_while_coasting():
+    navigation_filter, rng, position, velocity = _start()
+    position, velocity, epoch = _fly(navigation_filter, rng, position, velocity, 0.0, 10)
+    estimate = navigation_filter.get_state_vector(epoch)
+    # the estimate is better than a single fix
+    assert np.linalg.norm(estimate.position - position) < 10.0
+    assert np.linalg.norm(estimate.velocity - velocity) < 0.01
+
+
+def test_filter_snaps_to_fix_after_unmodelled_burn():
+    navigation_filter, rng, position, velocity = _start()
+    position, velocity, epoch = _fly(navigation_filter, rng, position, velocity, 0.0, 10)
+
+    # 100 m/s prograde between fixes, which the filter doesn't know about
+    velocity = velocity + 100.0 * velocity / np.linalg.norm(velocity)
+    position, velocity, epoch = _fly(navigation_filter, rng, position, velocity, epoch, 1)
+
+    estimate = navigation_filter.get_state_vector(epoch)
+    true_orbit = navigation.StateVector(position, velocity, epoch, "Kerbin", KERBIN_GRAV_PARAM, KERBIN_RADIUS)
+    assert np.linalg.norm(estimate.velocity - velocity) < 0.1
+    assert abs(estimate.apoapsis_altitude - true_orbit.apoapsis_altitude) < 1000.0